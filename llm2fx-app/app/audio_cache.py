@@ -0,0 +1,78 @@
+import os
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from .config import settings
+from .logger import logger
+from .metrics import CACHE_REQUESTS
+
+
+class ArrayCache:
+    """
+    Directory of .npy arrays that are read back memory-mapped.
+
+    Entries live on the filesystem, so every render worker process shares them.
+    A file's mtime marks its last use; when the directory grows past `max_bytes`
+    the least recently used entries are deleted. A max_bytes of 0 disables the
+    cache.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, name: str = "array"):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.name = name  # metrics label
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.npy"
+
+    def get(self, key: str) -> np.ndarray | None:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            array = np.load(path, mmap_mode="r")
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            CACHE_REQUESTS.inc(cache=self.name, result="miss")
+            return None
+        CACHE_REQUESTS.inc(cache=self.name, result="hit")
+        return array
+
+    def put(self, key: str, array: np.ndarray) -> np.ndarray:
+        """Store `array` and return it memory-mapped from the cache file."""
+        if not self.enabled or array.nbytes > self.max_bytes:
+            return array
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = self.directory / f".{key}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(array))
+        os.replace(tmp_path, path)
+        self.evict()
+        return np.load(path, mmap_mode="r")
+
+    def evict(self) -> None:
+        entries = []
+        total = 0
+        for path in self.directory.glob("*.npy"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # removed by another worker
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        while total > self.max_bytes and entries:
+            _, size, path = entries.pop(0)
+            path.unlink(missing_ok=True)
+            total -= size
+            logger.debug("array_cache_evicted", extra={"extra": {"path": str(path)}})
+
+
+decoded_audio_cache = ArrayCache(settings.decoded_cache_dir, settings.decoded_cache_max_bytes, name="decoded")
@@ -1,36 +1,110 @@
-import librosa
 import soundfile as sf
 import numpy as np
-from scipy import signal
-from scipy.signal import lfilter
+import io
+import itertools
 import os
+import tempfile
+import time
 from pathlib import Path
 from typing import List, Tuple
 import logging
 
+from .audio_cache import decoded_audio_cache
+from .chain import EffectChain, EqNode, ReverbNode, build_chain
+from .dsp import ResampleStream, resample
+from .kernels import eq_filter_bank
+from .metrics import record_render, span
+
 logger = logging.getLogger(__name__)
 
 class AudioProcessor:
     """Audio processing class for applying AI-generated effects"""
     
-    def __init__(self, sample_rate: int = 44100):
+    def __init__(self, sample_rate: int | None = 44100, block_size: int = 8192):
+        # None means "use each file's native rate"; load_audio then sets it
         self.sample_rate = sample_rate
+        self.block_size = block_size  # convolution partition size, in frames
         self.frequency_bands = [
             20, 50, 100, 200, 400, 800, 1500, 3000, 6000, 12000, 16000, 20000
         ]
     
-    def load_audio(self, file_path: str) -> Tuple[np.ndarray, int]:
-        """Load audio file and return audio data and sample rate"""
+    def _decode(self, file_path: str) -> Tuple[np.ndarray, int]:
+        """Decode at the file's native rate and channel layout, shape (frames, channels)"""
+        try:
+            audio, sr = sf.read(file_path, dtype="float32", always_2d=True)
+        except Exception:
+            # Formats libsndfile cannot read go through librosa/audioread
+            import librosa
+            audio, sr = librosa.load(file_path, sr=None, mono=False)
+            audio = np.atleast_2d(audio).T.astype(np.float32, copy=False)
+        return audio, sr
+    
+    def load_audio(self, file_path: str, content_hash: str | None = None) -> Tuple[np.ndarray, int]:
+        """
+        Load audio file and return audio data, shape (frames, channels), and sample rate
+        
+        Channels are preserved and audio is only resampled when this processor
+        has a fixed sample rate that differs from the file's.
+        With a content hash, decoded PCM is cached per (hash, sample rate) and
+        returned as a read-only memory map, so repeat renders skip decoding.
+        Files whose native rate libsndfile cannot probe are decoded first and
+        cached under the decoded rate.
+        """
         try:
-            audio, sr = librosa.load(file_path, sr=self.sample_rate)
+            target_sr = self.sample_rate
+            if content_hash and target_sr is None:
+                try:
+                    target_sr = sf.info(file_path).samplerate
+                except Exception:
+                    pass  # not a libsndfile format; _decode falls back to librosa
+            if content_hash and target_sr:
+                cached = decoded_audio_cache.get(f"{content_hash}_{target_sr}")
+                if cached is not None:
+                    logger.debug(f"Decoded audio cache hit: {content_hash}_{target_sr}")
+                    self.sample_rate = target_sr
+                    return cached, target_sr
+            
+            audio, sr = self._decode(file_path)
+            if self.sample_rate and sr != self.sample_rate:
+                audio = resample(audio, sr, self.sample_rate)
+                sr = self.sample_rate
+            self.sample_rate = sr
+            if content_hash:
+                audio = decoded_audio_cache.put(f"{content_hash}_{sr}", audio)
             return audio, sr
         except Exception as e:
             logger.error(f"Error loading audio file: {e}")
             raise
     
+    def load_excerpt(self, file_path: str, start_s: float, duration_s: float,
+                     mono: bool = False) -> Tuple[np.ndarray, int]:
+        """
+        Decode only `duration_s` seconds starting at `start_s`, shape (frames, channels)
+        
+        Seeks instead of decoding the whole file where the format allows it.
+        The excerpt is resampled down to this processor's rate if the file's is
+        higher, never up, and optionally downmixed to mono.
+        """
+        try:
+            with sf.SoundFile(file_path) as f:
+                sr = f.samplerate
+                f.seek(min(int(start_s * sr), f.frames))
+                audio = f.read(int(duration_s * sr), dtype="float32", always_2d=True)
+        except Exception:
+            import librosa
+            audio, sr = librosa.load(file_path, sr=None, mono=False, offset=start_s, duration=duration_s)
+            audio = np.atleast_2d(audio).T.astype(np.float32, copy=False)
+        if mono and audio.shape[1] > 1:
+            audio = audio.mean(axis=1, keepdims=True)
+        if self.sample_rate and sr > self.sample_rate:
+            audio = resample(audio, sr, self.sample_rate)
+            sr = self.sample_rate
+        self.sample_rate = sr
+        return audio, sr
+    
     def apply_reverb(self, audio: np.ndarray, gains_db: List[float], decays_s: List[float], mix: float) -> np.ndarray:
         """
-        Apply reverb effect using multi-band processing
+        Apply reverb by convolving with a synthesized multi-band impulse response
         
         Args:
             audio: Input audio signal
@@ -39,61 +113,8 @@ class AudioProcessor:
             mix: Wet/dry mix (0.0 = dry, 1.0 = wet)
         """
         try:
-            logger.info(f"apply_reverb called with mix={mix}, gains={gains_db[:3]}...")
-            
-            # Ensure we have stereo audio
-            if len(audio.shape) == 1:
-                audio = np.column_stack([audio, audio])
-            
-            # Create a more pronounced reverb effect
-            # Use the average gain and decay for simplicity
-            avg_gain_db = np.mean(gains_db)
-            avg_decay_s = np.mean(decays_s)
-            
-            logger.info(f"Average gain: {avg_gain_db}dB, Average decay: {avg_decay_s}s")
-            
-            # Convert gain from dB to linear
-            gain_linear = 10 ** (avg_gain_db / 20.0)
-            
-            # Create reverb using multiple delays
-            reverb_audio = np.zeros_like(audio)
-            
-            # Multiple delay taps for more realistic reverb
-            delays = [int(avg_decay_s * self.sample_rate * 0.05 * i) for i in range(1, 8)]  # More delays, shorter spacing
-            decay_factors = [np.exp(-i * 0.3) for i in range(1, 8)]  # Slower decay for more pronounced effect
-            
-            for delay_samples, decay_factor in zip(delays, decay_factors):
-                if delay_samples < len(audio):
-                    delayed = np.zeros_like(audio)
-                    delayed[delay_samples:] = audio[:-delay_samples] * decay_factor * gain_linear
-                    reverb_audio += delayed
-            
-            # Add some feedback for more realistic reverb
-            feedback_delay = int(avg_decay_s * self.sample_rate * 0.3)
-            if feedback_delay < len(audio):
-                feedback = np.zeros_like(audio)
-                feedback[feedback_delay:] = reverb_audio[:-feedback_delay] * 0.3
-                reverb_audio += feedback
-            
-            # Normalize reverb
-            max_reverb = np.max(np.abs(reverb_audio))
-            if max_reverb > 0:
-                reverb_audio = reverb_audio / max_reverb * 0.8
-            
-            # Apply wet/dry mix with more pronounced effect
-            # Increase the mix to make the effect more noticeable
-            effective_mix = min(0.9, mix * 2.0)  # Double the mix effect for more pronounced reverb
-            final_audio = (1 - effective_mix) * audio + effective_mix * reverb_audio
-            
-            # Normalize final output
-            max_final = np.max(np.abs(final_audio))
-            if max_final > 0:
-                final_audio = final_audio / max_final * 0.95
-            
-            logger.info(f"Reverb applied: original max={np.max(np.abs(audio)):.4f}, processed max={np.max(np.abs(final_audio)):.4f}, effective_mix={effective_mix}")
-            
-            return final_audio
-            
+            logger.debug(f"apply_reverb called with mix={mix}, gains={gains_db[:3]}...")
+            return self.apply_chain(audio, EffectChain([ReverbNode(gains_db, decays_s, mix)]))
         except Exception as e:
             logger.error(f"Error applying reverb: {e}")
             return audio  # Return original if processing fails
@@ -127,51 +148,31 @@ class AudioProcessor:
             logger.error(f"Error in simple reverb: {e}")
             return signal_data
     
+    def filter_bank(self) -> Tuple[np.ndarray, ...]:
+        """SOS band filters for this processor's sample rate and bands, shared across workers"""
+        return eq_filter_bank(self.sample_rate, tuple(self.frequency_bands))
+    
     def apply_eq(self, audio: np.ndarray, gains_db: List[float]) -> np.ndarray:
         """Apply equalization using multi-band processing"""
         try:
-            # Similar to reverb but only applying gains
-            processed_audio = np.zeros_like(audio)
-            
-            for i, gain_db in enumerate(gains_db):
-                gain_linear = 10 ** (gain_db / 20.0)
-                
-                # Create bandpass filter (same as reverb)
-                if i == 0:
-                    low_freq = 0
-                    high_freq = self.frequency_bands[i]
-                elif i == len(self.frequency_bands) - 1:
-                    low_freq = self.frequency_bands[i-1]
-                    high_freq = self.sample_rate // 2
-                else:
-                    low_freq = self.frequency_bands[i-1]
-                    high_freq = self.frequency_bands[i]
-                
-                nyquist = self.sample_rate / 2
-                low_norm = low_freq / nyquist
-                high_norm = high_freq / nyquist
-                
-                if high_norm < 1.0:
-                    b, a = signal.butter(4, [low_norm, high_norm], btype='band')
-                    
-                    for ch in range(audio.shape[1]):
-                        band_signal = signal.filtfilt(b, a, audio[:, ch])
-                        band_signal *= gain_linear
-                        processed_audio[:, ch] += band_signal
-            
-            # Normalize
-            max_val = np.max(np.abs(processed_audio))
-            if max_val > 0:
-                processed_audio = processed_audio / max_val * 0.95
-            
-            return processed_audio
-            
+            return self.apply_chain(audio, EffectChain([EqNode(gains_db)]))
         except Exception as e:
             logger.error(f"Error applying EQ: {e}")
             return audio
     
-    def save_audio(self, audio: np.ndarray, output_path: str, sample_rate: int = None) -> None:
-        """Save processed audio to file"""
+    def apply_chain(self, audio: np.ndarray, chain: EffectChain, content_hash: str | None = None) -> np.ndarray:
+        """
+        Run an effect chain over the whole buffer with a single final
+        peak-normalization stage
+        """
+        return chain.run(self, audio, content_hash)
+    
+    def save_audio(self, audio: np.ndarray, output_path, sample_rate: int = None,
+                   format: str | None = None, subtype: str | None = None) -> None:
+        """
+        Save processed audio to a path or writable file object.
+        Format and subtype default to soundfile's choice for the path's extension.
+        """
         try:
             if sample_rate is None:
                 sample_rate = self.sample_rate
@@ -180,59 +181,137 @@ class AudioProcessor:
             if len(audio.shape) == 1:
                 audio = audio.reshape(-1, 1)
             
-            sf.write(output_path, audio, sample_rate)
-            logger.info(f"Audio saved to: {output_path}")
+            with span("encode"):
+                sf.write(output_path, audio, sample_rate, format=format, subtype=subtype)
+            logger.debug(f"Audio saved to: {output_path}")
             
         except Exception as e:
             logger.error(f"Error saving audio: {e}")
             raise
 
-def process_audio_with_effects(input_path: str, output_path: str, effects_params: dict) -> bool:
+def _source_blocks(input_path: str, block_size: int, resampler: ResampleStream | None):
+    """Blocks of `block_size` frames (the last may be shorter), resampled on the way if needed"""
+    blocks = sf.blocks(input_path, blocksize=block_size, dtype="float32", always_2d=True)
+    if resampler is None:
+        yield from blocks
+        return
+    pending = np.zeros((0, resampler.channels), dtype=np.float32)
+    for block in itertools.chain(blocks, [None]):
+        chunk = resampler.flush() if block is None else resampler.process_block(block)
+        pending = np.concatenate([pending, chunk])
+        usable = len(pending) - len(pending) % block_size
+        for i in range(0, usable, block_size):
+            yield pending[i:i + block_size]
+        pending = pending[usable:]
+    if len(pending):
+        yield pending
+
+def process_audio_streaming(input_path: str, output_path: str, effects_params: dict,
+                            block_size: int = 8192, format: str | None = None,
+                            subtype: str | None = None, sample_rate: int | None = None) -> None:
+    """
+    Render a file block by block so peak memory is O(block + IR length)
+    instead of O(file length).
+    
+    Audio is processed at `sample_rate`, resampled block by block, or at the
+    file's native rate if None. The first pass streams the effected signal
+    into a float RF64 temp file (plain WAV stops at 4 GiB) while tracking the
+    peak; the second pass applies the same 0.95 peak normalization as the
+    in-memory path while copying into `output_path`.
+    """
+    started = time.perf_counter()
+    info = sf.info(input_path)
+    sample_rate = sample_rate or info.samplerate
+    resampler = ResampleStream(info.samplerate, sample_rate, info.channels) if sample_rate != info.samplerate else None
+    processor = AudioProcessor(sample_rate=sample_rate, block_size=block_size)
+    chain = build_chain(effects_params)
+    effect = chain.stream(processor, info.channels)
+    out_channels = chain.output_channels(info.channels)
+    
+    # Keep the temp file next to a path output; file-object outputs use the system temp dir
+    tmp_dir = os.path.dirname(os.path.abspath(output_path)) if isinstance(output_path, (str, os.PathLike)) else None
+    fd, tmp_path = tempfile.mkstemp(suffix=".rf64", dir=tmp_dir)
+    os.close(fd)
+    try:
+        peak = 0.0
+        with span("stream_effects"), \
+                sf.SoundFile(tmp_path, "w", sample_rate, out_channels, format="RF64", subtype="FLOAT") as tmp:
+            for block in _source_blocks(input_path, block_size, resampler):
+                block = effect.process_block(block)
+                peak = max(peak, float(np.max(np.abs(block))))
+                tmp.write(block)
+        
+        scale = np.float32(0.95 / peak) if peak > 0 else np.float32(1.0)
+        with span("encode"), sf.SoundFile(output_path, "w", sample_rate, out_channels,
+                                          format=format, subtype=subtype) as out:
+            for block in sf.blocks(tmp_path, blocksize=block_size, dtype="float32", always_2d=True):
+                out.write(block * scale)
+        elapsed = time.perf_counter() - started
+        record_render("streaming", info.duration, elapsed)
+        logger.debug(f"Streamed {info.frames} frames at {info.samplerate} Hz to {output_path} at {sample_rate} Hz")
+    finally:
+        os.remove(tmp_path)
+
+def process_audio_with_effects(input_path: str, output_path: str, effects_params: dict,
+                               stream_threshold_s: float | None = None, block_size: int = 8192,
+                               content_hash: str | None = None, sample_rate: int | None = None,
+                               incremental_max_s: float | None = None, format: str | None = None,
+                               subtype: str | None = None) -> bool:
     """
     Main function to process audio with AI-generated effects
     
     Args:
         input_path: Path to input audio file
-        output_path: Path to save processed audio
+        output_path: Path or writable file object for the processed audio
         effects_params: Dictionary containing effect parameters
+        stream_threshold_s: Files longer than this are rendered block by block
+            with bounded memory (None disables streaming)
+        block_size: Block size in frames for convolution and streaming
+        content_hash: SHA-256 of the input, enables the decoded-audio cache
+        sample_rate: Resample to this rate; None keeps the file's native rate
+        incremental_max_s: Reverb on sources up to this long (with a content
+            hash) is built from cached per-band stems, so later mix/gain tweaks
+            are near-instant (None disables it)
+        format, subtype: soundfile output encoding; None infers it from
+            the output path's extension
     
     Returns:
         bool: True if processing was successful
     """
     try:
-        logger.info(f"Starting audio processing: {input_path} -> {output_path}")
-        logger.info(f"Effects parameters: {effects_params}")
+        logger.debug(f"Starting audio processing: {input_path} -> {output_path}")
+        logger.debug(f"Effects parameters: {effects_params}")
+        started = time.perf_counter()
         
-        processor = AudioProcessor()
+        if stream_threshold_s is not None:
+            try:
+                info = sf.info(input_path)
+            except Exception:
+                info = None  # not readable by soundfile; fall back to librosa
+            if info is not None and info.duration > stream_threshold_s:
+                process_audio_streaming(input_path, output_path, effects_params, block_size, format, subtype,
+                                        sample_rate)
+                return True
         
-        # Load audio
-        audio, sr = processor.load_audio(input_path)
-        logger.info(f"Loaded audio: shape={audio.shape}, sample_rate={sr}")
+        processor = AudioProcessor(sample_rate=sample_rate, block_size=block_size)
         
-        # Apply effects based on type
-        if effects_params.get("reverb"):
-            reverb_params = effects_params["reverb"]
-            logger.info(f"Applying reverb with params: {reverb_params}")
-            
-            gains_db = reverb_params.get("gains_db", [0.0] * 12)
-            decays_s = reverb_params.get("decays_s", [1.0] * 12)
-            mix = reverb_params.get("mix", 0.5)
-            
-            logger.info(f"Reverb gains: {gains_db}")
-            logger.info(f"Reverb decays: {decays_s}")
-            logger.info(f"Reverb mix: {mix}")
-            
-            audio = processor.apply_reverb(audio, gains_db, decays_s, mix)
-            logger.info(f"Reverb applied, new audio shape: {audio.shape}")
+        # Load audio
+        with span("decode"):
+            audio, sr = processor.load_audio(input_path, content_hash)
+        logger.debug(f"Loaded audio: shape={audio.shape}, sample_rate={sr}")
         
-        elif effects_params.get("eq"):
-            eq_params = effects_params["eq"]
-            logger.info(f"Applying EQ with params: {eq_params}")
-            audio = processor.apply_eq(audio, eq_params.get("gains_db", [0.0] * 12))
+        # Apply every requested effect in one planned pass
+        chain = build_chain(effects_params)
+        logger.debug(f"Effect chain: {[node.name for node in chain.nodes]}")
+        duration = audio.shape[0] / sr
+        use_stems = content_hash and incremental_max_s is not None and duration <= incremental_max_s
+        audio = processor.apply_chain(audio, chain, content_hash if use_stems else None)
+        logger.debug(f"Effects applied, new audio shape: {audio.shape}")
         
         # Save processed audio
-        processor.save_audio(audio, output_path, sr)
-        logger.info(f"Audio processing completed successfully")
+        processor.save_audio(audio, output_path, sr, format, subtype)
+        record_render("full", duration, time.perf_counter() - started)
+        logger.debug(f"Audio processing completed successfully")
         
         return True
         
@@ -241,3 +320,37 @@ def process_audio_with_effects(input_path: str, output_path: str, effects_params
         import traceback
         logger.error(f"Traceback: {traceback.format_exc()}")
         return False
+
+def render_to_bytes(input_path: str, effects_params: dict, format: str, subtype: str, **kwargs) -> bytes:
+    """
+    Render and encode into memory, for the process pool to hand back to the
+    server without a round trip through disk. Takes the same keyword
+    arguments as process_audio_with_effects; raises RuntimeError on failure.
+    """
+    buffer = io.BytesIO()
+    if not process_audio_with_effects(input_path, buffer, effects_params, format=format, subtype=subtype, **kwargs):
+        raise RuntimeError("Audio processing failed")
+    return buffer.getvalue()
+
+def render_preview(input_path: str, effects_params: dict, start_s: float, duration_s: float,
+                   sample_rate: int, mono: bool, max_ir_s: float, format: str, subtype: str,
+                   block_size: int = 8192) -> bytes:
+    """
+    Render a quick, approximate excerpt for auditioning and return it encoded.
+    
+    Only the excerpt is decoded, at no more than `sample_rate`, optionally
+    downmixed to mono, and reverb uses an IR truncated to `max_ir_s`; the
+    effect chain itself is the same as for a full render.
+    """
+    started = time.perf_counter()
+    processor = AudioProcessor(sample_rate=sample_rate, block_size=block_size)
+    with span("decode"):
+        audio, sr = processor.load_excerpt(input_path, start_s, duration_s, mono)
+    if audio.shape[0] == 0:
+        raise ValueError("Preview excerpt starts past the end of the audio")
+    chain = build_chain(effects_params, max_ir_s=max_ir_s, stereo=not mono)
+    audio = processor.apply_chain(audio, chain)
+    buffer = io.BytesIO()
+    processor.save_audio(audio, buffer, sr, format, subtype)
+    record_render("preview", audio.shape[0] / sr, time.perf_counter() - started)
+    return buffer.getvalue()
@@ -0,0 +1,88 @@
+import io
+import json
+import re
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, List
+
+import aiofiles
+
+
+@dataclass
+class BatchItem:
+    index: int
+    filename: str
+    instruction: str
+    source_id: str
+    input_path: Path
+    params: dict
+    output_path: Path | None = None
+    error: str | None = None
+    seconds: float = 0.0
+
+    @property
+    def arcname(self) -> str:
+        """Name inside the ZIP: unique per item and readable in a file browser."""
+        slug = re.sub(r"[^a-z0-9]+", "-", self.instruction.lower()).strip("-")[:40] or "fx"
+        suffix = (self.output_path or self.input_path).suffix
+        return f"{self.index:03d}_{Path(self.filename).stem}_{slug}{suffix}"
+
+    def manifest_entry(self) -> dict:
+        return {
+            "index": self.index,
+            "file": self.arcname if self.error is None else None,
+            "source_filename": self.filename,
+            "source_id": self.source_id,
+            "instruction": self.instruction,
+            "params": self.params,
+            "render_s": round(self.seconds, 3),
+            "error": self.error,
+        }
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable sink; zipfile then emits data descriptors instead of seeking back."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def stream_zip(items: AsyncIterator[BatchItem], chunk_size: int = 1 << 20) -> AsyncIterator[bytes]:
+    """
+    ZIP archive streamed as items finish rendering.
+
+    Each rendered file is copied into the archive in chunks and deleted, so
+    memory stays at about one chunk however large the batch. Entries are
+    stored uncompressed; a manifest.json with every item's parameters and
+    any error is written last.
+    """
+    sink = _ChunkSink()
+    manifest = []
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        async for item in items:
+            manifest.append(item.manifest_entry())
+            if item.error is not None:
+                continue
+            with archive.open(item.arcname, "w", force_zip64=True) as entry:
+                async with aiofiles.open(item.output_path, "rb") as f:
+                    while chunk := await f.read(chunk_size):
+                        entry.write(chunk)
+                        yield sink.drain()
+            item.output_path.unlink(missing_ok=True)
+            yield sink.drain()
+        manifest.sort(key=lambda entry: entry["index"])
+        archive.writestr("manifest.json", json.dumps({"items": manifest}, indent=2))
+    yield sink.drain()
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .config import settings
+from .metrics import CACHE_REQUESTS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class ResponseCache:
+    """
+    Two-tier cache of validated Text2FxResponse payloads.
+
+    An in-process LRU with TTL answers repeat requests without I/O; misses fall
+    through to an SQLite table that survives restarts and is promoted on hit.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 1024, ttl_s: float = 3600.0,
+                 disk_ttl_s: float = 30 * 24 * 3600.0, enabled: bool = True):
+        self.db_path = db_path
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.disk_ttl_s = disk_ttl_s
+        self._memory: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(fx_type: str, instrument: str, instruction: str, model: str,
+                 prompt_version: str) -> str:
+        parts = [fx_type, _normalize(instrument), _normalize(instruction), model, prompt_version]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(_SCHEMA)
+            self._conn.commit()
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _remember(self, key: str, payload: dict) -> None:
+        self._memory[key] = (time.monotonic() + self.ttl_s, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> dict | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, payload = entry
+                if expires_at > time.monotonic():
+                    self._memory.move_to_end(key)
+                    self.hits_memory += 1
+                    CACHE_REQUESTS.inc(cache="llm", result="hit_memory")
+                    return payload
+                del self._memory[key]
+
+            row = self._db().execute(
+                "SELECT payload FROM responses WHERE key = ? AND created_at > ?",
+                (key, time.time() - self.disk_ttl_s),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                CACHE_REQUESTS.inc(cache="llm", result="miss")
+                return None
+            payload = json.loads(row[0])
+            self._remember(key, payload)
+            self.hits_disk += 1
+            CACHE_REQUESTS.inc(cache="llm", result="hit_disk")
+            return payload
+
+    def put(self, key: str, payload: dict) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._remember(key, payload)
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, payload, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(payload), time.time()),
+            )
+            db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_ratio": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+response_cache = ResponseCache(
+    settings.llm_cache_path,
+    max_entries=settings.llm_cache_size,
+    ttl_s=settings.llm_cache_ttl_s,
+    disk_ttl_s=settings.llm_cache_disk_ttl_s,
+    enabled=settings.llm_cache_enabled,
+)
@@ -0,0 +1,195 @@
+from typing import List, Optional, Sequence
+
+import numpy as np
+from scipy import signal
+
+from .dsp import FilterBankStream, ReverbStream
+from .kernels import reverb_spectra
+from .metrics import span
+from .schemas import BANDS, EqV1, ReverbV1
+from .stems import mix_reverb_stems
+
+
+class EffectNode:
+    """
+    One stage of an effect chain.
+
+    `process` writes the stage's output for a whole buffer into a caller-owned
+    float32 buffer without normalizing it; `stream` returns a stateful block
+    processor for the same effect.
+    """
+
+    name = ""
+
+    def output_channels(self, channels: int) -> int:
+        return channels
+
+    def process(self, processor, src: np.ndarray, dst: np.ndarray) -> None:
+        raise NotImplementedError
+
+    def stream(self, processor, channels: int):
+        raise NotImplementedError
+
+
+class EqNode(EffectNode):
+    name = "eq"
+
+    def __init__(self, gains_db: Sequence[float]):
+        self.gains_db = list(gains_db)
+
+    @classmethod
+    def from_params(cls, params: dict, **options) -> "EqNode":
+        eq = EqV1.model_validate({"gains_db": [0.0] * BANDS, **params})
+        return cls(eq.gains_db)
+
+    def process(self, processor, src: np.ndarray, dst: np.ndarray) -> None:
+        # One zero-phase pass per band, across all channels at once; each band
+        # is scaled into one reused float32 scratch buffer and accumulated in place
+        dst.fill(0)
+        scratch = np.empty_like(dst)
+        for sos, gain_db in zip(processor.filter_bank(), self.gains_db):
+            if sos is None:
+                continue
+            np.multiply(signal.sosfiltfilt(sos, src, axis=0), 10 ** (gain_db / 20.0), out=scratch, casting="unsafe")
+            dst += scratch
+
+    def stream(self, processor, channels: int) -> FilterBankStream:
+        return FilterBankStream(processor.filter_bank(), self.gains_db, channels)
+
+
+class ReverbNode(EffectNode):
+    name = "reverb"
+
+    def __init__(self, gains_db: Sequence[float], decays_s: Sequence[float], mix: float,
+                 max_ir_s: Optional[float] = None, stereo: bool = True):
+        self.gains_db = list(gains_db)
+        self.decays_s = list(decays_s)
+        self.mix = mix
+        self.max_ir_s = max_ir_s  # truncate the IR (previews); None keeps full decays
+        self.stereo = stereo
+
+    @classmethod
+    def from_params(cls, params: dict, max_ir_s: Optional[float] = None, stereo: bool = True) -> "ReverbNode":
+        defaults = {"gains_db": [0.0] * BANDS, "decays_s": [1.0] * BANDS, "mix": 0.5}
+        reverb = ReverbV1.model_validate({**defaults, **params})
+        return cls(reverb.gains_db, reverb.decays_s, reverb.mix, max_ir_s, stereo)
+
+    def output_channels(self, channels: int) -> int:
+        # A mono source still gets a decorrelated stereo tail unless stereo is off
+        return max(2, channels) if self.stereo else channels
+
+    def process(self, processor, src: np.ndarray, dst: np.ndarray) -> None:
+        reverb = self.stream(processor, src.shape[1])
+        block_size = processor.block_size
+        for start in range(0, src.shape[0], block_size):
+            stop = start + block_size
+            dst[start:stop] = reverb.process_block(src[start:stop])
+
+    def process_from_stems(self, processor, src: np.ndarray, dst: np.ndarray, content_hash: str) -> None:
+        mix_reverb_stems(processor, src, content_hash, self.gains_db, self.decays_s, self.mix, dst)
+
+    def stream(self, processor, channels: int) -> ReverbStream:
+        # IR partition spectra come from the shared kernel cache
+        spectra = reverb_spectra(
+            processor.sample_rate, processor.frequency_bands, self.gains_db, self.decays_s,
+            self.output_channels(channels), processor.block_size, self.max_ir_s
+        )
+        return ReverbStream(None, self.mix, processor.block_size, spectra=spectra)
+
+
+NODE_TYPES = {node.name: node for node in (EqNode, ReverbNode)}
+
+
+class ChainStream:
+    """Block processor running every node's stream in order."""
+
+    def __init__(self, streams: List):
+        self.streams = streams
+
+    def process_block(self, block: np.ndarray) -> np.ndarray:
+        for stream in self.streams:
+            block = stream.process_block(block)
+        return block
+
+
+class EffectChain:
+    """
+    Ordered effect nodes executed in one planned pass.
+
+    Stages ping-pong between two preallocated float32 work buffers instead of
+    allocating per effect, and peak normalization runs once at the end of the
+    chain rather than after every effect.
+    """
+
+    def __init__(self, nodes: Sequence[EffectNode]):
+        self.nodes = list(nodes)
+
+    def __bool__(self) -> bool:
+        return bool(self.nodes)
+
+    def output_channels(self, channels: int) -> int:
+        for node in self.nodes:
+            channels = node.output_channels(channels)
+        return channels
+
+    def run(self, processor, audio: np.ndarray, content_hash: Optional[str] = None) -> np.ndarray:
+        """
+        Run the chain over a whole buffer and peak-normalize the result to 0.95.
+        With a content hash, a leading reverb is mixed from cached per-band stems.
+        """
+        audio = np.asarray(audio, dtype=np.float32)
+        if not self.nodes:
+            return audio
+        squeeze = audio.ndim == 1
+        if squeeze:
+            audio = audio[:, np.newaxis]
+
+        buffers: List[Optional[np.ndarray]] = [None, None]
+        src = audio
+        for i, node in enumerate(self.nodes):
+            shape = (audio.shape[0], node.output_channels(src.shape[1]))
+            dst = buffers[i % 2]
+            if dst is None or dst.shape != shape:
+                dst = buffers[i % 2] = np.empty(shape, dtype=np.float32)
+            with span(f"effect_{node.name}"):
+                if i == 0 and content_hash and isinstance(node, ReverbNode) and node.max_ir_s is None:
+                    node.process_from_stems(processor, src, dst, content_hash)
+                else:
+                    node.process(processor, src, dst)
+            src = dst
+
+        peak = np.max(np.abs(src))
+        if peak > 0:
+            src *= np.float32(0.95 / peak)
+        return src[:, 0] if squeeze and src.shape[1] == 1 else src
+
+    def stream(self, processor, channels: int) -> ChainStream:
+        streams = []
+        for node in self.nodes:
+            streams.append(node.stream(processor, channels))
+            channels = node.output_channels(channels)
+        return ChainStream(streams)
+
+
+def build_chain(effects_params: dict, **options) -> EffectChain:
+    """
+    Effect chain for a parameter dict such as Text2FxResponse.model_dump().
+
+    Effects run in the order given by an optional "chain" list, which must name
+    exactly the effects with parameters, otherwise in the dict's key order
+    with null effects skipped. `options` go to every node's from_params (e.g.
+    max_ir_s and stereo for preview renders).
+    """
+    supplied = [name for name in effects_params if name in NODE_TYPES and effects_params[name]]
+    order = effects_params.get("chain")
+    if order is None:
+        order = supplied
+    else:
+        for name in order:
+            if name not in NODE_TYPES:
+                raise ValueError(f"Unknown effect '{name}'")
+            if not effects_params.get(name):
+                raise ValueError(f"chain lists '{name}' but no parameters were given for it")
+        if len(set(order)) != len(order) or set(order) != set(supplied):
+            raise ValueError(f"chain must list each supplied effect once: {supplied}")
+    return EffectChain([NODE_TYPES[name].from_params(effects_params[name], **options) for name in order])
@@ -6,11 +6,90 @@ from dotenv import load_dotenv
 load_dotenv(override=True)
 
 class Settings(BaseModel):
+    # Logging: hot-path events are debug-level and only a sampled fraction is emitted
+    log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    log_sample_rate: float = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
     openai_base_url: str = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
     openai_model: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
     gen_temperature: float = float(os.getenv("GEN_TEMPERATURE", "0.1"))
     gen_max_tokens: int = int(os.getenv("GEN_MAX_TOKENS", "512"))
     request_timeout_s: int = int(os.getenv("REQUEST_TIMEOUT_S", "45"))
+    # Shared LLM HTTP client pool
+    llm_max_connections: int = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+    llm_max_keepalive: int = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+    llm_keepalive_expiry_s: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY_S", "30"))
+    llm_http2: bool = os.getenv("LLM_HTTP2", "1") not in ("0", "false", "False", "")
+    # Provider limiter: concurrent calls, token bucket (0 = unlimited), 429 retries
+    llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    llm_rate_per_s: float = float(os.getenv("LLM_RATE_PER_S", "0"))
+    llm_burst: int = int(os.getenv("LLM_BURST", "10"))
+    llm_max_retries: int = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    # LLM response cache (memory LRU in front of SQLite)
+    llm_cache_enabled: bool = os.getenv("LLM_CACHE_ENABLED", "1") not in ("0", "false", "False", "")
+    llm_cache_path: str = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite")
+    llm_cache_size: int = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+    llm_cache_ttl_s: float = float(os.getenv("LLM_CACHE_TTL_S", "3600"))
+    llm_cache_disk_ttl_s: float = float(os.getenv("LLM_CACHE_DISK_TTL_S", str(30 * 24 * 3600)))
+    # Local preset index: confident matches (cosine similarity 0..1, and the same content
+    # words up to plurals and typos) skip the LLM
+    preset_index_enabled: bool = os.getenv("PRESET_INDEX_ENABLED", "1") not in ("0", "false", "False", "")
+    preset_match_threshold: float = float(os.getenv("PRESET_MATCH_THRESHOLD", "0.75"))
+    preset_db_path: str = os.getenv("PRESET_DB_PATH", "presets.sqlite")
+    preset_max_entries: int = int(os.getenv("PRESET_MAX_ENTRIES", "5000"))
+    # Upload limits
+    upload_max_bytes: int = int(os.getenv("UPLOAD_MAX_BYTES", str(500 * 1024 * 1024)))
+    upload_max_duration_s: float = float(os.getenv("UPLOAD_MAX_DURATION_S", "3600"))
+    upload_chunk_size: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+    # Decoded PCM cache shared by render workers (0 bytes disables it)
+    decoded_cache_dir: str = os.getenv("DECODED_CACHE_DIR", "cache/decoded")
+    decoded_cache_max_bytes: int = int(os.getenv("DECODED_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+    # Per-band wet stems for incremental re-renders (0 bytes disables the cache)
+    stem_cache_dir: str = os.getenv("STEM_CACHE_DIR", "cache/stems")
+    stem_cache_max_bytes: int = int(os.getenv("STEM_CACHE_MAX_BYTES", str(4 * 1024 ** 3)))
+    # Only POST /render re-renders of sources up to this long use stems (~250 MB per stereo minute)
+    render_incremental_max_s: float = float(os.getenv("RENDER_INCREMENTAL_MAX_S", "60"))
+    # Reverb IRs, their partition spectra and EQ filter banks, shared by render workers.
+    # IR parameters are quantized to these steps so near-identical sets share one entry
+    kernel_cache_dir: str = os.getenv("KERNEL_CACHE_DIR", "cache/kernels")
+    kernel_cache_max_bytes: int = int(os.getenv("KERNEL_CACHE_MAX_BYTES", str(512 * 1024 ** 2)))
+    kernel_gain_step_db: float = float(os.getenv("KERNEL_GAIN_STEP_DB", "0.1"))
+    kernel_decay_step_s: float = float(os.getenv("KERNEL_DECAY_STEP_S", "0.01"))
+    # DSP render pool; 0 means "derive from os.cpu_count()"
+    render_workers: int = int(os.getenv("RENDER_WORKERS", "0"))
+    render_queue_depth: int = int(os.getenv("RENDER_QUEUE_DEPTH", "0"))
+    render_retry_after_s: int = int(os.getenv("RENDER_RETRY_AFTER_S", "5"))
+    # Import the DSP stack and run a tiny render in each worker at startup
+    render_prewarm: bool = os.getenv("RENDER_PREWARM", "1") not in ("0", "false", "False", "")
+    # Files longer than this render block by block with bounded memory
+    render_stream_threshold_s: float = float(os.getenv("RENDER_STREAM_THRESHOLD_S", "600"))
+    render_block_size: int = int(os.getenv("RENDER_BLOCK_SIZE", "8192"))
+    # Renders whose encoded output may exceed this come back through a temp file
+    # instead of being held in memory as bytes
+    render_in_memory_max_bytes: int = int(os.getenv("RENDER_IN_MEMORY_MAX_BYTES", str(32 * 1024 ** 2)))
+    # Disk storage manager: quotas (bytes) and TTLs (seconds) per area, 0 disables either
+    storage_db_path: str = os.getenv("STORAGE_DB_PATH", "storage.sqlite")
+    storage_sweep_interval_s: float = float(os.getenv("STORAGE_SWEEP_INTERVAL_S", "300"))
+    storage_uploads_max_bytes: int = int(os.getenv("STORAGE_UPLOADS_MAX_BYTES", str(20 * 1024 ** 3)))
+    storage_uploads_ttl_s: float = float(os.getenv("STORAGE_UPLOADS_TTL_S", str(7 * 24 * 3600)))
+    storage_outputs_max_bytes: int = int(os.getenv("STORAGE_OUTPUTS_MAX_BYTES", str(5 * 1024 ** 3)))
+    storage_outputs_ttl_s: float = float(os.getenv("STORAGE_OUTPUTS_TTL_S", str(24 * 3600)))
+    storage_cache_ttl_s: float = float(os.getenv("STORAGE_CACHE_TTL_S", str(7 * 24 * 3600)))
+    storage_pin_ttl_s: float = float(os.getenv("STORAGE_PIN_TTL_S", str(6 * 3600)))
+    jobs_db_path: str = os.getenv("JOBS_DB_PATH", "jobs.sqlite")
+    # Preview renders: a short excerpt at reduced rate/channels with a truncated IR
+    preview_duration_s: float = float(os.getenv("PREVIEW_DURATION_S", "10"))
+    preview_max_duration_s: float = float(os.getenv("PREVIEW_MAX_DURATION_S", "30"))
+    preview_sample_rate: int = int(os.getenv("PREVIEW_SAMPLE_RATE", "22050"))
+    preview_mono: bool = os.getenv("PREVIEW_MONO", "1") not in ("0", "false", "False", "")
+    preview_ir_max_s: float = float(os.getenv("PREVIEW_IR_MAX_S", "1.5"))
+    preview_cache_dir: str = os.getenv("PREVIEW_CACHE_DIR", "cache/previews")
+    preview_cache_max_bytes: int = int(os.getenv("PREVIEW_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    # WebSocket live monitoring: processing block, parameter crossfade, bound on the socket backlog
+    monitor_block_size: int = int(os.getenv("MONITOR_BLOCK_SIZE", "1024"))
+    monitor_crossfade_s: float = float(os.getenv("MONITOR_CROSSFADE_S", "0.05"))
+    monitor_max_buffer_s: float = float(os.getenv("MONITOR_MAX_BUFFER_S", "0.5"))
+    # Upper bound on files x instructions in one /process-batch request
+    batch_max_items: int = int(os.getenv("BATCH_MAX_ITEMS", "64"))
 
 settings = Settings()
@@ -0,0 +1,296 @@
+import numpy as np
+from fractions import Fraction
+from functools import lru_cache
+from scipy import fft, signal
+from typing import List, Optional, Sequence, Tuple
+
+# -60 dB expressed as a natural-log amplitude ratio: exp(-T60_LN * t / T60) hits -60 dB at t = T60
+T60_LN = 3.0 * np.log(10.0)
+
+
+def band_edges(frequency_bands: Sequence[float], sample_rate: int) -> List[Tuple[float, float]]:
+    """
+    Edges of each band: band 0 is everything below the first frequency, band i
+    spans frequency_bands[i-1]..frequency_bands[i], and the last band runs up
+    to Nyquist.
+    """
+    nyquist = sample_rate / 2
+    edges = []
+    for i in range(len(frequency_bands)):
+        low = 0.0 if i == 0 else float(frequency_bands[i - 1])
+        high = nyquist if i == len(frequency_bands) - 1 else float(frequency_bands[i])
+        edges.append((low, min(high, nyquist)))
+    return edges
+
+
+def design_band_sos(low: float, high: float, sample_rate: int, order: int = 4) -> Optional[np.ndarray]:
+    """
+    Butterworth band filter in second-order sections.
+    Uses a lowpass for a band starting at 0 Hz and a highpass for a band ending at
+    Nyquist. Returns None for a band that lies entirely above Nyquist.
+    """
+    nyquist = sample_rate / 2
+    if low >= nyquist or high <= low:
+        return None
+    if low <= 0:
+        return signal.butter(order, high, btype="lowpass", fs=sample_rate, output="sos")
+    if high >= nyquist:
+        return signal.butter(order, low, btype="highpass", fs=sample_rate, output="sos")
+    return signal.butter(order, [low, high], btype="bandpass", fs=sample_rate, output="sos")
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """Polyphase resampling along the frame axis, float32 in and out"""
+    if orig_sr == target_sr:
+        return audio
+    ratio = Fraction(target_sr, orig_sr)
+    out = signal.resample_poly(audio, ratio.numerator, ratio.denominator, axis=0)
+    return out.astype(np.float32, copy=False)
+
+
+class ResampleStream:
+    """
+    Polyphase resampler for block-by-block processing.
+
+    Uses the anti-aliasing FIR and alignment of `resample` (scipy's
+    resample_poly) and keeps the last input frames between blocks, so a
+    signal resampled block by block matches resampling it in one call. Blocks
+    may have any length; `flush` returns the frames still owed at the end.
+    """
+
+    def __init__(self, orig_sr: int, target_sr: int, channels: int):
+        ratio = Fraction(target_sr, orig_sr)
+        self.up, self.down = ratio.numerator, ratio.denominator
+        self.channels = channels
+        max_rate = max(self.up, self.down)
+        self._half_len = 10 * max_rate
+        h = signal.firwin(2 * self._half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0)) * self.up
+        self._taps = -(-len(h) // self.up)
+        h = np.pad(h, (0, self._taps * self.up - len(h)))
+        # Row p holds the taps for output phase p, reversed to dot with input frames in time order
+        self._phases = h.reshape(self._taps, self.up).T[:, ::-1].astype(np.float32)
+        self._history = np.zeros((self._taps - 1, channels), dtype=np.float32)
+        self._start = 1 - self._taps  # input index of _history[0]; earlier frames are zeros
+        self._frames_in = 0
+        self._frames_out = 0
+
+    def _emit(self, buffer: np.ndarray, stop: int) -> np.ndarray:
+        """Output frames _frames_out..stop from `buffer`, which starts at input index _start"""
+        if stop <= self._frames_out:
+            return np.zeros((0, buffer.shape[1]), dtype=np.float32)
+        k = np.arange(self._frames_out, stop)
+        m = k * self.down + self._half_len  # output k sits at upsampled index m
+        last = m // self.up  # newest input frame contributing to it
+        windows = np.lib.stride_tricks.sliding_window_view(buffer, self._taps, axis=0)
+        out = np.einsum("kct,kt->kc", windows[last - (self._taps - 1) - self._start], self._phases[m - last * self.up])
+        self._frames_out += len(k)
+        return out.astype(np.float32, copy=False)
+
+    def process_block(self, block: np.ndarray) -> np.ndarray:
+        """Resample (frames, channels); returns every output frame whose inputs have all arrived"""
+        buffer = np.concatenate([self._history, block])
+        self._frames_in += block.shape[0]
+        end = self._start + buffer.shape[0]
+        out = self._emit(buffer, -(-(end * self.up - self._half_len) // self.down))
+        self._history = buffer[-(self._taps - 1):]
+        self._start = end - (self._taps - 1)
+        return out
+
+    def flush(self) -> np.ndarray:
+        """Remaining output frames, treating the signal as zero after the last block"""
+        buffer = np.concatenate([self._history, np.zeros((self._taps + 1, self._history.shape[1]), np.float32)])
+        return self._emit(buffer, -(-self._frames_in * self.up // self.down))
+
+
+@lru_cache(maxsize=32)
+def filter_bank(sample_rate: int, frequency_bands: Tuple[float, ...], order: int = 4) -> Tuple[Optional[np.ndarray], ...]:
+    """
+    Second-order-section filters for every band, designed once per
+    (sample_rate, bands, order). Entries are None for bands above Nyquist.
+    The arrays are shared between callers and must not be modified.
+    """
+    return tuple(
+        design_band_sos(low, high, sample_rate, order)
+        for low, high in band_edges(frequency_bands, sample_rate)
+    )
+
+
+@lru_cache(maxsize=4)
+def band_ir_components(
+    sample_rate: int,
+    frequency_bands: Tuple[float, ...],
+    decays_s: Tuple[float, ...],
+    channels: int = 2,
+    seed: int = 0,
+    max_length_s: Optional[float] = None,
+) -> Tuple[Tuple[Optional[np.ndarray], ...], float]:
+    """
+    Unit-gain reverb IR of every band, shape (samples, channels) each, plus the
+    scale that gives the 0 dB-everywhere IR unit energy.
+
+    Each band is exponentially decaying noise limited to that band, cut off once
+    it reaches -60 dB at its decay time. Channels use independent noise so the
+    tail is decorrelated. The noise for a given seed does not depend on the IR
+    length, so a band's component depends only on its own decay.
+    Entries are None for bands above Nyquist. The arrays are shared between
+    callers and must not be modified.
+    """
+    lengths = [
+        max(1, int(np.ceil(min(decay, max_length_s or decay) * sample_rate)))
+        for decay in decays_s
+    ]
+    length = max(lengths)
+    rng = np.random.default_rng(seed)
+    noise = rng.standard_normal((length, channels)).astype(np.float32)
+    t = np.arange(length, dtype=np.float32) / np.float32(sample_rate)
+
+    components = []
+    flat = np.zeros((length, channels), dtype=np.float32)
+    for sos, decay, n in zip(filter_bank(sample_rate, frequency_bands), decays_s, lengths):
+        if sos is None:
+            components.append(None)
+            continue
+        band = signal.sosfilt(sos, noise[:n], axis=0).astype(np.float32, copy=False)
+        band *= np.exp(-T60_LN * t[:n] / np.float32(decay))[:, None]
+        flat[:n] += band
+        components.append(band)
+
+    # Energy of the IR with every band at 0 dB, averaged over channels
+    reference_energy = float(np.sum(flat * flat)) / channels
+    scale = 1.0 / np.sqrt(reference_energy) if reference_energy > 0 else 1.0
+    return tuple(components), scale
+
+
+def synthesize_ir(
+    sample_rate: int,
+    frequency_bands: Sequence[float],
+    gains_db: Sequence[float],
+    decays_s: Sequence[float],
+    channels: int = 2,
+    seed: int = 0,
+    max_length_s: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Build a multi-band reverb impulse response of shape (samples, channels).
+
+    The sum of the band components from `band_ir_components`, each scaled by its
+    gain. 0 dB in every band gives unit energy, so gains stay meaningful relative
+    to the dry signal.
+    """
+    components, scale = band_ir_components(
+        sample_rate, tuple(frequency_bands), tuple(float(d) for d in decays_s),
+        channels, seed, max_length_s
+    )
+    length = max((len(c) for c in components if c is not None), default=1)
+    ir = np.zeros((length, channels), dtype=np.float32)
+    for component, gain_db in zip(components, gains_db):
+        if component is not None:
+            ir[:len(component)] += np.float32(10 ** (gain_db / 20.0)) * component
+    ir *= np.float32(scale)
+    return ir
+
+
+def partition_spectra(ir: np.ndarray, block_size: int) -> np.ndarray:
+    """
+    Spectra of an IR split into `block_size` partitions, each zero-padded to
+    2 * block_size: complex64 of shape (partitions, block_size + 1, channels).
+    """
+    ir = np.asarray(ir, dtype=np.float32)
+    if ir.ndim == 1:
+        ir = ir[:, None]
+    n_parts = max(1, -(-ir.shape[0] // block_size))
+    padded = np.zeros((n_parts * block_size, ir.shape[1]), dtype=np.float32)
+    padded[: ir.shape[0]] = ir
+    parts = padded.reshape(n_parts, block_size, ir.shape[1])
+    return fft.rfft(parts, n=2 * block_size, axis=1).astype(np.complex64, copy=False)
+
+
+class PartitionedConvolver:
+    """
+    Uniformly partitioned FFT convolution (overlap-save with a frequency-domain
+    delay line).
+
+    The IR is split into `block_size` partitions whose spectra are computed once.
+    Each input block costs one forward and one inverse FFT plus a multiply-add
+    across partitions, and memory stays O(block_size + IR length) however long
+    the signal is. State carries across `process_block` calls, so the same
+    object can filter a file in one go or a stream block by block; every block
+    except the last must be exactly `block_size` frames.
+    """
+
+    def __init__(self, ir: Optional[np.ndarray], block_size: int = 8192, spectra: Optional[np.ndarray] = None):
+        # Precomputed `spectra` (from partition_spectra, e.g. the kernel cache) replace the IR
+        self.block_size = block_size
+        self._spectra = partition_spectra(ir, block_size) if spectra is None else spectra
+        if self._spectra.shape[1] != block_size + 1:
+            raise ValueError(f"Spectra were partitioned for a different block size than {block_size}")
+        self.channels = self._spectra.shape[2]
+        self._fdl = np.zeros(self._spectra.shape, dtype=np.complex64)
+        self._window = np.zeros((2 * block_size, self.channels), dtype=np.float32)
+
+    def reset(self) -> None:
+        self._fdl.fill(0)
+        self._window.fill(0)
+
+    def process_block(self, block: np.ndarray) -> np.ndarray:
+        """Convolve one block of at most `block_size` frames, shape (frames, channels)."""
+        n = block.shape[0]
+        B = self.block_size
+        # Slide the 2B input window by one block
+        self._window[:B] = self._window[B:]
+        self._window[B:B + n] = block
+        self._window[B + n:] = 0
+
+        self._fdl[1:] = self._fdl[:-1]
+        self._fdl[0] = fft.rfft(self._window, axis=0)
+        spectrum = np.einsum("pfc,pfc->fc", self._fdl, self._spectra)
+        out = fft.irfft(spectrum, n=2 * B, axis=0)[B:B + n]
+        return out.astype(np.float32, copy=False)
+
+    def process(self, audio: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Convolve a whole (frames, channels) buffer; output has the input's length."""
+        if out is None:
+            out = np.empty((audio.shape[0], self.channels), dtype=np.float32)
+        for start in range(0, audio.shape[0], self.block_size):
+            stop = min(start + self.block_size, audio.shape[0])
+            out[start:stop] = self.process_block(audio[start:stop])
+        return out
+
+
+class FilterBankStream:
+    """
+    Causal multi-band EQ for block-by-block processing.
+
+    Each band keeps its sosfilt state between blocks, so splitting a signal into
+    blocks gives the same output as filtering it in one call. Unlike the offline
+    `sosfiltfilt` path this is not zero-phase, since that needs the whole signal.
+    """
+
+    def __init__(self, bank: Sequence[Optional[np.ndarray]], gains_db: Sequence[float], channels: int):
+        self._bands = []
+        for sos, gain_db in zip(bank, gains_db):
+            if sos is None:
+                continue
+            zi = np.zeros((sos.shape[0], 2, channels))
+            self._bands.append((sos, np.float32(10 ** (gain_db / 20.0)), zi))
+
+    def process_block(self, block: np.ndarray) -> np.ndarray:
+        out = np.zeros(block.shape, dtype=np.float32)
+        for sos, gain, zi in self._bands:
+            band, zi[...] = signal.sosfilt(sos, block, axis=0, zi=zi)
+            out += gain * band
+        return out
+
+
+class ReverbStream:
+    """Convolution reverb with wet/dry mix for block-by-block processing."""
+
+    def __init__(self, ir: Optional[np.ndarray], mix: float, block_size: int, spectra: Optional[np.ndarray] = None):
+        self.convolver = PartitionedConvolver(ir, block_size, spectra)
+        self.mix = np.float32(mix)
+
+    def process_block(self, block: np.ndarray) -> np.ndarray:
+        out = self.convolver.process_block(block)
+        out *= self.mix
+        out += (np.float32(1.0) - self.mix) * block
+        return out
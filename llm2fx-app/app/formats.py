@@ -0,0 +1,38 @@
+from dataclasses import dataclass
+
+import soundfile as sf
+
+_SAMPLE_BYTES = {"PCM_16": 2, "PCM_24": 3, "FLOAT": 4}
+
+
+@dataclass(frozen=True)
+class OutputFormat:
+    name: str
+    format: str   # soundfile major format
+    subtype: str  # soundfile subtype
+    media_type: str
+    suffix: str
+
+    def estimated_size(self, frames: float, channels: int) -> int:
+        """Upper bound on the encoded size in bytes; compressed subtypes count as 16-bit PCM"""
+        return int(frames * channels * _SAMPLE_BYTES.get(self.subtype, 2)) + 1024  # + header
+
+
+# Client-facing name -> (soundfile format, default subtype, allowed subtypes, media type)
+OUTPUT_FORMATS = {
+    "wav": ("WAV", "PCM_16", ("PCM_16", "PCM_24", "FLOAT"), "audio/wav"),
+    "flac": ("FLAC", "PCM_16", ("PCM_16", "PCM_24"), "audio/flac"),
+    "ogg": ("OGG", "VORBIS", ("VORBIS",), "audio/ogg"),
+}
+
+
+def resolve_output_format(name: str = "wav", subtype: str | None = None) -> OutputFormat:
+    """Validated output encoding; raises ValueError for an unknown format or subtype."""
+    name = name.lower()
+    if name not in OUTPUT_FORMATS:
+        raise ValueError(f"format must be one of {sorted(OUTPUT_FORMATS)}")
+    sf_format, default_subtype, subtypes, media_type = OUTPUT_FORMATS[name]
+    subtype = (subtype or default_subtype).upper()
+    if subtype not in subtypes or not sf.check_format(sf_format, subtype):
+        raise ValueError(f"subtype for {name} must be one of {list(subtypes)}")
+    return OutputFormat(name=name, format=sf_format, subtype=subtype, media_type=media_type, suffix=f".{name}")
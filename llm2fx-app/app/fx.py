@@ -0,0 +1,101 @@
+import asyncio
+
+from .schemas import Text2FxRequest, Text2FxResponse, ReverbV1, EqV1, BANDS
+from .prompts import build_messages, PROMPT_VERSION
+from .llm import call_openai_chat, parse_json_safe
+from .cache import response_cache
+from .config import settings
+from .logger import logger, log_sampled
+from .metrics import span
+from .presets import preset_index
+
+def to_response(raw: dict) -> Text2FxResponse:
+    """Normalize a model reply to the reverb_v1 schema, filling and clamping values."""
+    # fill missing keys with safe defaults
+    reverb = raw.get("reverb", {})
+    gains = list(reverb.get("gains_db", [0.0]*BANDS))
+    decays = list(reverb.get("decays_s", [1.0]*BANDS))
+    mix = float(reverb.get("mix", 0.25))
+
+    # enforce exact length
+    gains = (gains + [0.0]*BANDS)[:BANDS]
+    decays = (decays + [1.0]*BANDS)[:BANDS]
+
+    rv = ReverbV1(gains_db=gains, decays_s=decays, mix=mix)
+    eq = None
+    if raw.get("eq"):
+        eq_gains = list(raw["eq"].get("gains_db", [0.0]*BANDS))
+        eq = EqV1(gains_db=(eq_gains + [0.0]*BANDS)[:BANDS])
+    return Text2FxResponse(
+        schema_version="reverb_v1",
+        reverb=rv,
+        eq=eq,
+        reason=(raw.get("reason") or None)
+    )
+
+async def generate_fx_response(req: Text2FxRequest) -> Text2FxResponse:
+    """
+    Return validated effect parameters for a request, from cache when possible.
+
+    Exact repeats come from the response cache; instructions close enough to
+    a curated or previously validated preset are answered from the local
+    preset index; only novel ones go to the LLM.
+    Raises ValueError if the provider fails or the reply cannot be validated.
+    """
+    key = response_cache.make_key(
+        req.fx_type, req.instrument, req.instruction, settings.openai_model, PROMPT_VERSION
+    )
+    # SQLite reads and commits run off the event loop
+    cached = await asyncio.to_thread(response_cache.get, key)
+    if cached is not None:
+        return Text2FxResponse.model_validate(cached)
+
+    with span("presets"):
+        match = await asyncio.to_thread(preset_index.match, req.instrument, req.instruction)
+    if match is not None:
+        payload, score, preset = match
+        log_sampled("preset_match", {"score": round(score, 3), "preset": preset})
+        return to_response(payload)
+
+    messages = build_messages(req.fx_type, req.instruction, req.instrument)
+
+    # 1st attempt
+    with span("llm"):
+        raw_text = await call_openai_chat(messages, force_json=True)
+    with span("parse"):
+        raw = parse_json_safe(raw_text)
+
+    # retry once if not JSON
+    if raw is None:
+        logger.warning("invalid_json_first_try", extra={"extra": {"len": len(raw_text)}})
+        messages[-1]["content"] += "\nRespond with JSON only."
+        with span("llm"):
+            raw_text = await call_openai_chat(messages, force_json=True)
+        with span("parse"):
+            raw = parse_json_safe(raw_text)
+        if raw is None:
+            logger.error("invalid_json_second_try", extra={"extra": {"len": len(raw_text)}})
+            raise ValueError("Model returned non-JSON twice")
+
+    # Normalize & validate to schema
+    try:
+        with span("validate"):
+            resp = to_response(raw)
+    except Exception as e:
+        logger.exception("validation_error")
+        raise ValueError(f"Validation failed: {e}")
+
+    await asyncio.to_thread(_remember, key, req, resp.model_dump())
+    return resp
+
+def _remember(key: str, req: Text2FxRequest, payload: dict) -> None:
+    response_cache.put(key, payload)
+    preset_index.add(req.instrument, req.instruction, payload)
+
+async def generate_fx_params(req: Text2FxRequest) -> dict:
+    """
+    Effect parameters for a request as a plain dict, ready for the render pool.
+    Raises ValueError if the provider fails or the reply cannot be validated.
+    """
+    resp = await generate_fx_response(req)
+    return resp.model_dump()
@@ -0,0 +1,118 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    fx_type TEXT NOT NULL,
+    instrument TEXT NOT NULL,
+    instruction TEXT NOT NULL,
+    input_path TEXT NOT NULL,
+    input_filename TEXT NOT NULL,
+    output_path TEXT,
+    params TEXT,
+    stages TEXT NOT NULL DEFAULT '{}',
+    options TEXT,
+    error TEXT
+)
+"""
+
+# Columns added after the first release, created on open for older databases
+_MIGRATIONS = {
+    "options": "ALTER TABLE jobs ADD COLUMN options TEXT",
+}
+
+_JSON_COLUMNS = ("params", "stages", "options")
+
+
+class JobStore:
+    """SQLite-backed table of render jobs, so queued work survives a restart."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(_SCHEMA)
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column, ddl in _MIGRATIONS.items():
+                if column not in columns:
+                    self._conn.execute(ddl)
+            self._conn.commit()
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def create(self, *, fx_type: str, instrument: str, instruction: str,
+               input_path: str, input_filename: str, options: dict | None = None,
+               job_id: str | None = None) -> str:
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT INTO jobs (id, status, created_at, updated_at, fx_type, instrument,"
+                " instruction, input_path, input_filename, options)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, now, now, fx_type, instrument, instruction,
+                 input_path, input_filename, json.dumps(options or {})),
+            )
+            db.commit()
+        return job_id
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        if not fields:
+            return
+        fields["updated_at"] = time.time()
+        for key in _JSON_COLUMNS:
+            if key in fields and fields[key] is not None:
+                fields[key] = json.dumps(fields[key])
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._lock:
+            db = self._db()
+            db.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            db.commit()
+
+    def unfinished(self) -> list[dict]:
+        """Jobs that were queued or mid-render, oldest first."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (JOB_QUEUED, JOB_RUNNING),
+            ).fetchall()
+        return [_row_to_job(row) for row in rows]
+
+
+def _row_to_job(row: sqlite3.Row) -> dict:
+    job = dict(row)
+    for key in _JSON_COLUMNS:
+        job[key] = json.loads(job[key]) if job[key] else None
+    job["stages"] = job["stages"] or {}
+    job["options"] = job["options"] or {}
+    return job
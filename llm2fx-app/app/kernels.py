@@ -0,0 +1,81 @@
+import hashlib
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from .audio_cache import ArrayCache
+from .config import settings
+from .dsp import filter_bank, partition_spectra, synthesize_ir
+
+kernel_cache = ArrayCache(settings.kernel_cache_dir, settings.kernel_cache_max_bytes, name="kernels")
+
+
+def quantize(values: Sequence[float], step: float) -> Tuple[float, ...]:
+    """Round every value to a multiple of `step` (no-op for step <= 0)"""
+    if step <= 0:
+        return tuple(float(v) for v in values)
+    return tuple(round(round(float(v) / step) * step, 6) for v in values)
+
+
+def _key(kind: str, *parts) -> str:
+    raw = ":".join([kind, *(repr(p) for p in parts)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def reverb_ir(sample_rate: int, frequency_bands: Sequence[float], gains_db: Sequence[float],
+              decays_s: Sequence[float], channels: int = 2, max_length_s: Optional[float] = None) -> np.ndarray:
+    """
+    Reverb IR for parameters quantized to the configured resolution, shape
+    (samples, channels), read-only.
+
+    Gains and decays are rounded before synthesis, so every parameter set
+    that quantizes alike shares one IR file across requests and workers.
+    """
+    gains = quantize(gains_db, settings.kernel_gain_step_db)
+    decays = quantize(decays_s, settings.kernel_decay_step_s)
+    key = _key("ir", sample_rate, tuple(frequency_bands), gains, decays, channels, max_length_s)
+    ir = kernel_cache.get(key)
+    if ir is None:
+        ir = synthesize_ir(sample_rate, frequency_bands, gains, decays, channels=channels, max_length_s=max_length_s)
+        ir = kernel_cache.put(key, ir)
+    return ir
+
+
+def reverb_spectra(sample_rate: int, frequency_bands: Sequence[float], gains_db: Sequence[float],
+                   decays_s: Sequence[float], channels: int, block_size: int,
+                   max_length_s: Optional[float] = None) -> np.ndarray:
+    """Partition spectra of `reverb_ir` for a PartitionedConvolver of `block_size`, read-only"""
+    gains = quantize(gains_db, settings.kernel_gain_step_db)
+    decays = quantize(decays_s, settings.kernel_decay_step_s)
+    key = _key("spectra", sample_rate, tuple(frequency_bands), gains, decays, channels, max_length_s, block_size)
+    spectra = kernel_cache.get(key)
+    if spectra is None:
+        ir = reverb_ir(sample_rate, frequency_bands, gains, decays, channels, max_length_s)
+        spectra = kernel_cache.put(key, partition_spectra(ir, block_size))
+    return spectra
+
+
+@lru_cache(maxsize=32)
+def eq_filter_bank(sample_rate: int, frequency_bands: Tuple[float, ...], order: int = 4) -> Tuple[Optional[np.ndarray], ...]:
+    """
+    Band filters like dsp.filter_bank, designed once per (rate, bands, order)
+    across all workers: the first process to need a bank stores it stacked
+    (bands, sections, 6) with NaN rows for bands above Nyquist, and the rest
+    map that file instead of redesigning it.
+    """
+    key = _key("sos", sample_rate, frequency_bands, order)
+    stacked = kernel_cache.get(key)
+    if stacked is None:
+        bank = filter_bank(sample_rate, frequency_bands, order)
+        sections = max((sos.shape[0] for sos in bank if sos is not None), default=1)
+        stacked = np.full((len(bank), sections, 6), np.nan)
+        for i, sos in enumerate(bank):
+            if sos is not None:
+                stacked[i, :sos.shape[0]] = sos
+        stacked = kernel_cache.put(key, stacked)
+    bank = []
+    for rows in stacked:
+        valid = ~np.isnan(rows[:, 0])
+        bank.append(np.asarray(rows[valid]) if valid.any() else None)
+    return tuple(bank)
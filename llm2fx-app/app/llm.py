@@ -1,7 +1,9 @@
-import json, httpx
+import asyncio, hashlib, json, httpx
 import os
+import time
 from .config import settings
-from .logger import logger
+from .logger import logger, log_sampled
+from .metrics import LLM_REQUESTS, LLM_TOKENS
 
 # Fix SSL certificate issues on macOS
 try:
@@ -11,12 +13,129 @@ try:
 except ImportError:
     pass
 
+# One pooled client per process, opened/closed by the FastAPI lifespan
+_client: httpx.AsyncClient | None = None
+
+def _http2_enabled() -> bool:
+    if not settings.llm_http2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("http2_unavailable", extra={"extra": {"hint": "pip install 'httpx[http2]'"}})
+        return False
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared LLM client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=settings.request_timeout_s,
+            http2=_http2_enabled(),
+            limits=httpx.Limits(
+                max_connections=settings.llm_max_connections,
+                max_keepalive_connections=settings.llm_max_keepalive,
+                keepalive_expiry=settings.llm_keepalive_expiry_s,
+            ),
+        )
+    return _client
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+class ProviderLimiter:
+    """
+    Caps concurrent provider calls and smooths them with a token bucket.
+    Callers over the limit wait their turn instead of failing.
+    """
+
+    def __init__(self, max_concurrency: int, rate_per_s: float, burst: int):
+        self.max_concurrency = max_concurrency
+        self.rate_per_s = rate_per_s
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _sem(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def _take_token(self) -> None:
+        if self.rate_per_s <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_s)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate_per_s)
+
+    async def __aenter__(self) -> None:
+        await self._sem().acquire()
+        try:
+            await self._take_token()
+        except BaseException:
+            self._sem().release()
+            raise
+
+    async def __aexit__(self, *exc) -> None:
+        self._sem().release()
+
+_limiter = ProviderLimiter(
+    max_concurrency=settings.llm_max_concurrency,
+    rate_per_s=settings.llm_rate_per_s,
+    burst=settings.llm_burst,
+)
+
+# Identical in-flight requests share one upstream call
+_inflight: dict[str, asyncio.Task] = {}
+
+def _request_key(messages: list[dict], force_json: bool) -> str:
+    blob = json.dumps([messages, force_json, settings.openai_model], sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def _retry_delay(resp: httpx.Response, attempt: int) -> float:
+    try:
+        return max(0.0, float(resp.headers.get("retry-after", "")))
+    except ValueError:
+        return min(8.0, 0.5 * 2 ** attempt)
+
 async def call_openai_chat(messages: list[dict], *, force_json: bool = True) -> str:
     """
     Calls OpenAI Chat Completions API.
+    Concurrent calls with identical messages share a single upstream request.
     Returns assistant message content as string.
-    Raises httpx.HTTPError on transport errors.
+    Raises ValueError on provider or transport errors.
     """
+    key = _request_key(messages, force_json)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_call_openai_chat(messages, force_json=force_json))
+        _inflight[key] = task
+        task.add_done_callback(lambda t: _forget_inflight(key, t))
+    else:
+        log_sampled("openai_request_coalesced", {"key": key[:12]})
+    # Shield so one caller disconnecting does not cancel the call for the others
+    return await asyncio.shield(task)
+
+def _forget_inflight(key: str, task: asyncio.Task) -> None:
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    if not task.cancelled():
+        task.exception()  # mark retrieved even if every waiter went away
+
+async def _call_openai_chat(messages: list[dict], *, force_json: bool = True) -> str:
     # Validate API key
     if not settings.openai_api_key:
         raise ValueError("OpenAI API key not found. Please set the OPENAI_API_KEY environment variable.")
@@ -42,34 +161,30 @@ async def call_openai_chat(messages: list[dict], *, force_json: bool = True) ->
     base_url = settings.openai_base_url.rstrip("/")
     url = f"{base_url}/chat/completions"
     
-    # Debug: Print the request details
-    logger.info("openai_request", extra={
-        "extra": {
-            "model": settings.openai_model,
-            "base_url": settings.openai_base_url,
-            "constructed_url": url,
-            "api_key_prefix": settings.openai_api_key[:10] + "...",
-            "messages_count": len(messages)
-        }
-    })
+    log_sampled("openai_request", {"model": settings.openai_model, "messages_count": len(messages)})
     
     try:
-        async with httpx.AsyncClient(timeout=settings.request_timeout_s) as client:
-            resp = await client.post(url, headers=headers, json=body)
-            
-            # Debug: Log the response status and headers
-            logger.info("openai_response_received", extra={
-                "extra": {
-                    "status_code": resp.status_code,
-                    "headers": dict(resp.headers)
-                }
-            })
-            
-            resp.raise_for_status()
-            data = resp.json()
-            out = data["choices"][0]["message"]["content"]
-            logger.info("openai_response", extra={"extra": {"usage": data.get("usage", {})}})
-            return out
+        for attempt in range(settings.llm_max_retries + 1):
+            async with _limiter:
+                resp = await get_client().post(url, headers=headers, json=body)
+            LLM_REQUESTS.inc(status=resp.status_code)
+            if resp.status_code != 429 or attempt == settings.llm_max_retries:
+                break
+            # Rate limited: wait and queue again rather than failing the caller
+            delay = _retry_delay(resp, attempt)
+            logger.warning("openai_rate_limit_retry", extra={"extra": {"attempt": attempt + 1, "delay_s": delay}})
+            await asyncio.sleep(delay)
+
+        resp.raise_for_status()
+        data = resp.json()
+        out = data["choices"][0]["message"]["content"]
+        usage = data.get("usage") or {}
+        for kind in ("prompt", "completion"):
+            LLM_TOKENS.inc(usage.get(f"{kind}_tokens", 0), type=kind)
+        log_sampled("openai_response", {
+            "status_code": resp.status_code, "http_version": resp.http_version, "usage": usage
+        })
+        return out
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 401:
             logger.error("openai_auth_error", extra={"extra": {"status": e.response.status_code}})
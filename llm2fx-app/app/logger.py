@@ -1,4 +1,6 @@
-import logging, sys, json, time
+import logging, sys, json, time, random
+
+from .config import settings
 
 class JsonFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
@@ -23,4 +25,10 @@ def setup_logging(level: int = logging.INFO) -> logging.Logger:
     logger.propagate = False
     return logger
 
-logger = setup_logging()
+def log_sampled(event: str, fields: dict | None = None, rate: float | None = None) -> None:
+    """Debug-level event for hot paths, emitted for a random fraction `rate` of calls."""
+    rate = settings.log_sample_rate if rate is None else rate
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < rate:
+        logger.debug(event, extra={"extra": {**(fields or {}), "sample_rate": rate}})
+
+logger = setup_logging(logging.getLevelName(settings.log_level.upper()))
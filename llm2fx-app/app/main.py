@@ -1,16 +1,41 @@
-from fastapi import FastAPI, HTTPException, File, UploadFile, Form
-from fastapi.responses import JSONResponse, FileResponse, HTMLResponse
+import time
+_STARTED_AT = time.perf_counter()  # startup time is logged from here
+
+from fastapi import FastAPI, HTTPException, File, UploadFile, Form, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, FileResponse, HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from pydantic import ValidationError
+import aiofiles
+import asyncio
+import json
+import re
 import os
-import shutil
+import uuid
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import AsyncIterator, List
+from urllib.parse import quote
 from dotenv import load_dotenv
-from .schemas import Text2FxRequest, Text2FxResponse, ReverbV1, BANDS
-from .prompts import build_messages
-from .llm import call_openai_chat, parse_json_safe
-from .logger import logger
-from .audio_processor import process_audio_with_effects
+from .schemas import Text2FxRequest, Text2FxResponse, JobStatus, RenderRequest
+from .llm import get_client, close_client
+from .logger import logger, log_sampled
+from .metrics import BYTES_OUT, HTTP_SECONDS, render_prometheus, span
+# DSP modules load in the render workers, not here; see app/tasks.py
+from .tasks import compute_overview, process_audio_with_effects, render_preview, render_to_bytes
+from .render import render_engine, RenderQueueFull, RenderWorkerLost
+from .config import settings
+from .fx import generate_fx_params, generate_fx_response
+from .cache import response_cache
+from .presets import preset_index
+from .jobs import JobStore, JOB_RUNNING, JOB_DONE, JOB_FAILED
+from .storage import StorageManager, default_areas
+from .uploads import (save_upload, find_upload, probe_info, StoredUpload, UploadRejected, UploadBodyLimit,
+                      FORM_OVERHEAD_BYTES)
+from .batch import BatchItem, stream_zip
+from .formats import OutputFormat, resolve_output_format
+from .overview import load_overview, select_levels
+from .preview import PreviewOptions, cache_preview, get_cached_preview, preview_key
 
 load_dotenv(override=True)
 
@@ -27,11 +52,83 @@ if api_key:
 else:
     print("❌ No OpenAI API key found in environment variables")
 
-app = FastAPI(title="LLM2Fx App", version="0.1.0")
+job_store = JobStore(settings.jobs_db_path)
+storage = StorageManager(settings.storage_db_path, default_areas(UPLOAD_DIR), pin_ttl_s=settings.storage_pin_ttl_s)
+_job_tasks: set[asyncio.Task] = set()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_client()
+    render_engine.start()
+    # Pick up jobs that were queued or mid-render when the process last stopped
+    for job in await asyncio.to_thread(job_store.unfinished):
+        _schedule_job(job["id"])
+    prewarm_task = asyncio.create_task(_start_render_workers()) if settings.render_prewarm else None
+    # Started after the resumed jobs, which pin their inputs before the first sweep
+    sweeper = asyncio.create_task(storage.run(settings.storage_sweep_interval_s)) \
+        if settings.storage_sweep_interval_s > 0 else None
+    logger.info("startup_complete", extra={"extra": {
+        "startup_s": round(time.perf_counter() - _STARTED_AT, 3), "prewarm": settings.render_prewarm
+    }})
+    yield
+    for task in (prewarm_task, sweeper):
+        if task is not None:
+            task.cancel()
+    for task in list(_job_tasks):
+        task.cancel()
+    await asyncio.gather(*_job_tasks, return_exceptions=True)
+    render_engine.shutdown()
+    job_store.close()
+    response_cache.close()
+    preset_index.close()
+    storage.close()
+    await close_client()
+
+async def _start_render_workers() -> None:
+    """
+    Bring the render workers up in the background with a no-op job; the pool
+    initializer prewarms each one as it starts, so the first real request pays
+    neither DSP imports nor filter design. The server answers requests (and
+    /healthz) while this runs.
+    """
+    started = time.perf_counter()
+    try:
+        await render_engine.run(os.getpid)
+    except Exception as e:
+        logger.warning("prewarm_failed", extra={"extra": {"error": str(e)}})
+        return
+    logger.info("prewarm_complete", extra={"extra": {
+        "seconds": round(time.perf_counter() - started, 3),
+        "since_start_s": round(time.perf_counter() - _STARTED_AT, 3),
+    }})
+
+app = FastAPI(title="LLM2Fx App", version="0.1.0", lifespan=lifespan)
 
 # Mount static files for frontend
 app.mount("/static", StaticFiles(directory="frontend"), name="static")
 
+# Refuse oversized uploads before the form is parsed and spooled
+_upload_limit = settings.upload_max_bytes + FORM_OVERHEAD_BYTES
+app.add_middleware(UploadBodyLimit, limits={
+    "/process-audio": _upload_limit,
+    "/jobs": _upload_limit,
+    "/process-batch": settings.upload_max_bytes * settings.batch_max_items + FORM_OVERHEAD_BYTES,
+})
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # Time to response headers; streamed bodies continue after this returns
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_SECONDS.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=response.status_code,
+    )
+    return response
+
 @app.get("/healthz")
 async def healthz():
     return {"ok": True}
@@ -49,113 +146,639 @@ async def process_audio(
     file: UploadFile = File(...),
     instrument: str = Form(...),
     fx_type: str = Form(...),
-    instruction: str = Form(...)
+    instruction: str = Form(...),
+    sample_rate: int | None = Form(None),
+    format: str = Form("wav"),
+    subtype: str | None = Form(None),
+    preview: bool = Form(False),
+    preview_start_s: float = Form(0.0),
+    preview_duration_s: float | None = Form(None),
+    preview_mono: bool | None = Form(None)
 ):
-    """Process uploaded audio file with AI-generated effects"""
+    """
+    Process uploaded audio file with AI-generated effects
+    
+    With preview=true only a short excerpt is rendered, at reduced quality,
+    for auditioning; accept it by re-rendering the X-Source-Id via POST /render.
+    """
+    _check_sample_rate(sample_rate)
+    output_format = _output_format(format, subtype)
+    preview_options = _preview_options(preview_start_s, preview_duration_s, preview_mono) if preview else None
     try:
-        # Save uploaded file
-        file_location = UPLOAD_DIR / file.filename
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Get effects parameters from LLM
         fx_request = Text2FxRequest(
             instrument=instrument,
             fx_type=fx_type,
             instruction=instruction
         )
         
-        # Call the existing text2fx endpoint logic
-        messages = build_messages(fx_request.fx_type, fx_request.instruction, fx_request.instrument)
+        # Save uploaded file under its content hash
+        stored = await _store_upload(file)
         
-        raw_text = await call_openai_chat(messages, force_json=True)
-        raw = parse_json_safe(raw_text)
-        
-        if raw is None:
-            raise HTTPException(status_code=502, detail="Failed to generate effects parameters")
+        # Get effects parameters from LLM
+        try:
+            raw = await generate_fx_params(fx_request)
+        except ValueError as e:
+            raise HTTPException(status_code=502, detail=str(e))
         
-        # Apply real audio processing with AI-generated effects
-        processed_filename = f"processed_{file.filename}"
-        processed_location = UPLOAD_DIR / processed_filename
+        if preview_options is not None:
+            return await _preview_response(
+                stored.path, raw, stored.sha256, preview_options, output_format,
+                filename=f"preview_{Path(stored.filename).stem}{output_format.suffix}",
+                headers={"X-Source-Id": stored.sha256}
+            )
         
-        # Process the audio with real effects
-        success = process_audio_with_effects(
-            str(file_location),
-            str(processed_location),
-            raw
+        # Render off the event loop and stream the encoded result back
+        response = await _render_response(
+            stored.path, raw, stored.sha256, sample_rate, output_format,
+            filename=f"processed_{Path(stored.filename).stem}{output_format.suffix}",
+            # Lets the client re-render this source via POST /render without re-uploading
+            headers={"X-Source-Id": stored.sha256}
         )
         
-        if not success:
-            raise HTTPException(status_code=500, detail="Audio processing failed")
-        
-        logger.info("audio_processed", extra={
-            "extra": {
-                "original_file": file.filename,
-                "processed_file": processed_filename,
-                "effects": raw
-            }
+        log_sampled("audio_processed", {
+            "original_file": stored.filename,
+            "sha256": stored.sha256,
+            "format": output_format.name,
+            "effects": raw
         })
         
-        return FileResponse(
-            processed_location,
-            media_type='application/octet-stream',
-            filename=processed_filename
-        )
+        return response
         
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RenderQueueFull as e:
+        raise _queue_full(e)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("audio_processing_error")
         raise HTTPException(status_code=500, detail=f"Audio processing failed: {str(e)}")
 
+@app.post("/render")
+async def render(req: RenderRequest):
+    """
+    Re-render a previously uploaded source with explicit parameters, no LLM call.
+    Renders reuse cached per-band stems, so mix or gain tweaks come back quickly.
+    """
+    _check_sample_rate(req.sample_rate)
+    source = find_upload(UPLOAD_DIR, req.source_id)
+    if source is None:
+        raise HTTPException(status_code=404, detail="Unknown source_id; upload it via /process-audio first")
+    storage.touch(source, "uploads")
+    output_format = _output_format(req.format, req.subtype)
+    params = req.model_dump(include={"reverb", "eq", "chain"}, exclude_none=True)
+    try:
+        return await _render_response(
+            source, params, req.source_id, req.sample_rate, output_format,
+            filename=f"processed_{source.stem[:16]}{output_format.suffix}",
+            headers={"X-Source-Id": req.source_id},
+            incremental=True
+        )
+    except RenderQueueFull as e:
+        raise _queue_full(e)
+
 @app.post("/text2fx", response_model=Text2FxResponse)
 async def text2fx(req: Text2FxRequest):
     if req.fx_type != "reverb":
         raise HTTPException(status_code=501, detail="MVP supports only fx_type='reverb'")
 
-    messages = build_messages(req.fx_type, req.instruction, req.instrument)
-
     try:
-        # 1st attempt
-        raw_text = await call_openai_chat(messages, force_json=True)
-        raw = parse_json_safe(raw_text)
-
-        # retry once if not JSON
-        if raw is None:
-            logger.warning("invalid_json_first_try", extra={"extra": {"len": len(raw_text)}})
-            messages[-1]["content"] += "\nRespond with JSON only."
-            raw_text = await call_openai_chat(messages, force_json=True)
-            raw = parse_json_safe(raw_text)
-            if raw is None:
-                logger.error("invalid_json_second_try", extra={"extra": {"len": len(raw_text)}})
-                raise HTTPException(status_code=502, detail="Model returned non-JSON twice")
-
-        # Normalize & validate to schema
-        try:
-            # fill missing keys with safe defaults
-            reverb = raw.get("reverb", {})
-            gains = list(reverb.get("gains_db", [0.0]*BANDS))
-            decays = list(reverb.get("decays_s", [1.0]*BANDS))
-            mix = float(reverb.get("mix", 0.25))
-
-            # enforce exact length
-            gains = (gains + [0.0]*BANDS)[:BANDS]
-            decays = (decays + [1.0]*BANDS)[:BANDS]
-
-            rv = ReverbV1(gains_db=gains, decays_s=decays, mix=mix)
-            resp = Text2FxResponse(
-                schema_version="reverb_v1",
-                reverb=rv,
-                reason=(raw.get("reason") or None)
-            )
-            logger.info("ok_response")
-            return JSONResponse(status_code=200, content=resp.model_dump())
-        except Exception as e:
-            logger.exception("validation_error")
-            raise HTTPException(status_code=502, detail=f"Validation failed: {e}")
-            
+        resp = await generate_fx_response(req)
+        log_sampled("ok_response")
+        return JSONResponse(status_code=200, content=resp.model_dump())
     except ValueError as e:
-        # Handle OpenAI-specific errors
+        # Handle OpenAI-specific and validation errors
         logger.error("openai_error", extra={"extra": {"error": str(e)}})
         raise HTTPException(status_code=502, detail=str(e))
     except Exception as e:
         logger.exception("unexpected_error")
         raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.post("/process-batch")
+async def process_batch(
+    files: List[UploadFile] = File(...),
+    instructions: List[str] = Form(...),
+    instrument: str = Form(...),
+    fx_type: str = Form(...),
+    sample_rate: int | None = Form(None),
+    format: str = Form("wav"),
+    subtype: str | None = Form(None)
+):
+    """
+    Apply every instruction to every file and stream the results back as a ZIP.
+
+    Parameters are generated once per distinct instruction, renders fan out
+    across the worker pool, and each file is added to the archive as soon as
+    it finishes. manifest.json at the end lists each item's parameters and
+    any per-item error.
+    """
+    _check_sample_rate(sample_rate)
+    output_format = _output_format(format, subtype)
+    if len(files) * len(instructions) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(files) * len(instructions)} items exceeds the limit of {settings.batch_max_items}"
+        )
+    try:
+        # Deduplicated and in submission order
+        fx_requests = {
+            instruction: Text2FxRequest(instrument=instrument, fx_type=fx_type, instruction=instruction)
+            for instruction in instructions
+        }
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    stored = [await _store_upload(file) for file in files]
+    try:
+        generated = await asyncio.gather(*(generate_fx_params(req) for req in fx_requests.values()))
+    except ValueError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    params = dict(zip(fx_requests, generated))
+
+    pairs = [(upload, instruction) for upload in stored for instruction in fx_requests]
+    items = [
+        BatchItem(index=i, filename=upload.filename, instruction=instruction, source_id=upload.sha256,
+                  input_path=upload.path, params=params[instruction])
+        for i, (upload, instruction) in enumerate(pairs)
+    ]
+    logger.info("batch_started", extra={"extra": {
+        "items": len(items), "files": len(stored), "llm_requests": len(fx_requests)
+    }})
+
+    # Keep at most one render per worker in flight so a big batch leaves queue room for others
+    slots = asyncio.Semaphore(render_engine.max_workers)
+
+    async def render_item(item: BatchItem) -> BatchItem:
+        async with slots:
+            started = time.perf_counter()
+            output_path = _output_path(item.source_id, output_format.suffix)
+            try:
+                success = await _render_when_ready(
+                    item.input_path, output_path, item.params, item.source_id, sample_rate,
+                    format=output_format.format, subtype=output_format.subtype
+                )
+                if success:
+                    item.output_path = output_path
+                else:
+                    item.error = "Audio processing failed"
+            except Exception as e:
+                logger.exception("batch_item_failed", extra={"extra": {"index": item.index}})
+                item.error = str(e)
+            item.seconds = time.perf_counter() - started
+            return item
+
+    tasks = [asyncio.create_task(render_item(item)) for item in items]
+
+    async def finished() -> AsyncIterator[BatchItem]:
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Client went away: stop pending renders and drop outputs never sent
+            for task in tasks:
+                task.cancel()
+            for item in items:
+                if item.output_path is not None:
+                    item.output_path.unlink(missing_ok=True)
+
+    return StreamingResponse(
+        _counted(stream_zip(finished(), chunk_size=settings.upload_chunk_size), "zip"),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="processed_batch.zip"'}
+    )
+
+@app.websocket("/ws/monitor")
+async def monitor(websocket: WebSocket):
+    """
+    Live effect monitoring over a WebSocket.
+
+    The first message is JSON: sample_rate, channels (1 or 2), optional
+    block_size, and reverb and/or eq parameters. Binary messages then carry
+    interleaved float32 PCM and are answered with processed stereo frames one
+    block later. A JSON message with new reverb/eq parameters swaps them
+    mid-stream with a short crossfade.
+    """
+    from .monitor import MonitorSession  # imports the DSP stack on first use
+    await websocket.accept()
+    try:
+        session = await asyncio.to_thread(MonitorSession.from_config, await websocket.receive_json())
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1003)
+        return
+    except WebSocketDisconnect:
+        return
+    await websocket.send_json(session.describe())
+
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            break
+        try:
+            if message.get("bytes") is not None:
+                # Block processing runs in a thread so other connections keep being served
+                out = await asyncio.to_thread(session.push, message["bytes"])
+                if out:
+                    await websocket.send_bytes(out)
+            elif message.get("text") is not None:
+                await asyncio.to_thread(session.set_params, json.loads(message["text"]))
+                await websocket.send_json({"type": "params_applied"})
+        except ValueError as e:
+            # Bad frames or parameters: report and keep the stream running
+            await websocket.send_json({"type": "error", "detail": str(e)})
+    logger.info("monitor_closed", extra={"extra": {"dropped_frames": session.dropped_frames}})
+
+@app.get("/audio/{audio_id}/overview")
+async def audio_overview(audio_id: str, start_s: float = 0.0, end_s: float | None = None, max_points: int = 2048):
+    """
+    Waveform peaks and a 12-band energy profile of stored audio, as compact JSON.
+
+    `audio_id` is an upload's source_id (X-Source-Id) or a finished job's id,
+    so the UI can draw before/after waveforms without downloading either
+    file. Peaks are min/max pairs scaled to +/-peak_scale at several
+    resolutions; only the levels that cover start_s..end_s in at most
+    max_points pairs are returned, so zooming in returns finer levels. The
+    overview is computed once in a single pass and cached next to the audio.
+    """
+    if not 1 <= max_points <= 65536:
+        raise HTTPException(status_code=422, detail="max_points must be between 1 and 65536")
+    path, area = await _stored_audio(audio_id)
+    overview = await asyncio.to_thread(load_overview, path)
+    if overview is None:
+        try:
+            async with storage.pinned_async(path):
+                overview = await render_engine.run(compute_overview, str(path))
+        except RenderQueueFull as e:
+            raise _queue_full(e)
+        except RenderWorkerLost as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        except RuntimeError as e:
+            raise HTTPException(status_code=415, detail=f"Cannot read audio for an overview: {e}")
+    storage.touch(path, area)
+    return JSONResponse(
+        select_levels(overview, start_s, end_s, max_points),
+        headers={"Cache-Control": "private, max-age=3600"}
+    )
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {**response_cache.stats(), "presets": preset_index.stats()}
+
+@app.get("/storage/stats")
+async def storage_stats():
+    """Disk usage per storage area as of the last sweep"""
+    return storage.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage latencies, bytes, rendered audio, cache and LLM token counters in Prometheus text format"""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+def _render_options(content_hash: str, sample_rate: int | None, incremental: bool = False) -> dict:
+    # Per-band stems cost ~12 convolutions and a lot of disk on the first render,
+    # so only explicit re-renders (POST /render) build and reuse them
+    return dict(
+        stream_threshold_s=settings.render_stream_threshold_s,
+        block_size=settings.render_block_size,
+        content_hash=content_hash,
+        sample_rate=sample_rate,
+        incremental_max_s=settings.render_incremental_max_s if incremental else None
+    )
+
+async def _render(input_path: Path, output_path: Path, params: dict, content_hash: str,
+                  sample_rate: int | None, format: str | None = None, subtype: str | None = None,
+                  incremental: bool = False) -> bool:
+    """Render in the process pool; raises RenderQueueFull when saturated"""
+    async with storage.pinned_async(input_path, output_path):
+        return await render_engine.run(
+            process_audio_with_effects,
+            str(input_path),
+            str(output_path),
+            params,
+            format=format,
+            subtype=subtype,
+            **_render_options(content_hash, sample_rate, incremental)
+        )
+
+async def _render_when_ready(input_path: Path, output_path: Path, params: dict, content_hash: str,
+                             sample_rate: int | None, **kwargs) -> bool:
+    """Like _render, but waits for pool capacity instead of failing (background and batch work)"""
+    while True:
+        try:
+            return await _render(input_path, output_path, params, content_hash, sample_rate, **kwargs)
+        except RenderQueueFull as e:
+            await asyncio.sleep(e.retry_after_s)
+
+async def _render_response(source: Path, params: dict, content_hash: str, sample_rate: int | None,
+                           output_format: OutputFormat, filename: str, headers: dict,
+                           incremental: bool = False) -> StreamingResponse:
+    """
+    Render `source` and stream it back encoded as `output_format`.
+
+    Short sources are encoded in the worker and come back as bytes, never
+    touching disk. Anything whose output may exceed the in-memory limit, or
+    whose length cannot be probed, renders into a temporary file (block by
+    block past the streaming threshold) that is streamed out and then deleted.
+    """
+    headers = {**headers, "Content-Disposition": _content_disposition(filename)}
+    info = await asyncio.to_thread(probe_info, source)
+    if info is None or output_format.estimated_size(
+        info.duration * (sample_rate or info.samplerate), max(info.channels, 2)  # reverb renders stereo
+    ) > settings.render_in_memory_max_bytes:
+        output_path = _output_path(content_hash, output_format.suffix)
+        success = await _render(source, output_path, params, content_hash, sample_rate,
+                                output_format.format, output_format.subtype, incremental)
+        if not success:
+            raise HTTPException(status_code=500, detail="Audio processing failed")
+        headers["Content-Length"] = str(output_path.stat().st_size)
+        return StreamingResponse(
+            _counted(_iter_file(output_path), "audio"), media_type=output_format.media_type, headers=headers
+        )
+
+    try:
+        async with storage.pinned_async(source):
+            data = await render_engine.run(
+                render_to_bytes, str(source), params, output_format.format, output_format.subtype,
+                **_render_options(content_hash, sample_rate, incremental)
+            )
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return _bytes_response(data, output_format, headers)
+
+async def _render_preview_bytes(source: Path, params: dict, content_hash: str, options: PreviewOptions,
+                                output_format: OutputFormat) -> tuple[bytes, str]:
+    """Encoded preview and its cache key; identical requests are served from the preview cache"""
+    key = preview_key(content_hash, params, options, output_format.format, output_format.subtype)
+    data = await asyncio.to_thread(get_cached_preview, key)
+    if data is None:
+        async with storage.pinned_async(source):
+            data = await render_engine.run(
+                render_preview, str(source), params, options.start_s, options.duration_s, options.sample_rate,
+                options.mono, options.max_ir_s, output_format.format, output_format.subtype,
+                block_size=settings.render_block_size
+            )
+        await asyncio.to_thread(cache_preview, key, data)
+    return data, key
+
+async def _preview_response(source: Path, params: dict, content_hash: str, options: PreviewOptions,
+                            output_format: OutputFormat, filename: str, headers: dict) -> StreamingResponse:
+    try:
+        data, key = await _render_preview_bytes(source, params, content_hash, options, output_format)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return _bytes_response(data, output_format, {
+        **headers,
+        "Content-Disposition": _content_disposition(filename),
+        "ETag": f'"{key}"',
+        "Cache-Control": "private, max-age=3600",
+        "X-Preview": f"start={options.start_s:g};duration={options.duration_s:g}",
+    })
+
+def _bytes_response(data: bytes, output_format: OutputFormat, headers: dict) -> StreamingResponse:
+    headers = {**headers, "Content-Length": str(len(data))}
+    return StreamingResponse(_counted(_iter_bytes(data), "audio"), media_type=output_format.media_type, headers=headers)
+
+def _content_disposition(filename: str) -> str:
+    # Same encoding FileResponse uses for non-ASCII names
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+async def _counted(chunks: AsyncIterator[bytes], kind: str) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        BYTES_OUT.inc(len(chunk), kind=kind)
+        yield chunk
+
+async def _iter_bytes(data: bytes) -> AsyncIterator[bytes]:
+    view = memoryview(data)
+    for start in range(0, len(view), settings.upload_chunk_size):
+        yield bytes(view[start:start + settings.upload_chunk_size])
+
+async def _iter_file(path: Path) -> AsyncIterator[bytes]:
+    try:
+        async with aiofiles.open(path, "rb") as f:
+            while chunk := await f.read(settings.upload_chunk_size):
+                yield chunk
+    finally:
+        path.unlink(missing_ok=True)
+
+def _output_format(name: str, subtype: str | None) -> OutputFormat:
+    try:
+        return resolve_output_format(name, subtype)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+def _queue_full(e: RenderQueueFull) -> HTTPException:
+    logger.warning("render_queue_full", extra={"extra": {"pending": render_engine.pending}})
+    return HTTPException(
+        status_code=503,
+        detail="Render queue is full, try again later",
+        headers={"Retry-After": str(e.retry_after_s)}
+    )
+
+def _preview_options(start_s: float, duration_s: float | None, mono: bool | None) -> PreviewOptions:
+    try:
+        return PreviewOptions.from_request(start_s, duration_s, mono)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+def _check_sample_rate(sample_rate: int | None) -> None:
+    # None renders at the upload's native rate
+    if sample_rate is not None and not 8000 <= sample_rate <= 192000:
+        raise HTTPException(status_code=422, detail="sample_rate must be between 8000 and 192000")
+
+async def _store_upload(file: UploadFile) -> StoredUpload:
+    try:
+        with span("upload"):
+            stored = await save_upload(
+                file,
+                UPLOAD_DIR,
+                max_bytes=settings.upload_max_bytes,
+                max_duration_s=settings.upload_max_duration_s,
+                chunk_size=settings.upload_chunk_size
+            )
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    storage.touch(stored.path, "uploads")
+    return stored
+
+async def _stored_audio(audio_id: str) -> tuple[Path, str]:
+    """Path and storage area of an upload (64-hex source_id) or a finished job's result"""
+    path, area = None, "uploads"
+    if re.fullmatch(r"[0-9a-f]{64}", audio_id):
+        path = find_upload(UPLOAD_DIR, audio_id)
+    elif re.fullmatch(r"[0-9a-f]{32}", audio_id):
+        job = await asyncio.to_thread(job_store.get, audio_id)
+        if job is not None and job["status"] == JOB_DONE:
+            path, area = Path(job["output_path"]), "outputs"
+    if path is None or not path.exists():
+        raise HTTPException(status_code=404, detail="Unknown or expired audio id")
+    return path, area
+
+def _output_path(sha256: str, suffix: str) -> Path:
+    # Unique per render, so concurrent renders of one source never collide
+    return UPLOAD_DIR / f"processed_{sha256[:16]}_{uuid.uuid4().hex[:8]}{suffix}"
+
+def _job_status(job: dict) -> JobStatus:
+    return JobStatus(
+        job_id=job["id"],
+        status=job["status"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"],
+        stages=job["stages"],
+        params=job["params"],
+        error=job["error"],
+    )
+
+def _schedule_job(job_id: str) -> None:
+    task = asyncio.create_task(_run_job(job_id))
+    _job_tasks.add(task)
+    task.add_done_callback(_job_tasks.discard)
+
+async def _run_job(job_id: str) -> None:
+    """Generate parameters (if not done yet) and render a stored job in the background."""
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        return
+    stages = dict(job["stages"])
+    # Keep the input on disk while the job waits for and runs its render
+    pin = await asyncio.to_thread(storage.pin, Path(job["input_path"]))
+    try:
+        await asyncio.to_thread(job_store.update, job_id, status=JOB_RUNNING)
+
+        params = job["params"]
+        if params is None:
+            started = time.perf_counter()
+            fx_request = Text2FxRequest(
+                fx_type=job["fx_type"],
+                instrument=job["instrument"],
+                instruction=job["instruction"]
+            )
+            params = await generate_fx_params(fx_request)
+            stages["llm"] = time.perf_counter() - started
+            await asyncio.to_thread(job_store.update, job_id, params=params, stages=stages)
+
+        started = time.perf_counter()
+        # Inputs are stored under their content hash
+        input_path = Path(job["input_path"])
+        output_format = _job_output_format(job)
+        if job["options"].get("preview"):
+            output_path = UPLOAD_DIR / f"preview_{job_id}{output_format.suffix}"
+            await _write_job_preview(
+                input_path, output_path, params, PreviewOptions(**job["options"]["preview"]), output_format
+            )
+            success = True
+        else:
+            output_path = UPLOAD_DIR / f"processed_{job_id}{output_format.suffix}"
+            success = await _render_when_ready(
+                input_path, output_path, params, input_path.stem, job["options"].get("sample_rate"),
+                format=output_format.format, subtype=output_format.subtype
+            )
+        stages["render"] = time.perf_counter() - started
+        if not success:
+            raise RuntimeError("Audio processing failed")
+
+        storage.touch(output_path, "outputs")
+        await asyncio.to_thread(
+            job_store.update, job_id, status=JOB_DONE, output_path=str(output_path), stages=stages
+        )
+        logger.info("job_done", extra={"extra": {"job_id": job_id, "stages": stages}})
+    except asyncio.CancelledError:
+        # Shutting down: leave the job as running so it is resumed on restart
+        raise
+    except Exception as e:
+        logger.exception("job_failed", extra={"extra": {"job_id": job_id}})
+        await asyncio.to_thread(job_store.update, job_id, status=JOB_FAILED, error=str(e), stages=stages)
+    finally:
+        await asyncio.to_thread(storage.unpin, pin)
+
+def _job_output_format(job: dict) -> OutputFormat:
+    """The encoding a job was submitted with; jobs stored before formats were recorded render WAV"""
+    return resolve_output_format(job["options"].get("format", "wav"), job["options"].get("subtype"))
+
+async def _write_job_preview(input_path: Path, output_path: Path, params: dict, options: PreviewOptions,
+                             output_format: OutputFormat) -> None:
+    while True:
+        try:
+            data, _ = await _render_preview_bytes(input_path, params, input_path.stem, options, output_format)
+            break
+        except RenderQueueFull as e:
+            await asyncio.sleep(e.retry_after_s)
+    async with aiofiles.open(output_path, "wb") as f:
+        await f.write(data)
+
+@app.post("/jobs", status_code=202, response_model=JobStatus)
+async def submit_job(
+    file: UploadFile = File(...),
+    instrument: str = Form(...),
+    fx_type: str = Form(...),
+    instruction: str = Form(...),
+    sample_rate: int | None = Form(None),
+    preview: bool = Form(False),
+    preview_start_s: float = Form(0.0),
+    preview_duration_s: float | None = Form(None),
+    preview_mono: bool | None = Form(None),
+    format: str = Form("wav"),
+    subtype: str | None = Form(None)
+):
+    """Accept an upload and render it in the background; poll GET /jobs/{id}"""
+    _check_sample_rate(sample_rate)
+    output_format = _output_format(format, subtype)
+    options = {"sample_rate": sample_rate, "format": output_format.name, "subtype": output_format.subtype}
+    if preview:
+        options["preview"] = _preview_options(preview_start_s, preview_duration_s, preview_mono).to_dict()
+    try:
+        fx_request = Text2FxRequest(instrument=instrument, fx_type=fx_type, instruction=instruction)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    started = time.perf_counter()
+    stored = await _store_upload(file)
+
+    job_id = await asyncio.to_thread(
+        job_store.create,
+        fx_type=fx_request.fx_type,
+        instrument=fx_request.instrument,
+        instruction=fx_request.instruction,
+        input_path=str(stored.path),
+        input_filename=stored.filename,
+        options=options,
+    )
+    await asyncio.to_thread(job_store.update, job_id, stages={"upload": time.perf_counter() - started})
+    _schedule_job(job_id)
+
+    job = await asyncio.to_thread(job_store.get, job_id)
+    return JSONResponse(
+        status_code=202,
+        content=_job_status(job).model_dump(),
+        headers={"Location": f"/jobs/{job_id}"}
+    )
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_status(job)
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == JOB_FAILED:
+        raise HTTPException(status_code=409, detail=f"Job failed: {job['error']}")
+    if job["status"] != JOB_DONE:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    output_path = Path(job["output_path"])
+    if not output_path.exists():
+        raise HTTPException(status_code=410, detail="Job result has expired; submit the job again")
+    storage.touch(output_path, "outputs")
+    output_format = _job_output_format(job)
+    prefix = "preview" if job["options"].get("preview") else "processed"
+    return FileResponse(
+        job["output_path"],
+        media_type=output_format.media_type,
+        filename=f"{prefix}_{Path(job['input_filename']).stem}{output_format.suffix}"
+    )
@@ -0,0 +1,184 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache hits to long renders
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+RATIO_BUCKETS = (0.001, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+_lock = threading.Lock()
+# Set inside a render worker: observations are buffered and shipped back to
+# the server process with the result instead of being applied locally
+_buffer: Optional[List[Tuple[str, Tuple[str, ...], float]]] = None
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        REGISTRY[name] = self
+
+    def _labels(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _record(self, value: float, labels: Dict[str, Any]) -> None:
+        key = self._labels(labels)
+        if _buffer is not None:
+            _buffer.append((self.name, key, value))
+            return
+        with _lock:
+            self._apply(key, value)
+
+    def _apply(self, key: Tuple[str, ...], value: float) -> None:
+        raise NotImplementedError
+
+    def _format_labels(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{value}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        self._record(amount, labels)
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._labels(labels), 0.0)
+
+    def _apply(self, key: Tuple[str, ...], value: float) -> None:
+        self._values[key] = self._values.get(key, 0.0) + value
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{self._format_labels(key)} {_number(value)}" for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # per label set: [count per bucket (last is +Inf)], sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        self._record(value, labels)
+
+    def count(self, **labels: Any) -> int:
+        counts, _ = self._values.get(self._labels(labels), ([0], [0.0]))
+        return sum(counts)
+
+    def total(self, **labels: Any) -> float:
+        _, total = self._values.get(self._labels(labels), ([0], [0.0]))
+        return total[0]
+
+    def stages(self) -> Dict[Tuple[str, ...], float]:
+        """Sum of observations per label set"""
+        with _lock:
+            return {key: total[0] for key, (_, total) in self._values.items()}
+
+    def _apply(self, key: Tuple[str, ...], value: float) -> None:
+        counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = self._format_labels(key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_number(total[0])}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+REGISTRY: Dict[str, _Metric] = {}
+
+STAGE_SECONDS = Histogram(
+    "llm2fx_stage_seconds", "Time spent in each processing stage", ["stage"]
+)
+HTTP_SECONDS = Histogram(
+    "llm2fx_http_request_seconds", "HTTP request latency by route", ["method", "route", "status"]
+)
+BYTES_IN = Counter("llm2fx_bytes_in_total", "Bytes received", ["kind"])
+BYTES_OUT = Counter("llm2fx_bytes_out_total", "Bytes sent", ["kind"])
+AUDIO_SECONDS = Counter("llm2fx_audio_seconds_rendered_total", "Seconds of audio rendered", ["mode"])
+REALTIME_FACTOR = Histogram(
+    "llm2fx_render_realtime_factor", "Render time divided by audio duration", ["mode"], buckets=RATIO_BUCKETS
+)
+CACHE_REQUESTS = Counter("llm2fx_cache_requests_total", "Cache lookups by result", ["cache", "result"])
+LLM_REQUESTS = Counter("llm2fx_llm_requests_total", "Upstream LLM calls by HTTP status", ["status"])
+LLM_TOKENS = Counter("llm2fx_llm_tokens_total", "LLM token usage reported by the provider", ["type"])
+STORAGE_EVICTED_FILES = Counter(
+    "llm2fx_storage_evicted_files_total", "Files deleted by the storage manager", ["area", "reason"]
+)
+STORAGE_EVICTED_BYTES = Counter(
+    "llm2fx_storage_evicted_bytes_total", "Bytes freed by the storage manager", ["area", "reason"]
+)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a block of work into llm2fx_stage_seconds{stage=...}."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+
+
+def record_render(mode: str, audio_s: float, elapsed_s: float) -> None:
+    AUDIO_SECONDS.inc(audio_s, mode=mode)
+    if audio_s > 0:
+        REALTIME_FACTOR.observe(elapsed_s / audio_s, mode=mode)
+
+
+def run_collected(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, list]:
+    """
+    Run `fn` in a worker process, returning its result plus the metric
+    observations it made, for `merge` in the server process.
+    """
+    global _buffer
+    _buffer = []
+    try:
+        return fn(*args, **kwargs), _buffer
+    finally:
+        _buffer = None
+
+
+def merge(observations: list) -> None:
+    with _lock:
+        for name, key, value in observations:
+            REGISTRY[name]._apply(key, value)
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        for metric in REGISTRY.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,146 @@
+from time import monotonic
+from typing import Optional
+
+import numpy as np
+
+from .audio_processor import AudioProcessor
+from .chain import ChainStream, build_chain
+from .config import settings
+
+MIN_BLOCK, MAX_BLOCK = 128, 8192
+
+
+class MonitorSession:
+    """
+    Real-time effect processing for one live-monitoring connection.
+
+    Input arrives as interleaved float32 PCM of any length and is processed in
+    fixed blocks by the chain's stateful block processors, so latency is one
+    block. Swapping parameters builds a new chain and crossfades from the old
+    one over `crossfade_s`, which avoids clicks and lets the old reverb tail
+    fade out instead of stopping dead; a swap that arrives mid-fade starts
+    once the current fade completes.
+
+    Lag is measured against wall-clock time: since the session last waited
+    for input, a real-time client has sent elapsed time x sample rate frames,
+    and whatever has not been received yet is still queued on the socket.
+    While that backlog exceeds `max_buffer_s`, incoming messages are dropped
+    unprocessed until the session has caught up, which keeps latency bounded.
+    """
+
+    def __init__(self, sample_rate: int, channels: int, block_size: int, effects_params: dict,
+                 crossfade_s: float = 0.05, max_buffer_s: float = 0.5):
+        if not 8000 <= sample_rate <= 192000:
+            raise ValueError("sample_rate must be between 8000 and 192000")
+        if channels not in (1, 2):
+            raise ValueError("channels must be 1 or 2")
+        if not MIN_BLOCK <= block_size <= MAX_BLOCK:
+            raise ValueError(f"block_size must be between {MIN_BLOCK} and {MAX_BLOCK}")
+        self.processor = AudioProcessor(sample_rate=sample_rate, block_size=block_size)
+        self.channels = channels
+        self.out_channels = 2  # fixed for the session, whatever the chain
+        self.block_size = block_size
+        self.crossfade_frames = max(1, int(crossfade_s * sample_rate))
+        self.max_buffer_frames = max(block_size, int(max_buffer_s * sample_rate))
+        self.dropped_frames = 0
+        self._pending = np.zeros((0, channels), dtype=np.float32)
+        self._stream: Optional[ChainStream] = None
+        self._fading: Optional[ChainStream] = None
+        self._next: Optional[ChainStream] = None
+        self._fade_pos = 0
+        # Wall-clock reference: frames received when the session last caught up
+        self._synced_at: Optional[float] = None
+        self._synced_frames = 0
+        self._received = 0
+        self._idle_since: Optional[float] = None
+        self._dropping = False
+        self.set_params(effects_params)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "MonitorSession":
+        """Session from the client's opening message; raises ValueError when invalid."""
+        try:
+            sample_rate = int(config["sample_rate"])
+            channels = int(config.get("channels", 1))
+            block_size = int(config.get("block_size", settings.monitor_block_size))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("config needs an integer sample_rate, and optionally channels and block_size")
+        return cls(sample_rate, channels, block_size, config,
+                   crossfade_s=settings.monitor_crossfade_s, max_buffer_s=settings.monitor_max_buffer_s)
+
+    def describe(self) -> dict:
+        return {
+            "type": "ready",
+            "sample_rate": self.processor.sample_rate,
+            "channels_in": self.channels,
+            "channels_out": self.out_channels,
+            "block_size": self.block_size,
+            "latency_frames": self.block_size,
+        }
+
+    def set_params(self, effects_params: dict) -> None:
+        """Hot-swap the effect parameters; raises ValueError when they are invalid."""
+        chain = build_chain(effects_params)
+        if not chain:
+            raise ValueError("Parameters need a reverb or eq section")
+        stream = chain.stream(self.processor, self.channels)
+        if self._fading is not None:
+            self._next = stream  # replaces any swap already waiting
+        elif self._stream is not None:
+            self._fading, self._fade_pos, self._stream = self._stream, 0, stream
+        else:
+            self._stream = stream
+
+    def push(self, data: bytes) -> bytes:
+        """Feed interleaved float32 frames; returns processed frames for every complete block."""
+        frame_bytes = 4 * self.channels
+        if len(data) % frame_bytes:
+            raise ValueError(f"Frame data must be a multiple of {frame_bytes} bytes")
+        frames = np.frombuffer(data, dtype="<f4").reshape(-1, self.channels)
+        if self._behind(len(frames)):
+            self.dropped_frames += len(frames)
+            self._idle_since = monotonic()
+            return b""
+        pending = np.concatenate([self._pending, frames]) if len(self._pending) else frames
+
+        usable = len(pending) - len(pending) % self.block_size
+        out = [self._process_block(pending[i:i + self.block_size]) for i in range(0, usable, self.block_size)]
+        self._pending = pending[usable:].copy()
+        self._idle_since = monotonic()
+        return b"".join(block.astype("<f4", copy=False).tobytes() for block in out)
+
+    def _behind(self, frames: int) -> bool:
+        """Account for `frames` just received; True while the socket backlog is over the bound"""
+        now = monotonic()
+        sample_rate = self.processor.sample_rate
+        self._received += frames
+        # Time spent outside push() was spent waiting for input, so nothing was
+        # queued: re-anchor the clock there, which also forgets client pauses
+        waited = self._idle_since is None or now - self._idle_since >= min(frames / sample_rate / 4, 0.01)
+        if waited:
+            self._synced_at, self._synced_frames = now, self._received
+        backlog = self._synced_frames + (now - self._synced_at) * sample_rate - self._received
+        if backlog < 0:  # the client is ahead of real time
+            self._synced_at, self._synced_frames, backlog = now, self._received, 0
+        if backlog > self.max_buffer_frames:
+            self._dropping = True
+        elif backlog <= self.block_size:
+            self._dropping = False
+        return self._dropping
+
+    def _process_block(self, block: np.ndarray) -> np.ndarray:
+        out = self._widen(self._stream.process_block(block))
+        if self._fading is not None:
+            old = self._widen(self._fading.process_block(block))
+            ramp = (self._fade_pos + np.arange(len(block), dtype=np.float32)) / self.crossfade_frames
+            ramp = np.minimum(ramp, 1.0)[:, np.newaxis]
+            out = old + ramp * (out - old)
+            self._fade_pos += len(block)
+            if self._fade_pos >= self.crossfade_frames:
+                self._fading = None
+                if self._next is not None:
+                    self._fading, self._fade_pos, self._stream, self._next = self._stream, 0, self._next, None
+        return out
+
+    def _widen(self, block: np.ndarray) -> np.ndarray:
+        return np.repeat(block, self.out_channels, axis=1) if block.shape[1] == 1 else block
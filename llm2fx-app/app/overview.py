@@ -0,0 +1,149 @@
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+import soundfile as sf
+
+OVERVIEW_VERSION = 1
+PEAK_SCALE = 127  # peaks are stored as integers in -127..127, like 8-bit waveform data
+
+
+def overview_path(audio_path: Path) -> Path:
+    """The overview is cached as JSON next to the audio it describes"""
+    return audio_path.with_name(audio_path.name + ".overview.json")
+
+
+def _fingerprint(audio_path: Path) -> dict:
+    stat = audio_path.stat()
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def load_overview(audio_path: Path) -> dict | None:
+    """Cached overview for `audio_path`, or None if missing or stale"""
+    try:
+        with open(overview_path(audio_path)) as f:
+            overview = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if overview.get("version") != OVERVIEW_VERSION or overview.get("source") != _fingerprint(audio_path):
+        return None
+    return overview
+
+
+def build_overview(audio_path: str, frequency_bands: Sequence[float], samples_per_peak: int = 256,
+                   fft_size: int = 4096, block_frames: int = 1 << 16) -> dict:
+    """
+    Peak pyramid and band energy profile of an audio file, computed in one
+    streaming pass and written next to it as JSON.
+
+    Each block is reduced with vectorized min/max over `samples_per_peak`
+    frames (all channels together) and its power spectrum, from
+    non-overlapping Hann-windowed frames of `fft_size`, is accumulated. Coarser
+    pyramid levels halve the resolution from the finest one after the pass,
+    and the spectrum is summed into the processor's frequency bands.
+    """
+    from .dsp import band_edges
+
+    path = Path(audio_path)
+    if block_frames % samples_per_peak or block_frames % fft_size:
+        raise ValueError("block_frames must be a multiple of samples_per_peak and fft_size")
+    window = np.hanning(fft_size).astype(np.float32)
+    power = np.zeros(fft_size // 2 + 1)
+    mins, maxs = [], []
+    frames = 0
+
+    with sf.SoundFile(str(path)) as f:
+        sample_rate, channels = f.samplerate, f.channels
+        for block in f.blocks(blocksize=block_frames, dtype="float32", always_2d=True):
+            n = block.shape[0]
+            frames += n
+            lo, hi = block.min(axis=1), block.max(axis=1)
+            pad = -n % samples_per_peak  # only the last block is short
+            if pad:
+                lo, hi = np.pad(lo, (0, pad), mode="edge"), np.pad(hi, (0, pad), mode="edge")
+            mins.append(lo.reshape(-1, samples_per_peak).min(axis=1))
+            maxs.append(hi.reshape(-1, samples_per_peak).max(axis=1))
+
+            mono = block.mean(axis=1)
+            pad = -n % fft_size
+            if pad:
+                mono = np.pad(mono, (0, pad))
+            spectra = np.fft.rfft(mono.reshape(-1, fft_size) * window, axis=1)
+            power += np.sum(spectra.real ** 2 + spectra.imag ** 2, axis=0)
+
+    lo = np.concatenate(mins) if mins else np.zeros(0, dtype=np.float32)
+    hi = np.concatenate(maxs) if maxs else np.zeros(0, dtype=np.float32)
+    levels = []
+    spp = samples_per_peak
+    while True:
+        levels.append({
+            "samples_per_peak": spp,
+            "min": np.round(np.clip(lo, -1, 1) * PEAK_SCALE).astype(int).tolist(),
+            "max": np.round(np.clip(hi, -1, 1) * PEAK_SCALE).astype(int).tolist(),
+        })
+        if len(lo) <= 1:
+            break
+        if len(lo) % 2:
+            lo, hi = np.append(lo, lo[-1]), np.append(hi, hi[-1])
+        lo, hi = lo.reshape(-1, 2).min(axis=1), hi.reshape(-1, 2).max(axis=1)
+        spp *= 2
+
+    freqs = np.fft.rfftfreq(fft_size, 1.0 / sample_rate)
+    total = float(power.sum())
+    band_energy_db = []
+    for i, (low, high) in enumerate(band_edges(frequency_bands, sample_rate)):
+        top = freqs <= high if i == len(frequency_bands) - 1 else freqs < high
+        energy = float(power[(freqs >= low) & top].sum())
+        band_energy_db.append(round(10 * np.log10(energy / total), 2) if energy > 0 and total > 0 else None)
+
+    overview = {
+        "version": OVERVIEW_VERSION,
+        "source": _fingerprint(path),
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "frames": frames,
+        "duration_s": frames / sample_rate,
+        "peak_scale": PEAK_SCALE,
+        "levels": levels,
+        "bands_hz": list(frequency_bands),
+        "band_energy_db": band_energy_db,
+    }
+    out = overview_path(path)
+    tmp_path = out.with_name(f".{out.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(overview, f, separators=(",", ":"))
+    os.replace(tmp_path, out)
+    return overview
+
+
+def select_levels(overview: dict, start_s: float = 0.0, end_s: float | None = None,
+                  max_points: int = 2048) -> dict:
+    """
+    The overview trimmed to the [start_s, end_s) window, keeping every pyramid
+    level that covers it in at most `max_points` peaks. A whole-file request
+    gets only the coarse levels; zooming in brings finer ones.
+    """
+    sample_rate = overview["sample_rate"]
+    end_s = overview["duration_s"] if end_s is None else min(end_s, overview["duration_s"])
+    start_frame, end_frame = int(max(0.0, start_s) * sample_rate), int(end_s * sample_rate)
+    levels = []
+    for level in overview["levels"]:
+        spp = level["samples_per_peak"]
+        first, last = start_frame // spp, -(-end_frame // spp)
+        if last - first > max_points:
+            continue
+        levels.append({
+            "samples_per_peak": spp,
+            "start": first,
+            "min": level["min"][first:last],
+            "max": level["max"][first:last],
+        })
+    return {
+        **{key: value for key, value in overview.items() if key not in ("levels", "source", "version")},
+        "start_s": start_frame / sample_rate,
+        "end_s": end_frame / sample_rate,
+        "levels": levels,
+    }
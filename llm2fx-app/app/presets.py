@@ -0,0 +1,230 @@
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from .config import settings
+from .metrics import CACHE_REQUESTS
+from .prompts import FEWSHOTS, PROMPT_VERSION
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS presets (
+    text TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (text, model, prompt_version)
+)
+"""
+
+# Words that say nothing about the room; dropping them keeps short
+# instructions from matching on filler alone
+_STOPWORDS = frozenset("a an and the in on of for with to some more very bit please my me it".split())
+
+
+def _normalize(text: str) -> str:
+    words = re.sub(r"[^a-z0-9]+", " ", text.lower()).split()
+    return " ".join(w for w in words if w not in _STOPWORDS)
+
+
+def _ngrams(text: str, sizes=(3, 4, 5)) -> Counter:
+    """Character n-grams within word boundaries, so "drum" and "drums" share most grams"""
+    grams: Counter = Counter()
+    for word in text.split():
+        padded = f" {word} "
+        for n in sizes:
+            grams.update(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+    return grams
+
+
+def _stem(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith("s") else word
+
+
+def _similar_words(a: str, b: str, threshold: float = 0.55) -> bool:
+    """Same word up to a plural or a small typo; "large"/"small" or "tight"/"light" are not"""
+    if a == b:
+        return True
+    ga, gb = _ngrams(a), _ngrams(b)
+    dot = sum(count * gb[g] for g, count in ga.items())
+    norm = math.sqrt(sum(c * c for c in ga.values()) * sum(c * c for c in gb.values()))
+    return norm > 0 and dot / norm >= threshold
+
+
+def _covers(words: set[str], others: set[str]) -> bool:
+    return all(any(_similar_words(word, other) for other in others) for word in words)
+
+
+class PresetIndex:
+    """
+    In-memory similarity index of known-good reverb_v1 results.
+
+    Entries are the curated few-shots plus every validated LLM reply, keyed
+    by their instrument and instruction text. Queries are matched by cosine
+    similarity of TF-IDF weighted character n-grams, so rewordings, plurals
+    and small typos of a known instruction find its preset without a network
+    call. A match must score at least `threshold` and every content word on
+    either side must have a counterpart on the other, so a contrasting
+    modifier ("large" for "small", "bright"), a negation or an extra
+    qualifier sends the instruction to the LLM instead.
+    Learned entries persist in SQLite and are scoped to the model and prompt
+    version that produced them, like the response cache.
+    """
+
+    def __init__(self, db_path: str, threshold: float = 0.75, max_entries: int = 5000,
+                 model: str = "", enabled: bool = True):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.model = model
+        self.enabled = enabled
+        self._texts: list[str] = []
+        self._payloads: list[dict] = []
+        self._positions: dict[str, int] = {}
+        self._curated = 0  # curated entries come first and are never evicted
+        self._vectors: list[dict[str, float]] | None = None
+        self._words: list[set[str]] = []
+        self._postings: dict[str, list[int]] = {}
+        self._idf: dict[str, float] = {}
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def text_for(instrument: str, instruction: str) -> str:
+        return _normalize(f"{instruction} {instrument}")
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(_SCHEMA)
+            self._conn.commit()
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        for text, reply in FEWSHOTS:
+            self._insert(_normalize(text), json.loads(reply))
+        self._curated = len(self._texts)
+        rows = self._db().execute(
+            "SELECT text, payload FROM presets WHERE model = ? AND prompt_version = ?"
+            " ORDER BY created_at DESC LIMIT ?",
+            (self.model, PROMPT_VERSION, self.max_entries),
+        ).fetchall()
+        for text, payload in reversed(rows):
+            self._insert(text, json.loads(payload))
+
+    def _insert(self, text: str, payload: dict) -> None:
+        if not text:
+            return
+        position = self._positions.get(text)
+        if position is not None:
+            self._payloads[position] = payload
+            return
+        self._positions[text] = len(self._texts)
+        self._texts.append(text)
+        self._payloads.append(payload)
+        if len(self._texts) - self._curated > self.max_entries:
+            # Drop the oldest learned entry
+            del self._texts[self._curated], self._payloads[self._curated]
+            self._positions = {t: i for i, t in enumerate(self._texts)}
+        self._vectors = None
+
+    def _build(self) -> None:
+        """(Re)compute IDF weights, unit vectors and postings after the entries changed"""
+        counts = [_ngrams(text) for text in self._texts]
+        df: Counter = Counter()
+        for grams in counts:
+            df.update(grams.keys())
+        n = len(counts)
+        self._idf = {g: math.log((1 + n) / (1 + d)) + 1.0 for g, d in df.items()}
+        self._vectors = [self._weigh(grams) for grams in counts]
+        self._words = [{_stem(w) for w in text.split()} for text in self._texts]
+        self._postings = {}
+        for i, vector in enumerate(self._vectors):
+            for g in vector:
+                self._postings.setdefault(g, []).append(i)
+
+    def _weigh(self, grams: Counter) -> dict[str, float]:
+        # Grams never seen in the index get the highest IDF: they still count
+        # against the query's norm, which is what makes novel text score low
+        unseen = math.log(len(self._texts) + 1) + 1.0
+        vector = {g: (1 + math.log(tf)) * self._idf.get(g, unseen) for g, tf in grams.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        return {g: w / norm for g, w in vector.items()}
+
+    def match(self, instrument: str, instruction: str) -> tuple[dict, float, str] | None:
+        """Best (payload, score, matched text) at or above the threshold, else None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._load()
+            if self._vectors is None:
+                self._build()
+            text = self.text_for(instrument, instruction)
+            query = self._weigh(_ngrams(text))
+            words = {_stem(w) for w in text.split()}
+            scores: dict[int, float] = {}
+            for g, w in query.items():
+                for i in self._postings.get(g, ()):
+                    scores[i] = scores.get(i, 0.0) + w * self._vectors[i][g]
+            candidates = sorted((i for i in scores if scores[i] >= self.threshold), key=scores.get, reverse=True)
+            best = next((i for i in candidates
+                         if _covers(words, self._words[i]) and _covers(self._words[i], words)), None)
+            if best is None:
+                self.misses += 1
+                CACHE_REQUESTS.inc(cache="presets", result="miss")
+                return None
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache="presets", result="hit")
+            return self._payloads[best], scores[best], self._texts[best]
+
+    def add(self, instrument: str, instruction: str, payload: dict) -> None:
+        """Remember a validated result so similar instructions skip the LLM next time"""
+        if not self.enabled:
+            return
+        text = self.text_for(instrument, instruction)
+        with self._lock:
+            self._load()
+            self._insert(text, payload)
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO presets (text, model, prompt_version, payload, created_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (text, self.model, PROMPT_VERSION, json.dumps(payload), time.time()),
+            )
+            db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._texts),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "threshold": self.threshold,
+        }
+
+
+preset_index = PresetIndex(
+    settings.preset_db_path,
+    threshold=settings.preset_match_threshold,
+    max_entries=settings.preset_max_entries,
+    model=settings.openai_model,
+    enabled=settings.preset_index_enabled,
+)
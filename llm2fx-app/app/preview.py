@@ -0,0 +1,55 @@
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from .audio_cache import ArrayCache
+from .config import settings
+
+preview_cache = ArrayCache(settings.preview_cache_dir, settings.preview_cache_max_bytes, name="preview")
+
+
+@dataclass(frozen=True)
+class PreviewOptions:
+    start_s: float
+    duration_s: float
+    mono: bool
+    sample_rate: int
+    max_ir_s: float
+
+    @classmethod
+    def from_request(cls, start_s: float = 0.0, duration_s: float | None = None,
+                     mono: bool | None = None) -> "PreviewOptions":
+        """Fill in server defaults; raises ValueError for an out-of-range excerpt."""
+        duration_s = settings.preview_duration_s if duration_s is None else duration_s
+        if start_s < 0:
+            raise ValueError("preview_start_s must not be negative")
+        if not 0 < duration_s <= settings.preview_max_duration_s:
+            raise ValueError(f"preview_duration_s must be in (0, {settings.preview_max_duration_s:g}]")
+        return cls(
+            start_s=start_s,
+            duration_s=duration_s,
+            mono=settings.preview_mono if mono is None else mono,
+            sample_rate=settings.preview_sample_rate,
+            max_ir_s=settings.preview_ir_max_s,
+        )
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def preview_key(content_hash: str, params: dict, options: PreviewOptions, format: str, subtype: str) -> str:
+    """Cache key (and ETag) for one encoded preview"""
+    raw = json.dumps([content_hash, params, options.to_dict(), format, subtype], sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get_cached_preview(key: str) -> bytes | None:
+    cached = preview_cache.get(key)
+    return None if cached is None else cached.tobytes()
+
+
+def cache_preview(key: str, data: bytes) -> None:
+    # Encoded bytes stored as a uint8 array, so previews share ArrayCache's LRU bound
+    preview_cache.put(key, np.frombuffer(data, dtype=np.uint8))
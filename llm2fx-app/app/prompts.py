@@ -1,3 +1,6 @@
+import hashlib
+import json
+
 REVERB_JSON_SCHEMA_SNIPPET = """
 {
   "schema_version": "reverb_v1",
@@ -28,6 +31,12 @@ FEWSHOTS = [
      '{"schema_version":"reverb_v1","reverb":{"gains_db":[1,1,1,0,0,0,-1,-2,-2,-2,-2,-2],"decays_s":[0.8,0.8,0.85,0.9,0.95,1.0,1.0,0.95,0.9,0.85,0.8,0.75],"mix":0.5},"reason":"Short decay, rolled highs, tight."}')
 ]
 
+# Changes whenever the system prompt, schema or few-shots change, so cached
+# replies produced by an older prompt are not reused.
+PROMPT_VERSION = hashlib.sha256(
+    json.dumps([SYSTEM_TEMPLATE, REVERB_JSON_SCHEMA_SNIPPET, FEWSHOTS]).encode("utf-8")
+).hexdigest()[:16]
+
 def build_messages(fx_type: str, instruction: str, instrument: str) -> list[dict]:
     system = SYSTEM_TEMPLATE.format(FX_TYPE=fx_type, SCHEMA=REVERB_JSON_SCHEMA_SNIPPET)
     messages: list[dict] = [{"role": "system", "content": system}]
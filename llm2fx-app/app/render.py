@@ -0,0 +1,115 @@
+import asyncio
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from .config import settings
+from .logger import logger
+from .metrics import merge, run_collected, span
+from .tasks import prewarm_worker
+
+
+class RenderQueueFull(Exception):
+    """Raised when the render pool already holds its maximum number of jobs."""
+
+    def __init__(self, retry_after_s: int):
+        super().__init__("Render queue is full")
+        self.retry_after_s = retry_after_s
+
+
+class RenderWorkerLost(RuntimeError):
+    """Raised for jobs that were in the pool when a worker process died."""
+
+
+class RenderEngine:
+    """
+    Runs blocking DSP work in a process pool so the event loop stays responsive.
+
+    At most `max_pending` jobs (queued + running) are accepted at a time; beyond
+    that `run` raises RenderQueueFull instead of queueing without bound.
+    A worker that dies (e.g. killed for memory) breaks the whole pool: the
+    jobs it held fail with RenderWorkerLost and the pool is replaced, so later
+    jobs run normally.
+    """
+
+    def __init__(self, max_workers: int = 0, max_pending: int = 0, retry_after_s: int = 5,
+                 initializer: Callable[[], None] | None = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 2
+        self.retry_after_s = retry_after_s
+        self.initializer = initializer  # runs once in each worker process as it starts
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def saturated(self) -> bool:
+        return self._pending >= self.max_pending
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=self.initializer)
+            logger.info("render_engine_started", extra={"extra": {
+                "workers": self.max_workers, "max_pending": self.max_pending
+            }})
+
+    def _replace(self, broken: ProcessPoolExecutor) -> None:
+        """Swap a broken pool for a fresh one, once however many jobs report it"""
+        if self._executor is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.warning("render_pool_replaced", extra={"extra": {"pending": self._pending}})
+            self.start()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run `fn(*args, **kwargs)` in a worker process and await its result."""
+        if self.saturated:
+            raise RenderQueueFull(self.retry_after_s)
+        self.start()
+        loop = asyncio.get_running_loop()
+
+        # Count the job until the worker is actually done with it, even if the
+        # awaiting request is cancelled (client disconnect) in the meantime.
+        self._pending += 1
+        executor = self._executor
+        try:
+            # Metrics recorded in the worker come back with the result
+            try:
+                fut: Future = executor.submit(run_collected, fn, *args, **kwargs)
+            except BrokenProcessPool:
+                # Broke before this job was submitted, so it is safe to run it on a new pool
+                self._replace(executor)
+                executor = self._executor
+                fut = executor.submit(run_collected, fn, *args, **kwargs)
+        except Exception:
+            self._pending -= 1
+            raise
+        fut.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        try:
+            with span("render"):  # queue wait plus work in the pool
+                result, observations = await asyncio.wrap_future(fut)
+        except BrokenProcessPool as e:
+            self._replace(executor)
+            raise RenderWorkerLost("Render worker exited unexpectedly") from e
+        merge(observations)
+        return result
+
+    def _release(self) -> None:
+        self._pending -= 1
+
+
+render_engine = RenderEngine(
+    max_workers=settings.render_workers,
+    max_pending=settings.render_queue_depth,
+    retry_after_s=settings.render_retry_after_s,
+    initializer=prewarm_worker if settings.render_prewarm else None,
+)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import Literal, List
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Literal, List, Dict
 
 FxType = Literal["reverb"]  # keep MVP minimal; add "eq" later
 
@@ -32,7 +32,48 @@ class ReverbV1(BaseModel):
     def clamp_mix(cls, v: float) -> float:
         return min(max(v, 0.0), 1.0)
 
+class EqV1(BaseModel):
+    gains_db: List[float] = Field(..., min_length=BANDS, max_length=BANDS)
+
+    @field_validator("gains_db")
+    @classmethod
+    def clamp_gains(cls, v: list[float]) -> list[float]:
+        return [min(max(x, GAIN_MIN), GAIN_MAX) for x in v]
+
+EffectName = Literal["reverb", "eq"]
+
 class Text2FxResponse(BaseModel):
     schema_version: Literal["reverb_v1"]
     reverb: ReverbV1
+    eq: EqV1 | None = None
     reason: str | None = Field(default=None, max_length=280)
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "done", "failed"]
+    created_at: float
+    updated_at: float
+    stages: Dict[str, float] = Field(default_factory=dict)
+    params: dict | None = None
+    error: str | None = None
+
+class RenderRequest(BaseModel):
+    source_id: str = Field(pattern=r"^[0-9a-f]{64}$")  # SHA-256 of an earlier upload
+    reverb: ReverbV1 | None = None
+    eq: EqV1 | None = None
+    chain: List[EffectName] | None = None  # processing order; defaults to reverb, then eq
+    sample_rate: int | None = None
+    format: Literal["wav", "flac", "ogg"] = "wav"
+    subtype: str | None = None  # defaults per format: PCM_16 for wav/flac, VORBIS for ogg
+
+    @model_validator(mode="after")
+    def require_effect(self):
+        if self.reverb is None and self.eq is None:
+            raise ValueError("At least one of reverb or eq is required")
+        if self.chain is not None:
+            supplied = {name for name in ("reverb", "eq") if getattr(self, name) is not None}
+            if len(set(self.chain)) != len(self.chain):
+                raise ValueError("chain must not repeat an effect")
+            if set(self.chain) != supplied:
+                raise ValueError(f"chain must list exactly the supplied effects: {sorted(supplied)}")
+        return self
@@ -0,0 +1,55 @@
+import hashlib
+from typing import List
+
+import numpy as np
+
+from .audio_cache import ArrayCache
+from .config import settings
+from .dsp import PartitionedConvolver, band_ir_components
+from .kernels import quantize
+from .logger import logger
+
+stem_cache = ArrayCache(settings.stem_cache_dir, settings.stem_cache_max_bytes, name="stems")
+
+
+def _stem_key(content_hash: str, sample_rate: int, channels: int, band: int, decay_s: float) -> str:
+    raw = f"{content_hash}:{sample_rate}:{channels}:{band}:{decay_s:.3f}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def mix_reverb_stems(processor, audio: np.ndarray, content_hash: str, gains_db: List[float],
+                     decays_s: List[float], mix: float, out: np.ndarray) -> None:
+    """
+    Write reverb output (not normalized) into `out`, built from cached per-band wet stems.
+
+    The wet signal is linear in the band gains: wet = scale * sum(g_b * (dry * h_b)),
+    where h_b is band b's unit-gain IR. Each dry * h_b is cached per (source, rate,
+    band, decay), so re-rendering with a different mix or different gains is a
+    weighted sum of cached stems, and changing one band's decay re-convolves
+    only that band.
+    """
+    sr = processor.sample_rate
+    channels = out.shape[1]
+    # Quantized like the kernel cache, so this matches a direct render exactly
+    gains_db = quantize(gains_db, settings.kernel_gain_step_db)
+    decays = quantize(decays_s, settings.kernel_decay_step_s)
+    components, scale = band_ir_components(sr, tuple(processor.frequency_bands), decays, channels)
+
+    # Dry part first, then each band's stem added in place
+    np.multiply(audio, np.float32(1.0 - mix), out=out)
+    scratch = np.empty_like(out)
+    reused = 0
+    for band, (component, gain_db, decay) in enumerate(zip(components, gains_db, decays)):
+        if component is None:
+            continue
+        key = _stem_key(content_hash, sr, channels, band, decay)
+        stem = stem_cache.get(key)
+        if stem is None:
+            stem = PartitionedConvolver(component, processor.block_size).process(audio)
+            stem = stem_cache.put(key, stem)
+        else:
+            reused += 1
+        weight = np.float32(mix * scale * 10 ** (gain_db / 20.0))
+        np.multiply(stem, weight, out=scratch)
+        out += scratch
+    logger.debug("reverb_stems", extra={"extra": {"reused": reused}})
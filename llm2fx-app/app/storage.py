@@ -0,0 +1,248 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Iterator, Sequence
+
+from .config import settings
+from .logger import logger
+from .metrics import STORAGE_EVICTED_BYTES, STORAGE_EVICTED_FILES
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    area TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pins (
+    token TEXT NOT NULL,
+    path TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pins_path ON pins (path);
+"""
+
+
+@dataclass(frozen=True)
+class StorageArea:
+    """A set of files under one directory sharing a byte quota and a TTL (0 disables either)."""
+
+    name: str
+    directory: Path
+    patterns: tuple[str, ...]
+    max_bytes: int = 0
+    ttl_s: float = 0.0
+
+    def scan(self) -> Iterator[tuple[Path, os.stat_result]]:
+        for pattern in self.patterns:
+            for path in self.directory.glob(pattern):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue  # removed while scanning
+                if path.is_file():
+                    yield path, stat
+
+
+class StorageManager:
+    """
+    Keeps uploads, rendered outputs and cache artifacts within byte quotas.
+
+    An SQLite index records each tracked file's area, size and last access;
+    the app touches entries when it stores or reuses a file, and files
+    written elsewhere (render workers, caches) are picked up from their mtime
+    when each area is reconciled with its directory. Touches are collected in
+    memory and written at the start of each sweep, so requests never wait on
+    the index for them. A periodic sweep deletes files past their area's TTL,
+    then the least recently used ones until the area fits its quota. Pinned
+    files (inputs and outputs of in-flight renders) are never deleted; pins
+    live in the index too, so every server process sees them, and expire on
+    their own if their owner dies.
+    """
+
+    def __init__(self, db_path: str, areas: Sequence[StorageArea], pin_ttl_s: float = 6 * 3600.0):
+        self.db_path = db_path
+        self.areas = {area.name: area for area in areas}
+        self.pin_ttl_s = pin_ttl_s
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._usage: dict[str, dict] = {}
+        self._touched: dict[str, tuple[str, float]] = {}
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # The index is rebuilt from the directories on every sweep, so a
+            # commit lost to a power cut costs nothing; skip the fsync per commit
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+        return self._conn
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def touch(self, path: Path, area: str) -> None:
+        """Record that `path` was just written or used; written to the index by the next flush"""
+        with self._lock:
+            self._touched[str(path)] = (area, time.time())
+
+    def flush(self) -> None:
+        """Write pending touches to the index"""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        rows = []
+        for path, (area, last_access) in touched.items():
+            try:
+                rows.append((path, area, Path(path).stat().st_size, last_access))
+            except FileNotFoundError:
+                continue
+        if not rows:
+            return
+        with self._lock:
+            db = self._db()
+            db.executemany("INSERT OR REPLACE INTO files (path, area, size, last_access) VALUES (?, ?, ?, ?)", rows)
+            db.commit()
+
+    @contextmanager
+    def pinned(self, *paths: Path) -> Iterator[None]:
+        """Protect `paths` from eviction for the duration of the block"""
+        token = self.pin(*paths)
+        try:
+            yield
+        finally:
+            self.unpin(token)
+
+    @asynccontextmanager
+    async def pinned_async(self, *paths: Path) -> AsyncIterator[None]:
+        """`pinned` for coroutines: the index is written from a worker thread"""
+        token = await asyncio.to_thread(self.pin, *paths)
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(self.unpin, token)
+
+    def pin(self, *paths: Path) -> str:
+        token = uuid.uuid4().hex
+        expires_at = time.time() + self.pin_ttl_s
+        with self._lock:
+            db = self._db()
+            db.executemany(
+                "INSERT INTO pins (token, path, expires_at) VALUES (?, ?, ?)",
+                [(token, str(path), expires_at) for path in paths],
+            )
+            db.commit()
+        return token
+
+    def unpin(self, token: str) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM pins WHERE token = ?", (token,))
+            db.commit()
+
+    def sweep(self) -> dict:
+        """Reconcile every area with its directory and evict; returns usage per area"""
+        self.flush()
+        now = time.time()
+        usage = {}
+        for area in self.areas.values():
+            usage[area.name] = self._sweep_area(area, now)
+        self._usage = usage
+        return usage
+
+    def _sweep_area(self, area: StorageArea, now: float) -> dict:
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM pins WHERE expires_at < ?", (now,))
+            indexed = dict(db.execute("SELECT path, last_access FROM files WHERE area = ?", (area.name,)))
+            pinned = {row[0] for row in db.execute("SELECT DISTINCT path FROM pins")}
+
+        entries = []
+        for path, stat in area.scan():
+            key = str(path)
+            entries.append((max(stat.st_mtime, indexed.pop(key, 0.0)), stat.st_size, key))
+        entries.sort()  # least recently used first
+        total = sum(size for _, size, _ in entries)
+
+        evicted: dict[str, tuple[int, str]] = {}
+        for last_access, size, key in entries:
+            if area.ttl_s and last_access < now - area.ttl_s and key not in pinned:
+                evicted[key] = (size, "ttl")
+                total -= size
+        for last_access, size, key in entries:
+            if not area.max_bytes or total <= area.max_bytes:
+                break
+            if key not in pinned and key not in evicted:
+                evicted[key] = (size, "quota")
+                total -= size
+
+        for key, (size, reason) in evicted.items():
+            Path(key).unlink(missing_ok=True)
+            STORAGE_EVICTED_FILES.inc(area=area.name, reason=reason)
+            STORAGE_EVICTED_BYTES.inc(size, area=area.name, reason=reason)
+
+        gone = [*evicted, *indexed]  # evicted, or vanished from disk
+        with self._lock:
+            db = self._db()
+            db.executemany("DELETE FROM files WHERE path = ?", [(key,) for key in gone])
+            db.executemany(
+                "INSERT OR REPLACE INTO files (path, area, size, last_access) VALUES (?, ?, ?, ?)",
+                [(key, area.name, size, last_access) for last_access, size, key in entries
+                 if key not in evicted],
+            )
+            db.commit()
+
+        if evicted:
+            logger.info("storage_evicted", extra={"extra": {
+                "area": area.name, "files": len(evicted), "bytes": sum(size for size, _ in evicted.values())
+            }})
+        return {
+            "files": len(entries) - len(evicted),
+            "bytes": total,
+            "max_bytes": area.max_bytes,
+            "ttl_s": area.ttl_s,
+            "evicted": len(evicted),
+        }
+
+    def stats(self) -> dict:
+        """Usage as of the last sweep"""
+        return dict(self._usage)
+
+    async def run(self, interval_s: float) -> None:
+        """Sweep every `interval_s` seconds until cancelled"""
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception:
+                logger.exception("storage_sweep_failed")
+            await asyncio.sleep(interval_s)
+
+
+def default_areas(upload_dir: Path) -> list[StorageArea]:
+    cache_ttl_s = settings.storage_cache_ttl_s
+    return [
+        StorageArea("uploads", upload_dir, ("??/*",),
+                    settings.storage_uploads_max_bytes, settings.storage_uploads_ttl_s),
+        StorageArea("outputs", upload_dir, ("processed_*", "preview_*"),
+                    settings.storage_outputs_max_bytes, settings.storage_outputs_ttl_s),
+        # Partial uploads left behind by a crash
+        StorageArea("incoming", upload_dir, (".incoming-*",), 0, 3600.0),
+        StorageArea("decoded", Path(settings.decoded_cache_dir), ("*.npy",),
+                    settings.decoded_cache_max_bytes, cache_ttl_s),
+        StorageArea("stems", Path(settings.stem_cache_dir), ("*.npy",), settings.stem_cache_max_bytes, cache_ttl_s),
+        StorageArea("previews", Path(settings.preview_cache_dir), ("*.npy",),
+                    settings.preview_cache_max_bytes, cache_ttl_s),
+        StorageArea("kernels", Path(settings.kernel_cache_dir), ("*.npy",),
+                    settings.kernel_cache_max_bytes, cache_ttl_s),
+    ]
@@ -0,0 +1,69 @@
+"""
+Entry points the web process submits to the render pool.
+
+They are referenced by name when pickled, so this module must stay free of
+DSP imports: the server can import it without loading librosa or scipy, and
+each worker pays for those imports the first time it renders (or when it is
+prewarmed).
+"""
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Parameters for the prewarm render: every effect, every band active
+PREWARM_PARAMS = {
+    "reverb": {"gains_db": [-3.0] * 12, "decays_s": [0.5] * 12, "mix": 0.3},
+    "eq": {"gains_db": [1.0] * 12},
+}
+
+
+def process_audio_with_effects(*args, **kwargs) -> bool:
+    from .audio_processor import process_audio_with_effects
+    return process_audio_with_effects(*args, **kwargs)
+
+
+def render_to_bytes(*args, **kwargs) -> bytes:
+    from .audio_processor import render_to_bytes
+    return render_to_bytes(*args, **kwargs)
+
+
+def render_preview(*args, **kwargs) -> bytes:
+    from .audio_processor import render_preview
+    return render_preview(*args, **kwargs)
+
+
+def compute_overview(audio_path: str) -> dict:
+    from .audio_processor import AudioProcessor
+    from .overview import build_overview
+    return build_overview(audio_path, AudioProcessor().frequency_bands)
+
+
+def prewarm(sample_rate: int = 44100, duration_s: float = 0.25) -> float:
+    """
+    Import the DSP stack and run a tiny render through the full chain and the
+    encoder, so filter design, IR synthesis and lazy submodule imports are
+    paid before the first real request. Returns the seconds it took.
+    """
+    started = time.perf_counter()
+    import io
+
+    import numpy as np
+
+    from .audio_processor import AudioProcessor
+    from .chain import build_chain
+
+    processor = AudioProcessor(sample_rate=sample_rate)
+    noise = np.random.default_rng(0).standard_normal((int(sample_rate * duration_s), 2)).astype(np.float32)
+    audio = processor.apply_chain(noise * np.float32(0.1), build_chain(PREWARM_PARAMS))
+    processor.save_audio(audio, io.BytesIO(), sample_rate, format="WAV", subtype="PCM_16")
+    return time.perf_counter() - started
+
+
+def prewarm_worker() -> None:
+    """Render pool initializer; a failed prewarm must not break the pool"""
+    try:
+        elapsed = prewarm()
+        logger.debug(f"Render worker prewarmed in {elapsed:.3f}s")
+    except Exception as e:
+        logger.warning(f"Render worker prewarm failed: {e}")
@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import os
+import re
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+import aiofiles
+import soundfile as sf
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+from .logger import log_sampled
+from .metrics import BYTES_IN
+
+# Enough of the file to hold the header of every format soundfile reads
+HEADER_PROBE_BYTES = 64 * 1024
+# Room for the multipart boundaries and the other form fields next to the files
+FORM_OVERHEAD_BYTES = 1024 * 1024
+
+
+class UploadRejected(Exception):
+    """Raised when an upload breaks a size or duration limit."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class StoredUpload:
+    path: Path
+    sha256: str
+    size: int
+    filename: str
+    duplicate: bool = False
+
+
+def _safe_suffix(filename: str) -> str:
+    suffix = Path(filename).suffix.lower()
+    return suffix if re.fullmatch(r"\.[a-z0-9]{1,8}", suffix) else ".wav"
+
+
+def content_path(upload_dir: Path, sha256: str, suffix: str) -> Path:
+    """Content-addressed location of an upload: uploads/ab/abcdef....wav"""
+    return upload_dir / sha256[:2] / f"{sha256}{suffix}"
+
+
+def find_upload(upload_dir: Path, sha256: str) -> Path | None:
+    """Stored upload with this content hash, whatever its extension"""
+    # Sidecar files such as <hash>.wav.overview.json have more than one suffix
+    candidates = (p for p in (upload_dir / sha256[:2]).glob(f"{sha256}.*") if p.name.count(".") == 1)
+    return next(iter(sorted(candidates)), None)
+
+
+def probe_info(path: Path):
+    """Header info (rate, channels, duration) or None if soundfile cannot parse it"""
+    try:
+        return sf.info(str(path))
+    except Exception:
+        return None  # not a format soundfile can parse; the render path decides
+
+
+def probe_duration(path: Path) -> float | None:
+    info = probe_info(path)
+    return None if info is None else info.duration
+
+
+def wav_declared_duration(header: bytes) -> float | None:
+    """
+    Duration the RIFF/WAVE header declares for its data chunk. soundfile
+    clamps a truncated file to the frames actually present, so a partial
+    upload only tells it a lower bound.
+    """
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        return None
+    pos, byte_rate = 12, 0
+    while pos + 8 <= len(header):
+        chunk_id, size = header[pos:pos + 4], int.from_bytes(header[pos + 4:pos + 8], "little")
+        if chunk_id == b"fmt " and pos + 20 <= len(header):
+            byte_rate = int.from_bytes(header[pos + 16:pos + 20], "little")
+        elif chunk_id == b"data":
+            # Streamed writers leave the size unset (0 or 0xFFFFFFFF)
+            return size / byte_rate if byte_rate and size not in (0, 0xFFFFFFFF) else None
+        pos += 8 + size + (size & 1)
+    return None
+
+
+def probe_partial_duration(path: Path, header: bytes) -> float | None:
+    """Best lower bound on the duration of an upload of which only the start is on disk"""
+    durations = [d for d in (wav_declared_duration(header), probe_duration(path)) if d is not None]
+    return max(durations, default=None)
+
+
+def _check_duration(duration: float | None, max_duration_s: float) -> None:
+    if duration is not None and duration > max_duration_s:
+        raise UploadRejected(413, f"Audio is {duration:.0f}s long; the limit is {max_duration_s:.0f}s")
+
+
+async def save_upload(file: UploadFile, upload_dir: Path, *, max_bytes: int,
+                      max_duration_s: float, chunk_size: int = 1 << 20) -> StoredUpload:
+    """
+    Write an upload to disk in chunks without blocking the event loop.
+
+    The content is hashed while it is written and stored under its SHA-256,
+    so identical uploads share one file and concurrent uploads with the same
+    client filename can no longer overwrite each other. The size limit is
+    enforced per chunk. The duration limit is checked from the header as soon
+    as the first HEADER_PROBE_BYTES are on disk, so an overlong upload is
+    rejected without copying the rest, and again once the file is complete.
+    """
+    filename = Path(file.filename or "upload.wav").name
+    suffix = _safe_suffix(filename)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = upload_dir / f".incoming-{uuid.uuid4().hex}{suffix}"
+
+    hasher = hashlib.sha256()
+    header = b""
+    size = 0
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out:
+            while chunk := await file.read(chunk_size):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected(413, f"Upload exceeds {max_bytes} bytes")
+                hasher.update(chunk)
+                await out.write(chunk)
+                if len(header) < HEADER_PROBE_BYTES:
+                    header += chunk[:HEADER_PROBE_BYTES - len(header)]
+                    if len(header) == HEADER_PROBE_BYTES:
+                        await out.flush()
+                        _check_duration(await asyncio.to_thread(probe_partial_duration, tmp_path, header),
+                                        max_duration_s)
+
+        _check_duration(await asyncio.to_thread(probe_duration, tmp_path), max_duration_s)
+
+        digest = hasher.hexdigest()
+        dest = content_path(upload_dir, digest, suffix)
+        duplicate = dest.exists()
+        if duplicate:
+            tmp_path.unlink()
+        else:
+            dest.parent.mkdir(exist_ok=True)
+            os.replace(tmp_path, dest)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    BYTES_IN.inc(size, kind="upload")
+    log_sampled("upload_stored", {"sha256": digest, "bytes": size, "duplicate": duplicate, "filename": filename})
+    return StoredUpload(path=dest, sha256=digest, size=size, filename=filename, duplicate=duplicate)
+
+
+class UploadBodyLimit:
+    """
+    ASGI middleware capping request bodies on upload routes before the
+    multipart form is parsed: Starlette spools the whole body to disk before
+    an endpoint sees its UploadFile, so save_upload's own limit comes too late
+    for a huge body. A declared Content-Length over the limit is answered
+    with 413 without reading the body; otherwise the bytes are counted as
+    they arrive and parsing stops with 413 once they exceed it.
+    """
+
+    def __init__(self, app, limits: dict[str, int]):
+        self.app = app
+        self.limits = limits  # POST path -> max body bytes
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        detail = f"Request body exceeds {limit} bytes"
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
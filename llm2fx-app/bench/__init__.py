@@ -0,0 +1,9 @@
+"""
+DSP benchmark suite: synthetic signals through the render stages.
+
+    python -m bench --preset standard --output bench.json
+    python -m bench --preset standard --compare bench.json
+
+Every case runs in a fresh process so peak RSS is per case, and signals and
+effect parameters are fixed so results from different commits compare.
+"""
@@ -0,0 +1,67 @@
+import argparse
+import json
+import sys
+
+from .suite import PRESETS, cases_for, compare, run_suite
+
+
+def _floats(text: str) -> list:
+    return [float(x) for x in text.split(",")]
+
+
+def _ints(text: str) -> list:
+    return [int(x) for x in text.split(",")]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench", description="LLM2Fx DSP benchmarks")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="quick")
+    parser.add_argument("--durations", type=_floats, help="comma-separated seconds, overrides the preset")
+    parser.add_argument("--channels", type=_ints, help="comma-separated channel counts")
+    parser.add_argument("--rates", type=_ints, help="comma-separated sample rates")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the median is reported")
+    parser.add_argument("--max-in-memory-s", type=float, default=600,
+                        help="skip whole-buffer stage benchmarks for longer signals")
+    parser.add_argument("--stream-threshold-s", type=float, default=600,
+                        help="end-to-end renders stream signals longer than this")
+    parser.add_argument("--no-isolate", action="store_true", help="run cases in this process (RSS is cumulative)")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown ratio that counts as a regression with --compare")
+    parser.add_argument("--min-time-s", type=float, default=0.01,
+                        help="never flag stages faster than this in both runs (timer noise)")
+    args = parser.parse_args(argv)
+
+    preset = PRESETS[args.preset]
+    cases = cases_for(args.durations or preset["durations"], args.channels or preset["channels"],
+                      args.rates or preset["rates"])
+
+    def progress(result: dict) -> None:
+        e2e = result["stages"]["end_to_end"]
+        print(f"{result['name']:>20}  end_to_end {e2e['median_s']:8.3f}s  "
+              f"{e2e['x_realtime']:>8}x realtime  peak RSS {result['peak_rss_mb']} MB", file=sys.stderr)
+
+    results = run_suite(cases, repeat=args.repeat, isolate=not args.no_isolate, progress=progress,
+                        max_in_memory_s=args.max_in_memory_s, stream_threshold_s=args.stream_threshold_s)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            rows = compare(results, json.load(f), args.threshold, args.min_time_s)
+        for row in rows:
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['case']:>20} {row['stage']:>14}  {row['baseline_s']:9.4f}s -> "
+                  f"{row['current_s']:9.4f}s  x{row['ratio']:.2f}{flag}", file=sys.stderr)
+        if any(row["regression"] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
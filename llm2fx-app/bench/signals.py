@@ -0,0 +1,22 @@
+import numpy as np
+import soundfile as sf
+
+
+def write_signal(path: str, duration_s: float, channels: int, sample_rate: int,
+                 seed: int = 0, block_s: float = 10.0) -> None:
+    """
+    Write a deterministic test signal: a harmonic tone with a slow tremolo over
+    low-level noise, slightly different per channel. Generated block by block,
+    so hour-long signals do not need to fit in memory.
+    """
+    rng = np.random.default_rng(seed)
+    total = int(duration_s * sample_rate)
+    block = int(block_s * sample_rate)
+    detune = 1.0 + 0.002 * np.arange(channels)
+    with sf.SoundFile(path, "w", sample_rate, channels, subtype="PCM_16") as f:
+        for start in range(0, total, block):
+            t = (np.arange(start, min(start + block, total)) / sample_rate)[:, np.newaxis]
+            tone = sum(np.sin(2 * np.pi * 220.0 * k * detune * t) / k for k in (1, 2, 3, 5))
+            tremolo = 0.6 + 0.4 * np.sin(2 * np.pi * 0.5 * t)
+            noise = 0.05 * rng.standard_normal((len(t), channels))
+            f.write((0.3 * tone * tremolo + noise).astype(np.float32))
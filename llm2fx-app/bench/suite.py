@@ -0,0 +1,234 @@
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from multiprocessing import get_context
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import scipy
+import soundfile as sf
+
+from .signals import write_signal
+
+# Fixed parameters so every commit renders the same work
+REVERB = {"gains_db": [0.0, 1.0, 2.0, 1.0, 0.0, -1.0, -2.0, -3.0, -4.0, -6.0, -8.0, -10.0],
+          "decays_s": [2.5, 2.4, 2.2, 2.0, 1.8, 1.6, 1.4, 1.2, 1.0, 0.8, 0.6, 0.5],
+          "mix": 0.35}
+EQ = {"gains_db": [2.0, 1.5, 0.0, -1.0, -2.0, 0.0, 1.0, 2.0, 3.0, 2.0, 1.0, 0.0]}
+
+PRESETS = {
+    "quick": {"durations": [1, 10], "channels": [1, 2], "rates": [44100]},
+    "standard": {"durations": [1, 10, 60, 600], "channels": [1, 2], "rates": [44100, 48000]},
+    "full": {"durations": [1, 10, 60, 600, 3600], "channels": [1, 2], "rates": [44100, 48000, 96000]},
+}
+
+STAGES = ("load_audio", "apply_reverb", "apply_eq", "save_audio", "end_to_end_cold", "end_to_end")
+
+
+@dataclass(frozen=True)
+class Case:
+    duration_s: float
+    channels: int
+    sample_rate: int
+
+    @property
+    def name(self) -> str:
+        return f"{self.duration_s:g}s_{self.channels}ch_{self.sample_rate}"
+
+
+def cases_for(durations: List[float], channels: List[int], rates: List[int]) -> List[Case]:
+    return [Case(d, c, r) for d in durations for c in channels for r in rates]
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+@contextmanager
+def _isolated_caches(workdir: str) -> Iterator[None]:
+    """
+    Point the kernel, decoded-audio and stem caches at empty directories under
+    `workdir` and drop the in-process filter memos, so results never depend on
+    what earlier runs or cases left behind.
+    """
+    from app import audio_cache, audio_processor, dsp, kernels, stems
+    from app.audio_cache import ArrayCache
+    from app.config import settings
+
+    for memo in (dsp.filter_bank, dsp.band_ir_components, kernels.eq_filter_bank):
+        memo.cache_clear()
+
+    saved = (kernels.kernel_cache, audio_cache.decoded_audio_cache, stems.stem_cache)
+    kernels.kernel_cache = ArrayCache(os.path.join(workdir, "kernels"), settings.kernel_cache_max_bytes, name="kernels")
+    audio_cache.decoded_audio_cache = audio_processor.decoded_audio_cache = ArrayCache(
+        os.path.join(workdir, "decoded"), settings.decoded_cache_max_bytes, name="decoded"
+    )
+    stems.stem_cache = ArrayCache(os.path.join(workdir, "stems"), settings.stem_cache_max_bytes, name="stems")
+    try:
+        yield
+    finally:
+        kernels.kernel_cache, audio_cache.decoded_audio_cache, stems.stem_cache = saved
+        audio_processor.decoded_audio_cache = saved[1]
+
+
+def _timed(fn: Callable[[], object], repeat: int) -> List[float]:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def _summary(times: List[float], duration_s: float) -> Dict[str, float]:
+    median = statistics.median(times)
+    return {
+        "median_s": round(median, 6),
+        "min_s": round(min(times), 6),
+        "rtf": round(median / duration_s, 6),  # < 1 is faster than realtime
+        "x_realtime": round(duration_s / median, 2) if median > 0 else None,
+    }
+
+
+def run_case(case: Case, repeat: int = 3, max_in_memory_s: float = 600,
+             stream_threshold_s: float = 600, block_size: int = 8192) -> dict:
+    """
+    Time each render stage on one synthetic signal. Stage benchmarks that hold
+    the whole signal in memory are skipped above `max_in_memory_s`; the
+    end-to-end render streams such files instead.
+
+    Caches start empty in the case's own workdir: end_to_end_cold is a single
+    render that synthesizes its kernels, end_to_end the warm repeats after it.
+    """
+    from app import metrics
+    from app.audio_processor import AudioProcessor, process_audio_with_effects
+
+    result = {**asdict(case), "name": case.name, "stages": {}, "breakdown": {}}
+    with tempfile.TemporaryDirectory(prefix="llm2fx-bench-") as workdir, _isolated_caches(workdir):
+        source = os.path.join(workdir, "source.wav")
+        output = os.path.join(workdir, "output.wav")
+        write_signal(source, case.duration_s, case.channels, case.sample_rate)
+
+        params = {"reverb": REVERB, "eq": EQ}
+        ok = []
+
+        def render() -> None:
+            ok.append(process_audio_with_effects(
+                source, output, params, stream_threshold_s=stream_threshold_s, block_size=block_size
+            ))
+
+        # First render after emptying the caches: kernels are synthesized
+        result["stages"]["end_to_end_cold"] = _summary(_timed(render, 1), case.duration_s)
+
+        if case.duration_s <= max_in_memory_s:
+            processor = AudioProcessor(sample_rate=None, block_size=block_size)
+            audio, _ = processor.load_audio(source)
+            wet = processor.apply_reverb(audio, REVERB["gains_db"], REVERB["decays_s"], REVERB["mix"])
+            stage_fns = {
+                "load_audio": lambda: processor.load_audio(source),
+                "apply_reverb": lambda: processor.apply_reverb(
+                    audio, REVERB["gains_db"], REVERB["decays_s"], REVERB["mix"]
+                ),
+                "apply_eq": lambda: processor.apply_eq(audio, EQ["gains_db"]),
+                "save_audio": lambda: processor.save_audio(wet, output),
+            }
+            for stage, fn in stage_fns.items():
+                result["stages"][stage] = _summary(_timed(fn, repeat), case.duration_s)
+            del audio, wet
+
+        # End to end, with the per-stage spans it records
+        before = metrics.STAGE_SECONDS.stages()
+        times = _timed(render, repeat)
+        if not all(ok):
+            raise RuntimeError(f"End-to-end render failed for {case.name}")
+        result["stages"]["end_to_end"] = _summary(times, case.duration_s)
+        result["streamed"] = case.duration_s > stream_threshold_s
+        for (stage,), total in metrics.STAGE_SECONDS.stages().items():
+            spent = total - before.get((stage,), 0.0)
+            if spent > 0:
+                result["breakdown"][stage] = round(spent / repeat, 6)
+
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def environment() -> dict:
+    def git(*args: str) -> Optional[str]:
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "soundfile": sf.__version__,
+        "libsndfile": sf.__libsndfile_version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def run_suite(cases: List[Case], repeat: int = 3, isolate: bool = True,
+              progress: Callable[[dict], None] = lambda result: None, **kwargs) -> dict:
+    """Run every case, each in a fresh process when `isolate` so peak RSS is per case."""
+    results = []
+    for case in cases:
+        if isolate:
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                result = pool.submit(run_case, case, repeat, **kwargs).result()
+        else:
+            result = run_case(case, repeat, **kwargs)
+        progress(result)
+        results.append(result)
+    return {
+        "environment": environment(),
+        "settings": {"repeat": repeat, "reverb": REVERB, "eq": EQ, **kwargs},
+        "cases": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 1.25, min_time_s: float = 0.01) -> List[dict]:
+    """
+    Stage-by-stage median ratios of `current` against `baseline` for cases
+    present in both. Entries with ratio above `threshold` are regressions,
+    unless both timings are under `min_time_s`, where timer noise dominates.
+    """
+    base_cases = {case["name"]: case for case in baseline["cases"]}
+    rows = []
+    for case in current["cases"]:
+        base = base_cases.get(case["name"])
+        if base is None:
+            continue
+        for stage, stats in case["stages"].items():
+            base_stats = base["stages"].get(stage)
+            if not base_stats or not base_stats["median_s"]:
+                continue
+            ratio = stats["median_s"] / base_stats["median_s"]
+            rows.append({
+                "case": case["name"],
+                "stage": stage,
+                "baseline_s": base_stats["median_s"],
+                "current_s": stats["median_s"],
+                "ratio": round(ratio, 3),
+                "regression": ratio > threshold and max(stats["median_s"], base_stats["median_s"]) >= min_time_s,
+            })
+    return rows
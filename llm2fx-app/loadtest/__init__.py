@@ -0,0 +1,12 @@
+"""
+Load testing without OpenAI credits.
+
+Start the mock chat-completions server and point the app at it:
+
+    python -m loadtest.mock_llm --port 9000 --latency-ms 400 --rate-limit-rate 0.05
+    OPENAI_BASE_URL=http://localhost:9000/v1 OPENAI_API_KEY=sk-mock bash run.sh
+
+Then drive the app at several concurrency levels:
+
+    python -m loadtest --endpoint both --concurrency 1,8,32 --requests 200 --output load.json
+"""
@@ -0,0 +1,61 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+from .driver import run
+
+
+def _audio(path: str | None, seconds: float) -> bytes:
+    if path:
+        with open(path, "rb") as f:
+            return f.read()
+    from bench.signals import write_signal
+
+    with tempfile.TemporaryDirectory() as workdir:
+        generated = os.path.join(workdir, "load.wav")
+        write_signal(generated, seconds, 2, 44100)
+        with open(generated, "rb") as f:
+            return f.read()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="Concurrent load driver for LLM2Fx")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", choices=["text2fx", "process-audio", "both"], default="text2fx")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="requests per endpoint and level")
+    parser.add_argument("--unique-ratio", type=float, default=0.2,
+                        help="fraction of one-off instructions (cache misses)")
+    parser.add_argument("--audio", help="file to upload to /process-audio (default: generated)")
+    parser.add_argument("--audio-seconds", type=float, default=5.0, help="length of the generated upload")
+    parser.add_argument("--timeout-s", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    endpoints = ["text2fx", "process-audio"] if args.endpoint == "both" else [args.endpoint]
+    audio = _audio(args.audio, args.audio_seconds) if "process-audio" in endpoints else None
+    levels = [int(level) for level in args.concurrency.split(",")]
+    summaries = asyncio.run(run(args.url, endpoints, levels, args.requests, args.unique_ratio, audio,
+                                timeout_s=args.timeout_s, seed=args.seed))
+
+    print(f"{'endpoint':>14} {'conc':>5} {'reqs':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}",
+          file=sys.stderr)
+    for s in summaries:
+        lat = s["latency_s"]
+        print(f"{s['endpoint']:>14} {s['concurrency']:>5} {s['requests']:>6} {s['throughput_rps']:>8} "
+              f"{lat['p50']:>8} {lat['p95']:>8} {lat['p99']:>8} {s['error_rate']:>7.2%}", file=sys.stderr)
+    text = json.dumps({"url": args.url, "unique_ratio": args.unique_ratio, "levels": summaries}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import asyncio
+import itertools
+import math
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+
+INSTRUMENTS = ["vocal", "guitar", "drums", "piano", "synth", "strings"]
+SPACES = ["small room", "large hall", "plate", "cathedral", "tight booth", "chamber"]
+MOODS = ["warm", "bright", "dark", "airy", "intimate", "lush"]
+
+
+@dataclass
+class LevelResult:
+    endpoint: str
+    concurrency: int
+    latencies_s: List[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+    wall_s: float = 0.0
+
+    def summary(self) -> dict:
+        total = sum(self.statuses.values())
+        ok = self.statuses.get("200", 0)
+        return {
+            "endpoint": self.endpoint,
+            "concurrency": self.concurrency,
+            "requests": total,
+            "ok": ok,
+            "error_rate": round(1 - ok / total, 4) if total else None,
+            "statuses": dict(self.statuses),
+            "throughput_rps": round(total / self.wall_s, 2) if self.wall_s else None,
+            "latency_s": {
+                "p50": percentile(self.latencies_s, 50),
+                "p95": percentile(self.latencies_s, 95),
+                "p99": percentile(self.latencies_s, 99),
+                "max": round(max(self.latencies_s), 4) if self.latencies_s else None,
+            },
+        }
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return round(ordered[rank - 1], 4)
+
+
+def instructions(unique_ratio: float, seed: int = 0):
+    """
+    Endless instruction stream. A `unique_ratio` fraction are one-off phrases
+    that miss every cache; the rest repeat from a small vocabulary.
+    """
+    rng = random.Random(seed)
+    common = [f"{mood} {space}" for mood, space in itertools.product(MOODS, SPACES)]
+    for n in itertools.count():
+        if rng.random() < unique_ratio:
+            yield f"{rng.choice(MOODS)} {rng.choice(SPACES)} take {n}"
+        else:
+            yield rng.choice(common)
+
+
+async def _request(client: httpx.AsyncClient, endpoint: str, instruction: str, instrument: str,
+                   audio: Optional[bytes]) -> httpx.Response:
+    if endpoint == "text2fx":
+        return await client.post("/text2fx", json={
+            "fx_type": "reverb", "instrument": instrument, "instruction": instruction
+        })
+    return await client.post(
+        "/process-audio",
+        files={"file": ("load.wav", audio, "audio/wav")},
+        data={"fx_type": "reverb", "instrument": instrument, "instruction": instruction},
+    )
+
+
+async def run_level(base_url: str, endpoint: str, concurrency: int, requests: int,
+                    unique_ratio: float = 0.2, audio: Optional[bytes] = None,
+                    timeout_s: float = 120.0, seed: int = 0) -> LevelResult:
+    """Send `requests` requests with `concurrency` in flight at a time (closed loop)."""
+    result = LevelResult(endpoint, concurrency)
+    phrases = instructions(unique_ratio, seed)
+    rng = random.Random(seed)
+    remaining = requests
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout_s, limits=limits) as client:
+        async def user() -> None:
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                try:
+                    resp = await _request(client, endpoint, next(phrases), rng.choice(INSTRUMENTS), audio)
+                    await resp.aread()
+                    status = str(resp.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                result.latencies_s.append(time.perf_counter() - started)
+                result.statuses[status] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        result.wall_s = time.perf_counter() - started
+    return result
+
+
+async def run(base_url: str, endpoints: List[str], levels: List[int], requests: int,
+              unique_ratio: float = 0.2, audio: Optional[bytes] = None, **kwargs) -> List[Dict]:
+    summaries = []
+    for endpoint in endpoints:
+        for concurrency in levels:
+            result = await run_level(base_url, endpoint, concurrency, requests, unique_ratio,
+                                     audio if endpoint == "process-audio" else None, **kwargs)
+            summaries.append(result.summary())
+    return summaries
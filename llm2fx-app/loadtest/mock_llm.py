@@ -0,0 +1,113 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.prompts import FEWSHOTS
+
+CANNED_REPLIES = [json.loads(reply) for _, reply in FEWSHOTS]
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 300.0
+    jitter_ms: float = 100.0
+    error_rate: float = 0.0       # fraction of requests answered with HTTP 500
+    rate_limit_rate: float = 0.0  # fraction answered with HTTP 429
+    retry_after_s: float = 1.0
+    invalid_json_rate: float = 0.0  # fraction whose content is not JSON
+    seed: int | None = None
+
+
+def _reply_for(instruction: str) -> dict:
+    """Canned reverb_v1 reply, chosen and nudged deterministically by the instruction."""
+    digest = hashlib.sha256(instruction.encode("utf-8")).digest()
+    reply = json.loads(json.dumps(CANNED_REPLIES[digest[0] % len(CANNED_REPLIES)]))
+    reply["reverb"]["mix"] = round(min(1.0, max(0.0, reply["reverb"]["mix"] + (digest[1] - 128) / 1280)), 3)
+    return reply
+
+
+def create_app(config: MockConfig) -> FastAPI:
+    app = FastAPI(title="Mock chat completions")
+    rng = random.Random(config.seed)
+    stats = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0}
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        delay = max(0.0, config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+
+        roll = rng.random()
+        if roll < config.rate_limit_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached (mock)", "type": "requests"}},
+                headers={"Retry-After": f"{config.retry_after_s:g}"},
+            )
+        if roll < config.rate_limit_rate + config.error_rate:
+            stats["errors"] += 1
+            return JSONResponse(status_code=500, content={"error": {"message": "Internal error (mock)"}})
+
+        messages = body.get("messages", [])
+        prompt = messages[-1]["content"] if messages else ""
+        if rng.random() < config.invalid_json_rate:
+            content = "Sure! Here are your parameters."
+        else:
+            content = json.dumps(_reply_for(prompt))
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        completion_tokens = len(content) // 4
+        stats["ok"] += 1
+        return {
+            "id": f"chatcmpl-mock-{stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def main(argv=None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(prog="python -m loadtest.mock_llm", description="Mock OpenAI chat completions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=MockConfig.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=MockConfig.jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=MockConfig.error_rate)
+    parser.add_argument("--rate-limit-rate", type=float, default=MockConfig.rate_limit_rate)
+    parser.add_argument("--retry-after-s", type=float, default=MockConfig.retry_after_s)
+    parser.add_argument("--invalid-json-rate", type=float, default=MockConfig.invalid_json_rate)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+    config = MockConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, retry_after_s=args.retry_after_s,
+        invalid_json_rate=args.invalid_json_rate, seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
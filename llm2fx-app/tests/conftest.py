@@ -0,0 +1,63 @@
+import io
+import json
+
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi.testclient import TestClient
+
+REPLY = json.dumps({
+    "schema_version": "reverb_v1",
+    "reverb": {"gains_db": [-3.0] * 12, "decays_s": [0.4] * 12, "mix": 0.3},
+    "reason": "stub",
+})
+
+
+@pytest.fixture
+def app_dir(tmp_path, monkeypatch):
+    """Run the app in a scratch directory: uploads, databases and caches all resolve under it"""
+    import app.main  # noqa: F401 - mounts static files relative to the repo
+    from app.config import settings
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "render_prewarm", False)
+    monkeypatch.setattr(settings, "storage_sweep_interval_s", 0)
+    return tmp_path
+
+
+@pytest.fixture
+def fx_params() -> dict:
+    """The parameters the stubbed provider replies with"""
+    return json.loads(REPLY)
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    """Stub the provider; every request that reaches it is recorded"""
+    from app import fx
+
+    calls = []
+
+    async def fake_chat(messages, force_json=True):
+        calls.append(messages)
+        return REPLY
+
+    monkeypatch.setattr(fx, "call_openai_chat", fake_chat)
+    return calls
+
+
+@pytest.fixture
+def client(app_dir, llm_calls):
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def wav() -> bytes:
+    """Half a second of 16 kHz stereo noise as a WAV upload"""
+    audio = np.random.default_rng(0).uniform(-0.3, 0.3, (8000, 2)).astype(np.float32)
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, 16000, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
@@ -0,0 +1,51 @@
+import io
+
+import soundfile as sf
+
+from app.config import settings
+
+FORM = {"instrument": "guitar", "fx_type": "reverb", "instruction": "a cavernous cathedral tail"}
+
+
+def test_text2fx_validates_and_caches_the_reply(client, llm_calls):
+    body = {"instrument": "guitar", "fx_type": "reverb", "instruction": "a cavernous cathedral tail"}
+    r = client.post("/text2fx", json=body)
+    assert r.status_code == 200
+    assert r.json()["reverb"]["mix"] == 0.3
+    assert len(r.json()["reverb"]["gains_db"]) == 12
+
+    # The repeat is answered from the response cache
+    assert client.post("/text2fx", json=body).json() == r.json()
+    assert len(llm_calls) == 1
+
+    assert client.post("/text2fx", json={**body, "fx_type": "chorus"}).status_code == 422
+
+
+def test_process_audio_streams_the_rendered_upload(client, wav, app_dir):
+    r = client.post("/process-audio", files={"file": ("take.wav", wav, "audio/wav")}, data=FORM)
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "audio/wav"
+    assert "processed_take.wav" in r.headers["content-disposition"]
+    audio, sr = sf.read(io.BytesIO(r.content), always_2d=True)
+    assert sr == 16000 and audio.shape == (8000, 2)
+    # Short renders come back as bytes: no output file is left behind
+    assert not list((app_dir / "uploads").glob("processed_*"))
+
+    source_id = r.headers["x-source-id"]
+    r = client.post("/process-audio", files={"file": ("take.wav", wav, "audio/wav")},
+                    data={**FORM, "format": "flac"})
+    assert r.headers["x-source-id"] == source_id  # same content, same stored upload
+    assert sf.info(io.BytesIO(r.content)).format == "FLAC"
+
+    r = client.post("/process-audio", files={"file": ("take.wav", wav, "audio/wav")}, data={**FORM, "format": "mp4"})
+    assert r.status_code == 422
+
+
+def test_process_audio_spools_outputs_over_the_in_memory_limit(client, wav, app_dir, monkeypatch):
+    monkeypatch.setattr(settings, "render_in_memory_max_bytes", 1024)
+    r = client.post("/process-audio", files={"file": ("take.wav", wav, "audio/wav")}, data=FORM)
+    assert r.status_code == 200
+    assert int(r.headers["content-length"]) == len(r.content)
+    assert sf.read(io.BytesIO(r.content), always_2d=True)[0].shape == (8000, 2)
+    # The temporary output is deleted once it has been streamed
+    assert not list((app_dir / "uploads").glob("processed_*"))
@@ -0,0 +1,65 @@
+import asyncio
+import io
+import json
+import zipfile
+
+from app.batch import BatchItem, stream_zip
+
+def test_stream_zip_adds_items_as_they_arrive_and_writes_manifest(tmp_path):
+    items = []
+    for i, instruction in enumerate(["Big Hall!", "tight room"]):
+        output = tmp_path / f"out{i}.wav"
+        output.write_bytes(bytes([i]) * 5000)
+        items.append(BatchItem(index=i, filename="kick.wav", instruction=instruction, source_id="ab" * 32,
+                               input_path=tmp_path / "src.wav", params={"reverb": {}}, output_path=output))
+    items.append(BatchItem(index=2, filename="snare.wav", instruction="room", source_id="cd" * 32,
+                           input_path=tmp_path / "src.wav", params={}, error="Audio processing failed"))
+
+    async def finished():
+        for item in reversed(items):
+            yield item
+
+    async def collect():
+        return [chunk async for chunk in stream_zip(finished(), chunk_size=1024)]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) > 5  # streamed, not built up front
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert archive.namelist() == ["001_kick_tight-room.wav", "000_kick_big-hall.wav", "manifest.json"]
+    assert archive.read("000_kick_big-hall.wav") == bytes([0]) * 5000
+    manifest = json.loads(archive.read("manifest.json"))["items"]
+    assert [entry["index"] for entry in manifest] == [0, 1, 2]
+    assert manifest[2]["file"] is None and manifest[2]["error"] == "Audio processing failed"
+    assert not list(tmp_path.glob("out*.wav"))
+
+def test_process_batch_over_http(client, wav, app_dir, fx_params, monkeypatch):
+    from app import main
+    from app.config import settings
+
+    requested = []
+
+    async def fake_generate(req):
+        requested.append(req.instruction)
+        if req.instruction == "fail":
+            raise ValueError("provider unavailable")
+        return fx_params
+
+    monkeypatch.setattr(main, "generate_fx_params", fake_generate)
+    files = [("files", ("kick.wav", wav, "audio/wav")), ("files", ("notes.wav", b"not audio", "audio/wav"))]
+    form = {"instrument": "drums", "fx_type": "reverb", "instructions": ["Big Hall!", "tight room", "Big Hall!"]}
+
+    r = client.post("/process-batch", files=files, data=form)
+    assert r.status_code == 200
+    assert sorted(requested) == ["Big Hall!", "tight room"]  # once per distinct instruction
+    archive = zipfile.ZipFile(io.BytesIO(r.content))
+    assert sorted(archive.namelist()) == ["000_kick_big-hall.wav", "001_kick_tight-room.wav", "manifest.json"]
+    manifest = json.loads(archive.read("manifest.json"))["items"]
+    assert [entry["index"] for entry in manifest] == [0, 1, 2, 3]
+    assert manifest[0]["params"] == fx_params
+    # An unreadable file fails its own items without sinking the batch
+    assert [entry["error"] is not None for entry in manifest] == [False, False, True, True]
+    assert not list((app_dir / "uploads").glob("processed_*"))
+
+    assert client.post("/process-batch", files=files, data={**form, "instructions": ["fail"]}).status_code == 502
+    monkeypatch.setattr(settings, "batch_max_items", 3)
+    assert client.post("/process-batch", files=files, data=form).status_code == 413
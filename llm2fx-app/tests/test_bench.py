@@ -0,0 +1,15 @@
+from bench.suite import STAGES, Case, compare, run_case
+
+def test_bench_case_reports_every_stage_and_compares(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    result = run_case(Case(duration_s=0.5, channels=2, sample_rate=16000), repeat=1)
+    assert set(result["stages"]) == set(STAGES)
+    # Caches live in the case's temp workdir, not the shared cache/ directory
+    assert list(tmp_path.iterdir()) == []
+    assert result["stages"]["end_to_end"]["rtf"] > 0
+    assert {"decode", "effect_reverb", "effect_eq", "encode"} <= set(result["breakdown"])
+
+    slower = {"cases": [{**result, "stages": {"end_to_end": {"median_s": 1.0}}}]}
+    baseline = {"cases": [{**result, "stages": {"end_to_end": {"median_s": 0.5}}}]}
+    [row] = compare(slower, baseline, threshold=1.25)
+    assert row["ratio"] == 2.0 and row["regression"]
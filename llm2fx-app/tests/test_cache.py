@@ -0,0 +1,52 @@
+from app.cache import ResponseCache
+
+PAYLOAD = {"schema_version": "reverb_v1", "reverb": {"gains_db": [0.0] * 12, "decays_s": [1.0] * 12, "mix": 0.3}, "reason": None}
+
+def test_key_normalizes_instruction_and_tracks_prompt_version():
+    k1 = ResponseCache.make_key("reverb", "Vocal", "Warm  small ROOM", "gpt", "v1")
+    k2 = ResponseCache.make_key("reverb", "vocal", " warm small room ", "gpt", "v1")
+    k3 = ResponseCache.make_key("reverb", "vocal", "warm small room", "gpt", "v2")
+    assert k1 == k2
+    assert k1 != k3
+
+def test_memory_then_disk_tier(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(db_path)
+    assert cache.get("k") is None
+    cache.put("k", PAYLOAD)
+    assert cache.get("k") == PAYLOAD
+    cache.close()
+
+    restarted = ResponseCache(db_path)
+    assert restarted.get("k") == PAYLOAD
+    assert restarted.get("k") == PAYLOAD
+    stats = restarted.stats()
+    assert (stats["hits_disk"], stats["hits_memory"], stats["misses"]) == (1, 1, 0)
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl_s=-1, disk_ttl_s=-1)
+    cache.put("k", PAYLOAD)
+    assert cache.get("k") is None
+    assert cache.stats()["misses"] == 1
+
+def test_lru_bound(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, PAYLOAD)
+    assert cache.stats()["memory_entries"] == 2
+
+def test_array_cache_memmaps_and_evicts_lru(tmp_path):
+    import os
+    import numpy as np
+    from app.audio_cache import ArrayCache
+
+    cache = ArrayCache(str(tmp_path), max_bytes=2 * 4000 + 512)
+    first = cache.put("a", np.ones(1000, dtype=np.float32))
+    assert isinstance(first, np.memmap)
+    cache.put("b", np.zeros(1000, dtype=np.float32))
+    os.utime(tmp_path / "a.npy", (0, 0))  # make "a" the least recently used
+    assert cache.get("b") is not None
+    cache.put("c", np.zeros(1000, dtype=np.float32))
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
+    assert np.array_equal(cache.get("b"), np.zeros(1000, dtype=np.float32))
@@ -1,6 +1,11 @@
 import asyncio
+
+import pytest
+from pydantic import ValidationError
+
 from app.prompts import build_messages
 from app.llm import parse_json_safe
+from app.schemas import RenderRequest
 
 def test_parse_json_safe_ok():
     assert parse_json_safe('{"a":1}') == {"a":1}
@@ -14,3 +19,13 @@ def test_messages_shape():
     assert len(msgs) == 8
     assert msgs[0]["role"] == "system"
     assert msgs[-1]["role"] == "user"
+
+def test_render_request_chain_must_name_the_supplied_effects():
+    reverb = {"gains_db": [0.0] * 12, "decays_s": [1.0] * 12, "mix": 0.3}
+    eq = {"gains_db": [0.0] * 12}
+    source = {"source_id": "ab" * 32}
+    assert RenderRequest(**source, reverb=reverb, eq=eq, chain=["eq", "reverb"]).chain == ["eq", "reverb"]
+    for bad in ({"reverb": reverb, "chain": ["eq"]}, {"reverb": reverb, "eq": eq, "chain": ["reverb"]},
+                {"reverb": reverb, "chain": ["reverb", "reverb"]}, {"reverb": reverb, "chain": []}):
+        with pytest.raises(ValidationError):
+            RenderRequest(**source, **bad)
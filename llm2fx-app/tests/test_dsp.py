@@ -0,0 +1,233 @@
+import numpy as np
+import pytest
+import soundfile as sf
+from scipy.signal import fftconvolve
+
+from app.audio_processor import AudioProcessor, process_audio_streaming
+from app.dsp import FilterBankStream, PartitionedConvolver, ResampleStream, resample, synthesize_ir
+
+BANDS = [20, 50, 100, 200, 400, 800, 1500, 3000, 6000, 12000, 16000, 20000]
+
+def test_partitioned_convolution_matches_direct():
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal((10_000, 2)).astype(np.float32)
+    ir = rng.standard_normal((3_000, 2)).astype(np.float32)
+    y = PartitionedConvolver(ir, block_size=1024).process(x)
+    ref = np.stack([fftconvolve(x[:, c], ir[:, c])[: len(x)] for c in range(2)], axis=1)
+    assert y.dtype == np.float32
+    assert np.allclose(y, ref, atol=1e-3)
+
+def test_ir_honours_per_band_decay_and_unit_energy():
+    sr = 16000
+    ir = synthesize_ir(sr, BANDS, [0.0] * 12, [2.0] * 12)
+    assert ir.shape == (2 * sr, 2)
+    assert np.allclose(np.sum(ir ** 2, axis=0), 1.0, atol=0.05)
+
+    short_highs = synthesize_ir(sr, BANDS, [0.0] * 12, [2.0] * 6 + [0.2] * 6)
+    tail = short_highs[sr // 2:]
+    spectrum = np.abs(np.fft.rfft(tail[:, 0]))
+    freqs = np.fft.rfftfreq(len(tail), 1 / sr)
+    assert spectrum[freqs > 3000].mean() < 0.01 * spectrum[(freqs > 100) & (freqs < 800)].mean()
+
+def test_apply_reverb_mono_in_stereo_out():
+    processor = AudioProcessor(sample_rate=16000)
+    audio = np.sin(np.linspace(0, 200, 16000)).astype(np.float32)
+    out = processor.apply_reverb(audio, [0.0] * 12, [1.0] * 12, 0.5)
+    assert out.shape == (16000, 2)
+    assert out.dtype == np.float32
+    assert np.isclose(np.max(np.abs(out)), 0.95)
+
+def test_filter_bank_is_memoized_and_covers_nyquist():
+    processor = AudioProcessor(sample_rate=22050)
+    bank = processor.filter_bank()
+    assert bank is processor.filter_bank()
+    # Nyquist is 11.025 kHz: the 6-12 kHz band becomes a highpass, the rest vanish
+    assert [sos is None for sos in bank] == [False] * 10 + [True] * 2
+
+def test_apply_eq_handles_mono_and_isolates_bands():
+    sr = 16000
+    processor = AudioProcessor(sample_rate=sr)
+    t = np.arange(sr) / sr
+    low = np.sin(2 * np.pi * 35 * t)
+    high = np.sin(2 * np.pi * 2000 * t)
+    gains = [0.0] * 12
+    gains[1] = -12.0  # 20-50 Hz band
+
+    out = processor.apply_eq((low + high).astype(np.float32), gains)
+    assert out.shape == (sr,)
+    assert np.all(np.isfinite(out))
+    spectrum = np.abs(np.fft.rfft(out[sr // 4: -sr // 4]))
+    freqs = np.fft.rfftfreq(sr // 2, 1 / sr)
+    low_level = spectrum[np.argmin(np.abs(freqs - 35))]
+    high_level = spectrum[np.argmin(np.abs(freqs - 2000))]
+    assert low_level < 0.4 * high_level
+
+def test_streaming_render_matches_in_memory_reverb(tmp_path):
+    sr = 16000
+    rng = np.random.default_rng(3)
+    audio = (0.3 * rng.standard_normal(sr * 2)).astype(np.float32)
+    src = tmp_path / "in.wav"
+    sf.write(src, audio, sr, subtype="FLOAT")
+    params = {"reverb": {"gains_db": [0.0] * 12, "decays_s": [0.5] * 12, "mix": 0.4}}
+
+    out = tmp_path / "out.wav"
+    process_audio_streaming(str(src), str(out), params, block_size=1024)
+    streamed, out_sr = sf.read(out, dtype="float32")
+
+    expected = AudioProcessor(sample_rate=sr, block_size=1024).apply_reverb(audio, [0.0] * 12, [0.5] * 12, 0.4)
+    assert out_sr == sr
+    assert streamed.shape == expected.shape
+    assert np.allclose(streamed, expected, atol=1e-3)
+
+def test_resample_stream_matches_one_shot_resampling():
+    x = np.random.default_rng(8).uniform(-0.5, 0.5, (20011, 2)).astype(np.float32)
+    for orig_sr, target_sr in [(44100, 48000), (48000, 16000)]:
+        stream = ResampleStream(orig_sr, target_sr, 2)
+        sizes = [1, 700, 8192, 5, 11113]
+        pieces = [stream.process_block(x[sum(sizes[:i]):sum(sizes[:i + 1])]) for i in range(len(sizes))]
+        streamed = np.concatenate(pieces + [stream.flush()])
+        assert np.allclose(streamed, resample(x, orig_sr, target_sr), atol=1e-6)
+
+def test_streaming_render_resamples_block_by_block(tmp_path):
+    audio = (0.3 * np.random.default_rng(9).standard_normal(32000)).astype(np.float32)
+    src = tmp_path / "in.wav"
+    sf.write(src, audio, 16000, subtype="FLOAT")
+    params = {"reverb": {"gains_db": [0.0] * 12, "decays_s": [0.5] * 12, "mix": 0.4}}
+
+    out = tmp_path / "out.wav"
+    process_audio_streaming(str(src), str(out), params, block_size=1024, sample_rate=22050)
+    streamed, out_sr = sf.read(out, dtype="float32")
+
+    processor = AudioProcessor(sample_rate=22050, block_size=1024)
+    expected = processor.apply_reverb(resample(audio, 16000, 22050), [0.0] * 12, [0.5] * 12, 0.4)
+    assert out_sr == 22050
+    assert streamed.shape == expected.shape
+    assert np.allclose(streamed, expected, atol=1e-3)
+
+def test_filter_bank_stream_is_block_invariant():
+    processor = AudioProcessor(sample_rate=16000)
+    x = np.random.default_rng(4).standard_normal((5000, 2)).astype(np.float32)
+    gains = np.linspace(-6, 6, 12)
+    whole = FilterBankStream(processor.filter_bank(), gains, 2).process_block(x)
+    stream = FilterBankStream(processor.filter_bank(), gains, 2)
+    blocks = np.concatenate([stream.process_block(x[i:i + 700]) for i in range(0, 5000, 700)])
+    assert np.allclose(whole, blocks, atol=1e-5)
+
+def test_load_audio_keeps_native_rate_and_channels(tmp_path):
+    path = tmp_path / "stereo.wav"
+    stereo = np.random.default_rng(5).uniform(-0.5, 0.5, (4800, 2)).astype(np.float32)
+    sf.write(path, stereo, 48000, subtype="FLOAT")
+
+    native = AudioProcessor(sample_rate=None)
+    audio, sr = native.load_audio(str(path))
+    assert (sr, native.sample_rate) == (48000, 48000)
+    assert audio.shape == (4800, 2)
+    assert np.array_equal(audio, stereo)
+
+    audio, sr = AudioProcessor(sample_rate=44100).load_audio(str(path))
+    assert sr == 44100
+    assert audio.shape == (4410, 2)
+    assert audio.dtype == np.float32
+
+def test_load_audio_falls_back_to_librosa_with_content_hash(tmp_path, monkeypatch):
+    import librosa
+    from app import audio_processor
+    from app.audio_cache import ArrayCache
+
+    monkeypatch.setattr(audio_processor, "decoded_audio_cache", ArrayCache(str(tmp_path / "cache"), max_bytes=1 << 30))
+    stereo = np.random.default_rng(7).uniform(-0.5, 0.5, (2, 2205)).astype(np.float32)
+    decoded = []
+
+    def fake_load(path, sr=None, mono=True, **kwargs):
+        decoded.append(path)
+        return stereo, 22050
+
+    monkeypatch.setattr(librosa, "load", fake_load)
+    path = tmp_path / "clip.m4a"
+    path.write_bytes(b"\x00\x00\x00\x20ftypM4A not something libsndfile reads")
+
+    audio, sr = AudioProcessor(sample_rate=None).load_audio(str(path), content_hash="abc")
+    assert sr == 22050
+    assert np.array_equal(audio, stereo.T)
+    assert (tmp_path / "cache" / "abc_22050.npy").exists()
+
+    # A fixed-rate load of the same content is served from the cache
+    audio, sr = AudioProcessor(sample_rate=22050).load_audio(str(path), content_hash="abc")
+    assert sr == 22050 and len(decoded) == 1
+
+def test_chain_reverb_from_stems_matches_direct_and_reuses_stems(tmp_path, monkeypatch):
+    from app import stems
+    from app.audio_cache import ArrayCache
+    from app.chain import build_chain
+
+    monkeypatch.setattr(stems, "stem_cache", ArrayCache(str(tmp_path), max_bytes=1 << 30))
+    processor = AudioProcessor(sample_rate=16000, block_size=1024)
+    audio = np.random.default_rng(6).uniform(-0.5, 0.5, 8000).astype(np.float32)
+    gains = list(np.linspace(-6, 6, 12))
+    decays = [0.3] * 6 + [0.5] * 6
+
+    def render(mix):
+        chain = build_chain({"reverb": {"gains_db": gains, "decays_s": decays, "mix": mix}})
+        return chain.run(processor, audio, content_hash="src"), chain.run(processor, audio)
+
+    from_stems, direct = render(0.4)
+    assert np.allclose(from_stems, direct, atol=1e-4)
+    # One stem per band below Nyquist (8 kHz); the hashless run caches none
+    assert len(list(tmp_path.glob("*.npy"))) == 10
+
+    # A mix/gain tweak only re-weights the cached stems
+    gains[3] = 9.0
+    from_stems, direct = render(0.7)
+    assert len(list(tmp_path.glob("*.npy"))) == 10
+    assert np.allclose(from_stems, direct, atol=1e-4)
+
+def test_kernel_cache_shares_quantized_irs_and_filter_banks(tmp_path, monkeypatch):
+    from app import kernels
+    from app.audio_cache import ArrayCache
+    from app.dsp import filter_bank, partition_spectra
+
+    monkeypatch.setattr(kernels, "kernel_cache", ArrayCache(str(tmp_path), max_bytes=1 << 30))
+    gains, decays = [1.0] * 12, [0.5] * 12
+    ir = kernels.reverb_ir(16000, BANDS, gains, decays, 2)
+    assert np.allclose(ir, synthesize_ir(16000, BANDS, gains, decays, 2))
+    # Within the quantization step: same file, no new synthesis
+    nudged = kernels.reverb_ir(16000, BANDS, [1.01] * 12, [0.501] * 12, 2)
+    assert isinstance(nudged, np.memmap) and np.array_equal(ir, nudged)
+    assert len(list(tmp_path.glob("*.npy"))) == 1
+
+    spectra = kernels.reverb_spectra(16000, BANDS, gains, decays, 2, 1024)
+    assert np.allclose(spectra, partition_spectra(ir, 1024))
+
+    kernels.eq_filter_bank.cache_clear()
+    bank = kernels.eq_filter_bank(16000, tuple(BANDS))
+    for cached, designed in zip(bank, filter_bank(16000, tuple(BANDS))):
+        assert (cached is None and designed is None) or np.allclose(cached, designed)
+    assert len(list(tmp_path.glob("*.npy"))) == 3
+
+def test_effect_chain_runs_nodes_in_order_with_one_normalization():
+    from app.chain import EffectChain, EqNode, ReverbNode, build_chain
+
+    processor = AudioProcessor(sample_rate=16000, block_size=1024)
+    audio = np.random.default_rng(7).uniform(-0.5, 0.5, 8000).astype(np.float32)
+    gains = list(np.linspace(-6, 6, 12))
+    reverb = ReverbNode(gains, [0.3] * 12, 0.4)
+    eq = EqNode(gains[::-1])
+
+    out = EffectChain([reverb, eq]).run(processor, audio)
+    assert out.shape == (8000, 2) and out.dtype == np.float32
+    assert np.isclose(np.max(np.abs(out)), 0.95)
+    # Normalizing between stages is a linear rescale, so one final stage matches
+    staged = processor.apply_eq(processor.apply_reverb(audio, gains, [0.3] * 12, 0.4), gains[::-1])
+    assert np.allclose(out, staged, atol=1e-4)
+
+    chain = build_chain({"eq": {"gains_db": gains}, "reverb": {"gains_db": gains, "decays_s": [0.3] * 12, "mix": 0.4},
+                         "chain": ["reverb", "eq"]})
+    assert [node.name for node in chain.nodes] == ["reverb", "eq"]
+    assert [node.name for node in build_chain({"reverb": None, "eq": {"gains_db": gains}}).nodes] == ["eq"]
+    # A chain that disagrees with the supplied effects is an error, never a silent skip
+    reverb_only = {"reverb": {"gains_db": gains, "decays_s": [0.3] * 12, "mix": 0.4}, "eq": None}
+    both = {**reverb_only, "eq": {"gains_db": gains}}
+    for params in ({**reverb_only, "chain": ["eq"]}, {**both, "chain": ["reverb"]},
+                   {**both, "chain": ["reverb", "eq", "eq"]}):
+        with pytest.raises(ValueError):
+            build_chain(params)
\ No newline at end of file
@@ -0,0 +1,130 @@
+import asyncio
+import io
+import threading
+import time
+
+import pytest
+import soundfile as sf
+from fastapi.testclient import TestClient
+
+from app.jobs import JobStore, JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED
+
+def test_job_store_roundtrip_survives_reopen(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite")
+    store = JobStore(db_path)
+    job_id = store.create(fx_type="reverb", instrument="vocal", instruction="small room",
+                          input_path="uploads/x.wav", input_filename="x.wav")
+    store.update(job_id, status=JOB_RUNNING, stages={"upload": 0.5}, params={"reverb": {"mix": 0.3}})
+    store.close()
+
+    reopened = JobStore(db_path)
+    job = reopened.get(job_id)
+    assert job["status"] == JOB_RUNNING
+    assert job["stages"] == {"upload": 0.5}
+    assert job["params"] == {"reverb": {"mix": 0.3}}
+    assert [j["id"] for j in reopened.unfinished()] == [job_id]
+
+    reopened.update(job_id, status=JOB_DONE)
+    assert reopened.unfinished() == []
+    assert reopened.get("missing") is None
+
+def test_job_store_new_jobs_are_queued(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    job_id = store.create(fx_type="reverb", instrument="vocal", instruction="hall",
+                          input_path="a.wav", input_filename="a.wav")
+    assert store.get(job_id)["status"] == JOB_QUEUED
+    assert store.get(job_id)["stages"] == {}
+
+FORM = {"instrument": "vocal", "fx_type": "reverb", "instruction": "small room"}
+
+@pytest.fixture
+def fx_gate(monkeypatch, fx_params):
+    """Stub generate_fx_params: replies once the gate opens, fails for instructions containing "fail" """
+    from app import main
+
+    gate = threading.Event()
+
+    async def fake_generate(req):
+        await asyncio.to_thread(gate.wait, 30)
+        if "fail" in req.instruction:
+            raise ValueError("provider unavailable")
+        return fx_params
+
+    monkeypatch.setattr(main, "generate_fx_params", fake_generate)
+    return gate
+
+def _wait_for(client, job_id, status, timeout_s=30.0):
+    deadline = time.monotonic() + timeout_s
+    while (job := client.get(f"/jobs/{job_id}").json())["status"] != status:
+        assert time.monotonic() < deadline, job
+        time.sleep(0.05)
+    return job
+
+def test_job_lifecycle_over_http(app_dir, fx_gate, wav):
+    from app.main import app
+
+    with TestClient(app) as client:
+        r = client.post("/jobs", files={"file": ("take.wav", wav, "audio/wav")}, data=FORM)
+        assert r.status_code == 202
+        job_id = r.json()["job_id"]
+        assert r.headers["location"] == f"/jobs/{job_id}"
+        assert r.json()["status"] in (JOB_QUEUED, JOB_RUNNING)
+
+        # Not done yet: the result is a conflict, not a missing resource
+        assert client.get(f"/jobs/{job_id}/result").status_code == 409
+        assert client.get("/jobs/missing/result").status_code == 404
+
+        fx_gate.set()
+        job = _wait_for(client, job_id, JOB_DONE)
+        assert {"upload", "llm", "render"} <= set(job["stages"])
+        r = client.get(f"/jobs/{job_id}/result")
+        assert r.status_code == 200
+        assert sf.read(io.BytesIO(r.content), always_2d=True)[0].shape == (8000, 2)
+
+        # A swept output is gone for good
+        next((app_dir / "uploads").glob(f"processed_{job_id}*")).unlink()
+        assert client.get(f"/jobs/{job_id}/result").status_code == 410
+
+        failing = client.post("/jobs", files={"file": ("take.wav", wav, "audio/wav")},
+                              data={**FORM, "instruction": "fail please"}).json()["job_id"]
+        _wait_for(client, failing, JOB_FAILED)
+        r = client.get(f"/jobs/{failing}/result")
+        assert r.status_code == 409 and "provider unavailable" in r.json()["detail"]
+
+def test_unfinished_jobs_resume_on_startup(app_dir, fx_gate, fx_params, wav):
+    from app.main import app, job_store
+
+    source = app_dir / "uploads" / "ab" / "abcdef.wav"
+    source.parent.mkdir(parents=True)
+    source.write_bytes(wav)
+    queued = job_store.create(fx_type="reverb", instrument="vocal", instruction="hall",
+                              input_path=str(source), input_filename="take.wav")
+    # Interrupted mid-render: parameters were already generated
+    running = job_store.create(fx_type="reverb", instrument="vocal", instruction="hall",
+                               input_path=str(source), input_filename="take.wav")
+    job_store.update(running, status=JOB_RUNNING, params=fx_params)
+
+    with TestClient(app) as client:
+        assert _wait_for(client, running, JOB_DONE)["params"] == fx_params  # no LLM call needed
+        fx_gate.set()
+        _wait_for(client, queued, JOB_DONE)
+        assert client.get(f"/jobs/{queued}/result").status_code == 200
+
+def test_job_output_format_does_not_follow_the_upload_suffix(app_dir, fx_gate, wav):
+    from app.main import app
+
+    fx_gate.set()
+    with TestClient(app) as client:
+        # libsndfile reads the upload by content but cannot write an .m4a
+        default = client.post("/jobs", files={"file": ("take.m4a", wav, "audio/mp4")}, data=FORM).json()["job_id"]
+        flac = client.post("/jobs", files={"file": ("take.m4a", wav, "audio/mp4")},
+                           data={**FORM, "format": "flac"}).json()["job_id"]
+        for job_id, sf_format, suffix in ((default, "WAV", ".wav"), (flac, "FLAC", ".flac")):
+            _wait_for(client, job_id, JOB_DONE)
+            r = client.get(f"/jobs/{job_id}/result")
+            assert r.status_code == 200
+            assert f'filename="processed_take{suffix}"' in r.headers["content-disposition"]
+            assert sf.info(io.BytesIO(r.content)).format == sf_format
+
+        bad = client.post("/jobs", files={"file": ("take.wav", wav, "audio/wav")}, data={**FORM, "format": "mp3"})
+        assert bad.status_code == 422
@@ -0,0 +1,119 @@
+import asyncio
+
+from app import llm
+
+def test_identical_concurrent_calls_share_one_request(monkeypatch):
+    calls = []
+
+    async def fake_call(messages, *, force_json=True):
+        calls.append(messages)
+        await asyncio.sleep(0.05)
+        return '{"ok": true}'
+
+    monkeypatch.setattr(llm, "_call_openai_chat", fake_call)
+    msgs = [{"role": "user", "content": "warm small room"}]
+    other = [{"role": "user", "content": "large hall"}]
+
+    async def scenario():
+        return await asyncio.gather(
+            *[llm.call_openai_chat(msgs) for _ in range(5)],
+            llm.call_openai_chat(other),
+        )
+
+    results = asyncio.run(scenario())
+    assert results == ['{"ok": true}'] * 6
+    assert len(calls) == 2
+    assert llm._inflight == {}
+
+def test_limiter_caps_concurrency():
+    limiter = llm.ProviderLimiter(max_concurrency=2, rate_per_s=0, burst=1)
+    active = 0
+    peak = 0
+
+    async def worker():
+        nonlocal active, peak
+        async with limiter:
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    async def scenario():
+        await asyncio.gather(*[worker() for _ in range(6)])
+
+    asyncio.run(scenario())
+    assert peak == 2
+
+def test_token_usage_is_counted(monkeypatch):
+    import httpx
+
+    from app.metrics import LLM_REQUESTS, LLM_TOKENS
+
+    def handler(request):
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": '{"ok": true}'}}],
+            "usage": {"prompt_tokens": 120, "completion_tokens": 30, "total_tokens": 150},
+        })
+
+    monkeypatch.setattr(llm.settings, "openai_api_key", "sk-test")
+    prompt_before = LLM_TOKENS.value(type="prompt")
+    completion_before = LLM_TOKENS.value(type="completion")
+    requests_before = LLM_REQUESTS.value(status=200)
+
+    async def scenario():
+        monkeypatch.setattr(llm, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        try:
+            return await llm._call_openai_chat([{"role": "user", "content": "hi"}])
+        finally:
+            await llm.close_client()
+
+    assert asyncio.run(scenario()) == '{"ok": true}'
+    assert LLM_TOKENS.value(type="prompt") == prompt_before + 120
+    assert LLM_TOKENS.value(type="completion") == completion_before + 30
+    assert LLM_REQUESTS.value(status=200) == requests_before + 1
+
+def _pool(client):
+    # httpcore connection pool behind the client's default transport
+    return client._transport._pool
+
+def test_get_client_is_a_shared_pooled_http2_client(monkeypatch):
+    monkeypatch.setattr(llm, "_client", None)
+    monkeypatch.setattr(llm.settings, "llm_http2", True)
+    monkeypatch.setattr(llm.settings, "llm_max_connections", 7)
+    monkeypatch.setattr(llm.settings, "llm_max_keepalive", 3)
+    monkeypatch.setattr(llm.settings, "llm_keepalive_expiry_s", 12.5)
+
+    client = llm.get_client()
+    try:
+        assert llm.get_client() is client
+        pool = _pool(client)
+        assert pool._http2 is True
+        assert (pool._max_connections, pool._max_keepalive_connections, pool._keepalive_expiry) == (7, 3, 12.5)
+    finally:
+        asyncio.run(llm.close_client())
+
+def test_close_client_lets_the_next_call_open_a_fresh_one(monkeypatch):
+    monkeypatch.setattr(llm, "_client", None)
+    first = llm.get_client()
+    asyncio.run(llm.close_client())
+    assert first.is_closed and llm._client is None
+
+    second = llm.get_client()
+    try:
+        assert second is not first and not second.is_closed
+        # A client closed behind the module's back is replaced too
+        asyncio.run(second.aclose())
+        assert llm.get_client() is not second
+    finally:
+        asyncio.run(llm.close_client())
+
+def test_get_client_falls_back_to_http1_without_h2(monkeypatch):
+    import sys
+
+    monkeypatch.setattr(llm, "_client", None)
+    monkeypatch.setattr(llm.settings, "llm_http2", True)
+    monkeypatch.setitem(sys.modules, "h2", None)  # import h2 raises ImportError
+    try:
+        assert _pool(llm.get_client())._http2 is False
+    finally:
+        asyncio.run(llm.close_client())
@@ -0,0 +1,29 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.fx import to_response
+from loadtest.driver import percentile
+from loadtest.mock_llm import MockConfig, create_app
+
+
+def test_percentile_is_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) is None
+
+
+def test_mock_llm_replies_parse_and_rate_limits():
+    body = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "warm hall for vocals"}]}
+    client = TestClient(create_app(MockConfig(latency_ms=0, jitter_ms=0, seed=0)))
+    resp = client.post("/v1/chat/completions", json=body)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["usage"]["total_tokens"] > 0
+    assert to_response(json.loads(data["choices"][0]["message"]["content"])).reverb is not None
+
+    limited = TestClient(create_app(MockConfig(latency_ms=0, jitter_ms=0, rate_limit_rate=1.0)))
+    resp = limited.post("/v1/chat/completions", json=body)
+    assert resp.status_code == 429 and "retry-after" in resp.headers
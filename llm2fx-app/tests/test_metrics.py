@@ -0,0 +1,29 @@
+import asyncio
+
+from app import metrics
+from app.render import RenderEngine
+
+def _observe_in_worker(seconds: float) -> str:
+    metrics.STAGE_SECONDS.observe(seconds, stage="test_worker")
+    return "done"
+
+def test_histogram_exposition_is_cumulative():
+    hist = metrics.Histogram("test_latency_seconds", "Test latency", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        hist.observe(value, stage="a")
+    lines = hist.render()
+    assert 'test_latency_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{stage="a",le="1"} 3' in lines
+    assert 'test_latency_seconds_bucket{stage="a",le="+Inf"} 4' in lines
+    assert 'test_latency_seconds_count{stage="a"} 4' in lines
+    assert "# TYPE test_latency_seconds histogram" in metrics.render_prometheus()
+
+def test_worker_observations_reach_the_server_registry():
+    engine = RenderEngine(max_workers=1, max_pending=2)
+    before = metrics.STAGE_SECONDS.count(stage="test_worker")
+    try:
+        assert asyncio.run(engine.run(_observe_in_worker, 0.2)) == "done"
+    finally:
+        engine.shutdown()
+    assert metrics.STAGE_SECONDS.count(stage="test_worker") == before + 1
+    assert metrics.STAGE_SECONDS.count(stage="render") >= 1
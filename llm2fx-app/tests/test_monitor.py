@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from app.monitor import MonitorSession
+
+REVERB = {"gains_db": [0.0] * 12, "decays_s": [0.5] * 12, "mix": 0.3}
+
+def test_monitor_output_is_independent_of_message_sizes():
+    x = np.random.default_rng(0).uniform(-0.3, 0.3, 4096).astype("<f4")
+    whole = MonitorSession(16000, 1, 256, {"reverb": REVERB}).push(x.tobytes())
+    session = MonitorSession(16000, 1, 256, {"reverb": REVERB})
+    pieces = b"".join(session.push(x[i:i + 300].tobytes()) for i in range(0, 4096, 300))
+    assert len(whole) == 4096 * 2 * 4  # stereo float32, all complete blocks
+    assert pieces == whole[:len(pieces)]
+    with pytest.raises(ValueError):
+        session.push(b"\x00" * 6)
+
+def test_monitor_param_swap_crossfades_without_jumps():
+    session = MonitorSession(16000, 1, 128, {"eq": {"gains_db": [0.0] * 12}}, crossfade_s=0.032)
+    tone = np.sin(2 * np.pi * 440 * np.arange(4096) / 16000).astype("<f4") * 0.5
+    before = np.frombuffer(session.push(tone[:2048].tobytes()), dtype="<f4")
+    session.set_params({"eq": {"gains_db": [12.0] * 12}})
+    after = np.frombuffer(session.push(tone[2048:].tobytes()), dtype="<f4")
+    out = np.concatenate([before, after]).reshape(-1, 2)[:, 0]
+    # The gain rises over the crossfade instead of stepping by 4x in one sample
+    assert np.max(np.abs(np.diff(out))) < 0.5
+    assert np.max(np.abs(out[-512:])) > 3 * np.max(np.abs(out[1024:2048]))
+
+def test_monitor_param_swap_mid_fade_waits_for_the_fade():
+    session = MonitorSession(16000, 1, 128, {"eq": {"gains_db": [0.0] * 12}}, crossfade_s=0.032)
+    tone = np.sin(2 * np.pi * 440 * np.arange(6144) / 16000).astype("<f4") * 0.5
+    out = [session.push(tone[:2048].tobytes())]
+    session.set_params({"eq": {"gains_db": [12.0] * 12}})
+    out.append(session.push(tone[2048:2176].tobytes()))
+    session.set_params({"eq": {"gains_db": [-12.0] * 12}})
+    out.append(session.push(tone[2176:].tobytes()))
+    out = np.frombuffer(b"".join(out), dtype="<f4").reshape(-1, 2)[:, 0]
+    # The second swap neither cuts the first fade short nor jumps to its target
+    assert np.max(np.abs(np.diff(out))) < 0.5
+    assert np.max(np.abs(out[-1024:])) < 0.5 * np.max(np.abs(out[1024:2048]))
+
+def test_monitor_drops_only_socket_backlog(monkeypatch):
+    from app import monitor
+
+    class Clock:
+        t = 0.0
+        def __call__(self):
+            return self.t
+
+    clock = Clock()
+    monkeypatch.setattr(monitor, "monotonic", clock)
+    session = MonitorSession(16000, 1, 256, {"eq": {"gains_db": [0.0] * 12}}, max_buffer_s=0.1)
+
+    # A large message is not lag: a second of audio arrives and is processed in full
+    assert len(session.push(np.zeros(16000, dtype="<f4").tobytes())) == 15872 * 2 * 4
+    assert session.dropped_frames == 0
+
+    # Rendering at half real-time speed while messages queue up back to back
+    process_block = session._process_block
+    def slow(block):
+        clock.t += 2 * len(block) / 16000
+        return process_block(block)
+    session._process_block = slow
+    block = np.zeros(256, dtype="<f4").tobytes()
+    processed = [bool(session.push(block)) for _ in range(14)]
+    # Drops start once the backlog passes 0.1 s and stop once it has drained
+    assert processed == [True] * 7 + [False] * 6 + [True]
+    assert session.dropped_frames == 6 * 256
+
+    # A client pause is not backlog either
+    clock.t += 5.0
+    assert session.push(block)
+    assert session.dropped_frames == 6 * 256
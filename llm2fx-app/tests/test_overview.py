@@ -0,0 +1,34 @@
+import numpy as np
+import soundfile as sf
+
+from app.overview import build_overview, load_overview, overview_path, select_levels
+
+BANDS = [20, 50, 100, 200, 400, 800, 1500, 3000, 6000, 12000, 16000, 20000]
+
+def test_overview_pyramid_bands_and_cache(tmp_path):
+    sr = 16000
+    t = np.arange(int(sr * 2.5)) / sr
+    tone = 0.5 * np.sin(2 * np.pi * 1000 * t)
+    tone[sr:sr + 100] = -0.9  # a transient the peaks must keep at every level
+    path = tmp_path / "tone.wav"
+    sf.write(path, np.stack([tone, 0.25 * tone], axis=1), sr)
+
+    overview = build_overview(str(path), BANDS, samples_per_peak=256, fft_size=1024, block_frames=4096)
+    levels = overview["levels"]
+    assert levels[0]["samples_per_peak"] == 256 and len(levels[0]["min"]) == -(-len(t) // 256)
+    assert len(levels[-1]["min"]) == 1
+    for level in levels:
+        assert min(level["min"]) == -114 and max(level["max"]) == 64
+    # 1 kHz falls in the 800-1500 Hz band
+    assert np.nanargmax(np.array(overview["band_energy_db"], dtype=float)) == 6
+
+    assert load_overview(path) == overview
+    assert overview_path(path).exists()
+    sf.write(path, np.zeros((100, 2)), sr)
+    assert load_overview(path) is None  # the audio changed
+
+    zoomed = select_levels(overview, start_s=1.0, end_s=1.5, max_points=64)
+    assert [level["samples_per_peak"] for level in zoomed["levels"]][0] == 256
+    assert zoomed["levels"][0]["start"] == sr // 256
+    assert all(len(level["max"]) <= 64 for level in zoomed["levels"])
+    assert len(select_levels(overview, max_points=64)["levels"]) < len(levels)
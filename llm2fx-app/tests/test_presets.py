@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+from app import fx
+from app.presets import PresetIndex
+from app.prompts import FEWSHOTS
+from app.schemas import Text2FxRequest
+
+PAYLOAD = {"schema_version": "reverb_v1", "reverb": {"gains_db": [0.0] * 12, "decays_s": [5.0] * 12, "mix": 0.9}, "reason": None}
+
+def test_rewordings_of_fewshots_match_and_novel_text_does_not(tmp_path):
+    index = PresetIndex(str(tmp_path / "presets.sqlite"), threshold=0.75)
+    payload, score, _ = index.match("drum", "tight drums room")
+    assert payload == json.loads(FEWSHOTS[2][1]) and score >= 0.75
+    assert index.match("vocals", "intimate vocal in a small room")[0] == json.loads(FEWSHOTS[0][1])
+    assert index.match("guitar", "cathedral with long shimmer") is None
+    assert index.stats()["hits"] == 2
+
+def test_validated_results_are_learned_and_persist(tmp_path):
+    db_path = str(tmp_path / "presets.sqlite")
+    index = PresetIndex(db_path, threshold=0.75, model="gpt")
+    index.add("guitar", "cathedral with long shimmer", PAYLOAD)
+    index.close()
+
+    restarted = PresetIndex(db_path, threshold=0.75, model="gpt")
+    assert restarted.match("guitars", "cathedral, long shimmer")[0] == PAYLOAD
+    assert PresetIndex(db_path, threshold=0.75, model="other").match("guitar", "cathedral with long shimmer") is None
+
+def test_confident_match_skips_the_llm(tmp_path, monkeypatch):
+    calls = []
+
+    async def fake_llm(messages, force_json=True):
+        calls.append(messages)
+        return json.dumps(PAYLOAD)
+
+    monkeypatch.setattr(fx, "call_openai_chat", fake_llm)
+    monkeypatch.setattr(fx, "preset_index", PresetIndex(str(tmp_path / "presets.sqlite"), threshold=0.75))
+    monkeypatch.setattr(fx.response_cache, "enabled", False)
+
+    resp = asyncio.run(fx.generate_fx_response(Text2FxRequest(fx_type="reverb", instrument="pad", instruction="large airy hall")))
+    assert resp.reverb.mix == 0.75 and not calls
+    resp = asyncio.run(fx.generate_fx_response(Text2FxRequest(fx_type="reverb", instrument="guitar", instruction="cathedral with long shimmer")))
+    assert resp.reverb.mix == 0.9 and len(calls) == 1
+    asyncio.run(fx.generate_fx_response(Text2FxRequest(fx_type="reverb", instrument="guitar", instruction="cathedral, long shimmer")))
+    assert len(calls) == 1
+
+def test_contrasting_modifiers_and_negations_do_not_match(tmp_path):
+    index = PresetIndex(str(tmp_path / "presets.sqlite"), threshold=0.75)
+    for instrument, instruction in [
+        ("vocal", "intimate vocal, large room"),             # small/large
+        ("drum", "tight drum room, very bright"),            # a modifier the preset lacks
+        ("vocal", "not an intimate vocal small room"),       # negation
+        ("vocal", "intimate vocal, small room, no reverb"),
+        ("guitar", "intimate guitar, small room"),           # another instrument
+    ]:
+        assert index.match(instrument, instruction) is None, instruction
+
+    # A learned entry with an extra qualifier does not answer the plain instruction either
+    index.add("vocal", "dark vocal plate", PAYLOAD)
+    assert index.match("vocal", "vocal plate") is None
+    assert index.match("vocal", "bright vocal plate") is None
+    assert index.match("vocals", "dark vocal plates")[0] == PAYLOAD
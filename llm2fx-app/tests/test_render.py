@@ -0,0 +1,127 @@
+import asyncio
+import subprocess
+import sys
+import time
+
+import pytest
+
+from app.render import RenderEngine, RenderQueueFull, RenderWorkerLost
+
+def test_render_engine_runs_in_pool():
+    engine = RenderEngine(max_workers=1, max_pending=2)
+    try:
+        assert asyncio.run(engine.run(pow, 2, 10)) == 1024
+    finally:
+        engine.shutdown()
+
+def test_render_engine_replaces_pool_after_a_worker_dies():
+    import os
+    engine = RenderEngine(max_workers=1, max_pending=2)
+
+    async def scenario():
+        with pytest.raises(RenderWorkerLost):
+            await engine.run(os._exit, 1)  # like a worker killed for memory
+        assert await engine.run(pow, 2, 10) == 1024
+        assert engine.pending == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        engine.shutdown()
+
+def test_server_import_defers_dsp_stack_to_workers():
+    probe = "import sys, app.main; print(any(m in sys.modules for m in ('librosa', 'scipy.signal')))"
+    out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+    assert out.stdout.strip().splitlines()[-1] == "False"
+
+def test_render_engine_prewarms_workers():
+    from app.tasks import prewarm, prewarm_worker
+    engine = RenderEngine(max_workers=1, max_pending=2, initializer=prewarm_worker)
+    try:
+        assert asyncio.run(engine.run(prewarm, duration_s=0.05)) > 0
+    finally:
+        engine.shutdown()
+
+def test_startup_leaves_prewarming_to_the_pool_initializer(app_dir, monkeypatch):
+    import os
+
+    from fastapi.testclient import TestClient
+
+    from app import main
+
+    submitted = []
+
+    async def fake_run(fn, *args, **kwargs):
+        submitted.append(fn)
+        return fn(*args, **kwargs)
+
+    monkeypatch.setattr(main.settings, "render_prewarm", True)
+    monkeypatch.setattr(main.render_engine, "run", fake_run)
+    with TestClient(main.app) as client:
+        assert client.get("/healthz").status_code == 200
+    # Only a no-op that starts the workers; prewarm_worker does the render in each
+    assert submitted == [os.getpid]
+
+def test_render_engine_rejects_when_saturated():
+    engine = RenderEngine(max_workers=1, max_pending=1, retry_after_s=7)
+
+    async def scenario():
+        busy = asyncio.create_task(engine.run(time.sleep, 0.5))
+        await asyncio.sleep(0)
+        assert engine.saturated
+        with pytest.raises(RenderQueueFull) as exc:
+            await engine.run(time.sleep, 0)
+        assert exc.value.retry_after_s == 7
+        await busy
+        await asyncio.sleep(0)
+        assert engine.pending == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        engine.shutdown()
+
+def test_output_formats_resolve_and_render_to_bytes(tmp_path):
+    import io
+
+    import numpy as np
+    import soundfile as sf
+
+    from app.audio_processor import render_to_bytes
+    from app.formats import resolve_output_format
+
+    assert resolve_output_format("FLAC").subtype == "PCM_16"
+    assert resolve_output_format("ogg").media_type == "audio/ogg"
+    with pytest.raises(ValueError):
+        resolve_output_format("mp3")
+    with pytest.raises(ValueError):
+        resolve_output_format("wav", "VORBIS")
+
+    source = tmp_path / "in.wav"
+    sf.write(source, np.random.default_rng(0).uniform(-0.5, 0.5, 8000).astype(np.float32), 16000)
+    fmt = resolve_output_format("flac")
+    data = render_to_bytes(str(source), {"eq": {"gains_db": [3.0] * 12}}, fmt.format, fmt.subtype)
+    info = sf.info(io.BytesIO(data))
+    assert (info.format, info.subtype, info.frames) == ("FLAC", "PCM_16", 8000)
+    assert list(tmp_path.iterdir()) == [source]
+
+def test_preview_renders_short_mono_excerpt(tmp_path):
+    import io
+
+    import numpy as np
+    import soundfile as sf
+
+    from app.audio_processor import render_preview
+    from app.preview import PreviewOptions
+
+    source = tmp_path / "in.wav"
+    sf.write(source, np.random.default_rng(1).uniform(-0.5, 0.5, (48000 * 4, 2)).astype(np.float32), 48000)
+    params = {"reverb": {"gains_db": [0.0] * 12, "decays_s": [4.0] * 12, "mix": 0.5}}
+    data = render_preview(str(source), params, start_s=1.0, duration_s=2.0, sample_rate=22050,
+                          mono=True, max_ir_s=0.5, format="WAV", subtype="PCM_16")
+    info = sf.info(io.BytesIO(data))
+    assert (info.samplerate, info.channels, info.frames) == (22050, 1, 44100)
+
+    with pytest.raises(ValueError):
+        PreviewOptions.from_request(duration_s=0)
+    assert PreviewOptions.from_request(start_s=3).duration_s > 0
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import sqlite3
+import time
+
+from app.storage import StorageArea, StorageManager
+
+def _write(path, size, age_s=0.0):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"\0" * size)
+    stamp = time.time() - age_s
+    os.utime(path, (stamp, stamp))
+    return path
+
+def test_sweep_expires_then_evicts_least_recently_used(tmp_path):
+    root = tmp_path / "uploads"
+    old = _write(root / "aa" / "old.wav", 100, age_s=7200)
+    a = _write(root / "bb" / "a.wav", 100, age_s=30)
+    b = _write(root / "cc" / "b.wav", 100, age_s=20)
+    c = _write(root / "dd" / "c.wav", 100, age_s=10)
+    output = _write(root / "processed_x.wav", 100)
+    storage = StorageManager(str(tmp_path / "storage.sqlite"), [
+        StorageArea("uploads", root, ("??/*",), max_bytes=200, ttl_s=3600),
+    ])
+    # Using a file refreshes it in the index even though its mtime is old
+    storage.touch(a, "uploads")
+
+    usage = storage.sweep()["uploads"]
+    assert not old.exists() and not b.exists()
+    assert a.exists() and c.exists() and output.exists()  # outputs are not in this area
+    assert (usage["files"], usage["bytes"], usage["evicted"]) == (2, 200, 2)
+
+def test_pinned_files_survive_until_unpinned(tmp_path):
+    root = tmp_path / "outputs"
+    busy = _write(root / "processed_busy.wav", 100, age_s=7200)
+    storage = StorageManager(str(tmp_path / "storage.sqlite"), [
+        StorageArea("outputs", root, ("processed_*",), ttl_s=3600),
+    ])
+    # Pins live in the index, so a sweep from another process respects them
+    other = StorageManager(str(tmp_path / "storage.sqlite"), list(storage.areas.values()))
+    with storage.pinned(busy):
+        other.sweep()
+        assert busy.exists()
+
+    async def render():
+        async with storage.pinned_async(busy):
+            other.sweep()
+            assert busy.exists()
+    asyncio.run(render())
+    other.sweep()
+    assert not busy.exists()
+
+def test_touches_are_batched_until_the_sweep(tmp_path):
+    root = tmp_path / "uploads"
+    a = _write(root / "aa" / "a.wav", 100, age_s=30)
+    db_path = tmp_path / "storage.sqlite"
+    storage = StorageManager(str(db_path), [StorageArea("uploads", root, ("??/*",))])
+    storage.touch(a, "uploads")
+    storage.touch(root / "bb" / "gone.wav", "uploads")  # deleted before the flush
+    assert not db_path.exists()
+
+    storage.flush()
+    rows = sqlite3.connect(db_path).execute("SELECT path, size, last_access FROM files").fetchall()
+    assert [(path, size) for path, size, _ in rows] == [(str(a), 100)]
+    assert rows[0][2] > time.time() - 5
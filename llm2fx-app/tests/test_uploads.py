@@ -0,0 +1,86 @@
+import asyncio
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi import UploadFile
+
+from app.uploads import UploadRejected, save_upload
+
+def _wav_bytes(seconds: float, sr: int = 8000) -> bytes:
+    buf = io.BytesIO()
+    sf.write(buf, np.zeros(int(seconds * sr), dtype=np.float32), sr, format="WAV")
+    return buf.getvalue()
+
+def _save(data: bytes, upload_dir, filename="take.wav", **limits):
+    limits.setdefault("max_bytes", 10 * 1024 * 1024)
+    limits.setdefault("max_duration_s", 60)
+    upload = UploadFile(file=io.BytesIO(data), filename=filename)
+    return asyncio.run(save_upload(upload, upload_dir, chunk_size=1024, **limits))
+
+def test_uploads_are_content_addressed_and_deduplicated(tmp_path):
+    data = _wav_bytes(1.0)
+    first = _save(data, tmp_path)
+    second = _save(data, tmp_path, filename="other name.WAV")
+    assert first.path == second.path
+    assert first.path.name == f"{first.sha256}.wav"
+    assert first.size == len(data)
+    assert second.duplicate and not first.duplicate
+    assert second.filename == "other name.WAV"
+    assert first.path.read_bytes() == data
+
+def test_size_and_duration_limits(tmp_path):
+    with pytest.raises(UploadRejected) as too_big:
+        _save(_wav_bytes(1.0), tmp_path, max_bytes=4096)
+    assert too_big.value.status_code == 413
+
+    with pytest.raises(UploadRejected) as too_long:
+        _save(_wav_bytes(3.0), tmp_path, max_duration_s=2)
+    assert too_long.value.status_code == 413
+
+    # Rejected uploads leave nothing behind
+    assert list(tmp_path.rglob("*")) == []
+
+def test_overlong_upload_is_rejected_from_its_header(tmp_path):
+    data = _wav_bytes(30.0)
+    upload = UploadFile(file=io.BytesIO(data), filename="take.wav")
+    with pytest.raises(UploadRejected) as too_long:
+        asyncio.run(save_upload(upload, tmp_path, max_bytes=len(data), max_duration_s=10, chunk_size=4096))
+    assert "30s" in too_long.value.detail
+    # Rejected once the header was on disk, long before the whole body was read
+    assert upload.file.tell() < len(data) // 4
+    assert list(tmp_path.rglob("*")) == []
+
+    # Long uploads within the limit pass the early check
+    assert _save(data, tmp_path, max_duration_s=30).size == len(data)
+
+def test_upload_body_limit_rejects_before_the_form_is_parsed():
+    from fastapi import FastAPI, File
+    from fastapi.testclient import TestClient
+
+    from app.uploads import UploadBodyLimit
+
+    app = FastAPI()
+    parsed = []
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        parsed.append(file.filename)
+        return {"ok": True}
+
+    app.add_middleware(UploadBodyLimit, limits={"/upload": 4096})
+    client = TestClient(app)
+    assert client.post("/upload", files={"file": ("a.wav", b"\0" * 1000)}).status_code == 200
+
+    # Declared too large: refused from the header alone
+    r = client.post("/upload", files={"file": ("b.wav", b"\0" * 5000)})
+    assert r.status_code == 413 and "4096" in r.json()["detail"]
+
+    # No Content-Length: refused once the streamed bytes pass the limit
+    def chunks():
+        for _ in range(100):
+            yield b"\0" * 1024
+    r = client.post("/upload", content=chunks(), headers={"Content-Type": "multipart/form-data; boundary=x"})
+    assert r.status_code == 413
+    assert parsed == ["a.wav"]